@@ -0,0 +1,156 @@
+# analytics.py
+"""
+Per-user longitudinal aggregates, kept in one document per patient and updated on every
+saved session, so trend queries cost the same for 5 sessions or 5000.
+
+Per modality the document holds running least-squares sums (n, Σt, Σt², Σy, Σty, t in days
+since ANALYTICS_EPOCH) for the score slope and the last ROLLING_WINDOW scores for the
+rolling average. It also tracks the current category and when it last changed.
+
+Timestamps are normalised to naive UTC isoformat strings (see normalize_timestamp), the form
+the sessions collection stores, so they compare correctly as strings. The rolling window is
+kept in timestamp order, and only the latest session by timestamp can change the category,
+so a session that arrives late does not overwrite newer state. A late session is not
+back-dated into category_since; POST /analytics/{username}/rebuild recomputes that exactly.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = {
+    "final": "final_score",
+    "keystroke": "keystroke_score",
+    "mouse": "mouse_score",
+    "webcam": "webcam_score",
+}
+ROLLING_WINDOW = int(os.getenv("ANALYTICS_ROLLING_WINDOW", 5))
+# Fixed origin keeps the Σt² terms small, so the slope does not lose precision
+ANALYTICS_EPOCH = datetime(2025, 1, 1)
+
+
+def parse_timestamp(value) -> datetime:
+    """Naive UTC datetime from an ISO string or datetime; raises ValueError for anything else."""
+    if isinstance(value, str):
+        # Python < 3.11 does not read the "Z" suffix that JavaScript's toISOString() writes
+        value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    elif not isinstance(value, datetime):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def normalize_timestamp(value) -> str:
+    return parse_timestamp(value).isoformat()
+
+
+def days_since_epoch(timestamp) -> float:
+    return (parse_timestamp(timestamp) - ANALYTICS_EPOCH).total_seconds() / 86400.0
+
+
+def stats_update(session: dict) -> dict:
+    """The $inc/$push/$set update that folds one session into the user's aggregate document."""
+    timestamp = normalize_timestamp(session["timestamp"])
+    t = days_since_epoch(timestamp)
+    inc = {}
+    push = {}
+    for modality, field in SCORE_FIELDS.items():
+        y = session.get(field)
+        if y is None:
+            continue
+        y = float(y)
+        inc.update({
+            f"{modality}.n": 1,
+            f"{modality}.sum_t": t,
+            f"{modality}.sum_tt": t * t,
+            f"{modality}.sum_y": y,
+            f"{modality}.sum_ty": t * y,
+        })
+        push[f"{modality}.recent"] = {"$each": [{"t": t, "y": y}], "$sort": {"t": 1}, "$slice": -ROLLING_WINDOW}
+    update = {
+        "$inc": inc,
+        "$max": {"last_timestamp": timestamp},
+        "$min": {"first_timestamp": timestamp},
+    }
+    if push:
+        update["$push"] = push
+    return update
+
+
+def session_operations(session: dict) -> list:
+    username = session["username"]
+    timestamp = normalize_timestamp(session["timestamp"])
+    return [
+        UpdateOne({"_id": username}, stats_update(session), upsert=True),
+        # Only rewrites category_since when the category actually changed, and only for the
+        # user's latest session: the update above has just raised last_timestamp to at least this one
+        UpdateOne(
+            {"_id": username, "last_timestamp": timestamp, "last_category": {"$ne": session["final_category"]}},
+            {"$set": {"last_category": session["final_category"], "category_since": timestamp}},
+        ),
+    ]
+
+
+async def record_sessions(stats_collection, sessions: list):
+    """Folds sessions into their users' aggregates with one ordered bulk write, in list order."""
+    operations = [op for session in sessions for op in session_operations(session)]
+    if operations:
+        await stats_collection.bulk_write(operations, ordered=True)
+
+
+async def record_session(stats_collection, session: dict):
+    await record_sessions(stats_collection, [session])
+
+
+def _trend(agg: dict) -> dict:
+    n = agg.get("n", 0)
+    if not n:
+        return {"sessions": 0, "mean": None, "slope_per_day": None, "rolling_avg": None}
+    denom = n * agg["sum_tt"] - agg["sum_t"] ** 2
+    # A single session, or sessions at the same instant, have no slope
+    slope = (n * agg["sum_ty"] - agg["sum_t"] * agg["sum_y"]) / denom if abs(denom) > 1e-12 else None
+    # Aggregates written before the window was timestamp-sorted hold bare scores
+    recent = [r["y"] if isinstance(r, dict) else r for r in agg.get("recent", [])]
+    return {
+        "sessions": n,
+        "mean": round(agg["sum_y"] / n, 3),
+        "slope_per_day": round(slope, 5) if slope is not None else None,
+        "rolling_avg": round(sum(recent) / len(recent), 3) if recent else None,
+    }
+
+
+def summarize(doc: dict, now: datetime = None) -> dict:
+    now = now or datetime.utcnow()
+    category_since = doc.get("category_since")
+    return {
+        "username": doc["_id"],
+        "first_session": doc.get("first_timestamp"),
+        "last_session": doc.get("last_timestamp"),
+        "category": doc.get("last_category"),
+        "category_since": category_since,
+        "days_since_category_change": (
+            round((now - parse_timestamp(category_since)).total_seconds() / 86400.0, 3)
+            if category_since else None
+        ),
+        "rolling_window": ROLLING_WINDOW,
+        "trends": {modality: _trend(doc.get(modality, {})) for modality in SCORE_FIELDS},
+    }
+
+
+async def rebuild(session_collection, stats_collection, username: str):
+    """Recomputes one user's aggregate from their stored sessions, e.g. for history saved before this existed."""
+    await stats_collection.delete_one({"_id": username})
+    cursor = session_collection.find({"username": username}).sort([("timestamp", 1), ("_id", 1)])
+    async for session in cursor:
+        try:
+            parse_timestamp(session.get("timestamp"))
+        except ValueError:
+            # Saved before timestamps were validated; it cannot be placed on the time axis
+            logger.warning("⚠️ Skipping session %s with invalid timestamp %r", session.get("_id"), session.get("timestamp"))
+            continue
+        await record_session(stats_collection, session)
+    return await stats_collection.find_one({"_id": username})
@@ -1,29 +1,129 @@
 # auth.py
+"""
+Authentication for the API: JWT issue/verify (PyJWT) and the current-user dependency.
+Users live in the shared database's "users" collection (see database.py).
+"""
+import os
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Optional
 
-# --- MongoDB Setup ---
-MONGO_URL = "mongodb://localhost:27017"
-client = AsyncIOMotorClient(MONGO_URL)
-db = client["auth_db"]
-users_collection = db["users"]
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+
+from auth_cache import AuthCache
+from database import db
+from inference import InferenceExecutor
+import passwords
 
 # --- JWT Config ---
-SECRET_KEY = "supersecretkey"  # change this in production
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_secret_key")  # change this in production
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
+
+# Hashing gets its own small pool: a burst of signins queues here (and gets 503 + Retry-After
+# when the queue is full) instead of stalling the event loop or the inference workers
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+password_executor = InferenceExecutor(kind="thread", workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
+
+# Verified tokens and user records for get_current_user, so authenticated requests skip Mongo
+auth_cache = AuthCache()
+
 
 # --- JWT Functions ---
-def create_access_token(data: dict, expires_delta: timedelta = None):
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str):
+def decode_token(token: str):
+    """The verified payload, or None for a bad or expired token."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
         return None
+
+def verify_token(token: str):
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
+
+
+# --- Users ---
+async def get_user(username: str):
+    return await db.users.find_one({"username": username})
+
+async def get_cached_user(username: str):
+    user = auth_cache.get_user(username)
+    if user is None:
+        user = await get_user(username)
+        if user is not None:
+            auth_cache.remember_user(username, user)
+    return user
+
+# --- Passwords ---
+_dummy_hash = None
+
+async def hash_password(password: str) -> str:
+    return await password_executor.run("hash_password", passwords.hash_password, password)
+
+async def verify_password(stored: str, password: str) -> bool:
+    return await password_executor.run("verify_password", passwords.verify_password, stored, password)
+
+async def authenticate_user(username: str, password: str):
+    global _dummy_hash
+    user = await get_user(username)
+    if not user:
+        # Spend the same time as a real check so response timing does not reveal which usernames exist
+        if _dummy_hash is None:
+            _dummy_hash = await hash_password("dummy-password")
+        await verify_password(_dummy_hash, password)
+        return False
+    if not await verify_password(user["password"], password):
+        return False
+
+    # Plain-text records and hashes made with an older scheme or cost are upgraded on login
+    if passwords.needs_rehash(user["password"]):
+        new_hash = await hash_password(password)
+        await db.users.update_one(
+            {"_id": user["_id"], "password": user["password"]}, {"$set": {"password": new_hash}}
+        )
+        user["password"] = new_hash
+        auth_cache.invalidate_user(username)
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    username = auth_cache.token_subject(token)
+    if username is None:
+        payload = decode_token(token)
+        username = payload.get("sub") if payload else None
+        if username is None:
+            raise credentials_exception
+        auth_cache.remember_token(token, username, payload.get("exp"))
+
+    user = await get_cached_user(username)
+    if user is None:
+        raise credentials_exception
+    return user
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """
+    get_current_user, restricted to accounts with role "admin". /signup never sets a role;
+    grant it in Mongo: db.users.updateOne({username: ...}, {$set: {role: "admin"}}).
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
+
+def check_owner(current_user: dict, username: str):
+    """403 unless the data belongs to the signed-in account; admins may read anyone's."""
+    if current_user["username"] != username and current_user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your data")
@@ -0,0 +1,112 @@
+# auth_cache.py
+"""
+Short-lived, per-process cache for the authentication path: verified bearer tokens
+(token -> username) and user records (username -> document).
+
+A token is never served past its own "exp" claim. User records expire after AUTH_CACHE_TTL
+seconds, which bounds how long another worker's change can go unnoticed; changes made in
+this process call invalidate_user() and take effect immediately. Set AUTH_CACHE_TTL=0 to disable.
+"""
+import os
+import time
+from collections import OrderedDict
+
+# --- Auth Cache Config ---
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 30))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+
+
+class _TTLCache:
+    """LRU of key -> (expires_at, value). Only touched from the event loop thread."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value, expires: float):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def pop(self, key):
+        return self._entries.pop(key, None)
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class AuthCache:
+    def __init__(self, ttl=AUTH_CACHE_TTL, maxsize=AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.tokens = _TTLCache(maxsize)
+        self.users = _TTLCache(maxsize)
+        # username -> tokens cached for it, so invalidating a user also drops their tokens
+        self._user_tokens = {}
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def token_subject(self, token: str):
+        """Username of an already verified, unexpired token, or None."""
+        return self.tokens.get(token) if self.enabled else None
+
+    def remember_token(self, token: str, username: str, exp=None):
+        if not self.enabled:
+            return
+        expires = time.time() + self.ttl
+        if exp is not None:
+            expires = min(expires, float(exp))
+        self.tokens.put(token, username, expires)
+        # Forget tokens that have since expired or been evicted, so the set stays small
+        live = {t for t in self._user_tokens.get(username, ()) if t in self.tokens}
+        live.add(token)
+        self._user_tokens[username] = live
+
+    def get_user(self, username: str):
+        return self.users.get(username) if self.enabled else None
+
+    def remember_user(self, username: str, user: dict):
+        if self.enabled:
+            self.users.put(username, user, time.time() + self.ttl)
+
+    def invalidate_user(self, username: str):
+        """Call after any change to a user (password, email, deletion)."""
+        self.invalidations += 1
+        self.users.pop(username)
+        for token in self._user_tokens.pop(username, ()):
+            self.tokens.pop(token)
+
+    def metrics(self):
+        return {
+            "ttl_s": self.ttl,
+            "tokens": self.tokens.as_dict(),
+            "users": self.users.as_dict(),
+            "invalidations": self.invalidations,
+        }
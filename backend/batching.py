@@ -0,0 +1,84 @@
+# batching.py
+import asyncio
+import os
+
+from inference import inference_executor
+from logging_config import current_request_id, request_id_var
+
+# --- Micro-batching Config ---
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", 2.0))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", 32))
+
+
+class MicroBatcher:
+    """
+    Collects single-row predictions that arrive within a short window and scores them
+    with one batched model call on the inference executor.
+    All bookkeeping happens on the event loop thread, so no locks are needed.
+    """
+
+    def __init__(self, name: str, batch_fn, window_ms=MICROBATCH_WINDOW_MS, max_batch_size=MICROBATCH_MAX_SIZE):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._items = []
+        self._waiters = []
+        self._request_ids = []
+        self._timer = None
+        # metrics
+        self.batches = 0
+        self.items = 0
+        self.max_seen = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._items.append(item)
+        self._waiters.append(waiter)
+        self._request_ids.append(current_request_id())
+
+        if len(self._items) >= self.max_batch_size:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+
+        return await waiter
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, waiters, request_ids = self._items, self._waiters, self._request_ids
+        self._items, self._waiters, self._request_ids = [], [], []
+        if items:
+            asyncio.ensure_future(self._run_batch(items, waiters, request_ids))
+
+    async def _run_batch(self, items, waiters, request_ids):
+        # Logs from the batched model call name every request in the batch
+        request_id_var.set(",".join(dict.fromkeys(request_ids)))
+        self.batches += 1
+        self.items += len(items)
+        self.max_seen = max(self.max_seen, len(items))
+        try:
+            results = await inference_executor.run(self.name, self.batch_fn, items)
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        # Callers that timed out have already cancelled their waiter
+        for waiter, result in zip(waiters, results):
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def metrics(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "max_batch_seen": self.max_seen,
+        }
@@ -0,0 +1,103 @@
+# bench_features.py
+"""
+Cost of turning a clip's per-frame kinematics into model features: the declarative spec
+(frame_matrix + column_stats + FeaturePlan) next to the pandas aggregation it replaced
+(one DataFrame per clip, statistics column by column, features filled in by hand).
+
+    python bench_features.py --frames 300 3000 --repeat 500
+
+The per-frame kinematics are computed once per clip length and are not timed. Peak memory is
+tracemalloc's peak for one aggregation (Python and NumPy allocations). The table also shows
+how many model features each path fills and how far apart they are on the ones both fill.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from pose_analysis import ARM_JOINTS, PoseAnalyzer
+from webcam_models import WebcamModel, column_stats, feature_plan, frame_matrix
+
+
+def pandas_features(frame_features) -> dict:
+    """The aggregation before the feature spec, kept here as the baseline."""
+    import pandas as pd
+
+    df = pd.DataFrame(frame_features)
+    stats = {col: (df[col].mean(), df[col].std(), df[col].max(), df[col].min()) for col in df.columns}
+    features = {}
+    col_map = {
+        "Lelbowangle": "L_elbow_angle", "Relbowangle": "R_elbow_angle",
+        "Lshoulderangle": "L_shoulder_angle", "Rshoulderangle": "R_shoulder_angle",
+        "Lshoulderspeed": "L_shoulder_speed", "Rshoulderspeed": "R_shoulder_speed",
+        "Lsmoothness": "L_smoothness", "Rsmoothness": "R_smoothness",
+        "Lshoulderspeednorm": "L_shoulder_speed_norm", "Rshoulderspeednorm": "R_shoulder_speed_norm",
+    }
+    for src_col, prefix in col_map.items():
+        mean, std, max_, min_ = stats[src_col]
+        features[f"{prefix}_mean"], features[f"{prefix}_std"] = mean, std
+        features[f"{prefix}_max"], features[f"{prefix}_min"] = max_, min_
+    for side in "LR":
+        features[f"{side}_elbow_angle_range"] = features[f"{side}_elbow_angle_max"] - features[f"{side}_elbow_angle_min"]
+        features[f"{side}_smoothness_sparc"] = -np.log(stats[f"{side}smoothness"][0] + 1e-8)
+        features[f"{side}_elbow_rom"] = features[f"{side}_elbow_angle_range"]
+    for name, left, right in (
+        ("elbow_angle_mean", "L_elbow_angle_mean", "R_elbow_angle_mean"),
+        ("shoulder_angle_mean", "L_shoulder_angle_mean", "R_shoulder_angle_mean"),
+        ("shoulder_speed_mean", "L_shoulder_speed_mean", "R_shoulder_speed_mean"),
+        ("smoothness_mean", "L_smoothness_sparc", "R_smoothness_sparc"),
+    ):
+        features[f"{name}_LR_diff"] = features[left] - features[right]
+        features[f"{name}_LR_ratio"] = features[left] / (features[right] + 1e-8)
+    return features
+
+
+def spec_features(frame_features) -> dict:
+    return feature_plan.features(column_stats(frame_matrix(frame_features)))
+
+
+def clip_kinematics(frames: int, seed: int = 0) -> dict:
+    """Per-frame kinematics of a random-walk arm clip at 30 fps."""
+    rng = np.random.default_rng(seed)
+    joints = rng.uniform(0.2, 0.8, size=(len(ARM_JOINTS), 2)) + np.cumsum(
+        rng.normal(0, 0.003, size=(frames, len(ARM_JOINTS), 2)), axis=0
+    )
+    timestamps = 1000.0 + np.arange(frames) * (1000.0 / 30)
+    return PoseAnalyzer().process_landmark_batch(joints, timestamps, ARM_JOINTS)
+
+
+def timed(fn, frame_features, repeat: int) -> dict:
+    fn(frame_features)  # first call pays for imports
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(frame_features)
+        latencies.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(frame_features)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    lat = np.array(latencies) * 1e6
+    return {"p50": float(np.percentile(lat, 50)), "p99": float(np.percentile(lat, 99)), "peak_kib": peak / 1024}
+
+
+def bench(args):
+    print(f"{args.repeat} aggregations per case; features = model features produced of {len(WebcamModel.FEATURE_NAMES)}")
+    print(f"{'frames':>7} {'path':<8} {'features':>9} {'p50 us':>9} {'p99 us':>9} {'peak KiB':>9}")
+    for frames in args.frames:
+        frame_features = clip_kinematics(frames)
+        old, new = pandas_features(frame_features), spec_features(frame_features)
+        worst = max(abs(old[k] - new[k]) / max(abs(old[k]), 1e-12) for k in old.keys() & new.keys())
+        for label, fn, produced in (("pandas", pandas_features, old), ("spec", spec_features, new)):
+            r = timed(fn, frame_features, args.repeat)
+            covered = len(set(produced) & set(WebcamModel.FEATURE_NAMES))
+            print(f"{frames:>7} {label:<8} {covered:>9} {r['p50']:>9.0f} {r['p99']:>9.0f} {r['peak_kib']:>9.0f}")
+        print(f"{'':>7} max relative difference on the shared features: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[300, 3000])
+    parser.add_argument("--repeat", type=int, default=500)
+    bench(parser.parse_args())
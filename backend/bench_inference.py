@@ -0,0 +1,107 @@
+# bench_inference.py
+"""
+Throughput and latency of the single-row prediction path at several client concurrencies,
+with micro-batching off (batches of 1) and on (MICROBATCH_WINDOW_MS / MICROBATCH_MAX_SIZE).
+
+    python bench_inference.py mouse --concurrency 1 8 32 64 --requests 2000
+    python bench_inference.py webcam --concurrency 1 4 16 --requests 200 --frames 300
+
+Runs in-process through main.predict_cached (no HTTP, prediction cache off), so the numbers
+cover the executor, the batcher and the models. Each client sends its next request as soon
+as the previous one is answered. Uses the models the registry serves (models/manifest.json).
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["PREDICTION_CACHE_SIZE"] = "0"
+os.environ.setdefault("MODEL_WARMUP", "0")
+
+import numpy as np
+
+import main
+from batching import MicroBatcher, MICROBATCH_MAX_SIZE
+from model_registry import registry
+
+
+def mouse_payloads(n: int, rng) -> list:
+    return [
+        {**main.MOUSE_KEYSTROKE_DEFAULTS, **{f: float(v) for f, v in zip(main.MOUSE_FEATURES, rng.random(len(main.MOUSE_FEATURES)) * 100)}}
+        for _ in range(n)
+    ]
+
+
+def keystroke_payloads(n: int, rng) -> list:
+    return [{f: float(v) for f, v in zip(main.KEYSTROKE_FEATURES, rng.random(len(main.KEYSTROKE_FEATURES)) * 100)} for _ in range(n)]
+
+
+def webcam_payloads(n: int, rng, frames: int) -> list:
+    """Random-walk pose clips at 30 fps; only the arm joints move."""
+    payloads = []
+    for _ in range(n):
+        points = rng.uniform(0.2, 0.8, size=(33, 2)) + np.cumsum(rng.normal(0, 0.003, size=(frames, 33, 2)), axis=0)
+        timestamps = 1000.0 + np.arange(frames) * (1000.0 / 30)
+        payloads.append({"landmark_data": [
+            {"landmarks": [{"x": float(x), "y": float(y), "visibility": 0.99} for x, y in frame], "timestamp": float(t)}
+            for frame, t in zip(points, timestamps)
+        ]})
+    return payloads
+
+
+async def run_level(name: str, payloads: list, concurrency: int) -> dict:
+    latencies = []
+    cursor = iter(range(len(payloads)))
+
+    async def client():
+        for i in cursor:
+            started = time.perf_counter()
+            await main.predict_cached(name, payloads[i])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lat = np.array(latencies) * 1000.0
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(lat, 50)),
+        "p99": float(np.percentile(lat, 99)),
+    }
+
+
+async def bench(args):
+    rng = np.random.default_rng(0)
+    if args.modality == "mouse":
+        payloads = mouse_payloads(args.requests, rng)
+    elif args.modality == "keystroke":
+        payloads = keystroke_payloads(args.requests, rng)
+    else:
+        payloads = webcam_payloads(args.requests, rng, args.frames)
+    # Warm up: model load and first-call costs stay out of the timings
+    registry.get(args.modality)
+    await main.predict_cached(args.modality, payloads[0])
+
+    batch_fn = main.batchers[args.modality].batch_fn
+    print(f"{args.modality}: {args.requests} requests per level, executor={main.inference_executor.kind} "
+          f"workers={main.inference_executor.workers}")
+    print(f"{'batching':>9} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>9}")
+    for label, max_size in (("off", 1), ("on", MICROBATCH_MAX_SIZE)):
+        for concurrency in args.concurrency:
+            batcher = MicroBatcher(args.modality, batch_fn, max_batch_size=max_size)
+            main.batchers[args.modality] = batcher
+            # Bound by the pool's admission limit, like real traffic would be with 503s
+            main.inference_executor.max_queue = max(main.inference_executor.max_queue, concurrency)
+            r = await run_level(args.modality, payloads, concurrency)
+            print(f"{label:>9} {concurrency:>7} {r['throughput']:>9.1f} {r['p50']:>9.2f} {r['p99']:>9.2f} "
+                  f"{batcher.metrics()['avg_batch_size']:>9.2f}")
+    main.inference_executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modality", choices=("keystroke", "mouse", "webcam"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=300, help="frames per webcam clip")
+    asyncio.run(bench(parser.parse_args()))
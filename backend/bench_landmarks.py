@@ -0,0 +1,86 @@
+# bench_landmarks.py
+"""
+Size and server-side cost of a webcam clip sent as JSON (POST /predict/webcam) and in the
+packed binary format of landmark_codec.py (POST /predict/webcam/packed), with all 33
+landmarks (x, y, z, visibility) and with only the arm joints 11-16 (x, y).
+
+    python bench_landmarks.py --frames 300 3000 --repeat 50
+
+Server cost is what each endpoint does before the model is called: parse the body (json.loads
+for JSON, decode_landmarks for packed) and extract the features. The model call itself is
+the same for both and is left out, so no model files are needed.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from landmark_codec import decode_landmarks, encode_landmarks
+from pose_analysis import ARM_JOINTS
+from webcam_models import features_from_landmark_data, features_from_packed_landmarks
+
+
+def clip_arrays(frames: int, seed: int = 0):
+    """(frames x 33 x 4) x, y, z, visibility of a random-walk pose at 30 fps, and timestamps in ms."""
+    rng = np.random.default_rng(seed)
+    values = np.empty((frames, 33, 4))
+    values[:, :, :2] = rng.uniform(0.2, 0.8, size=(33, 2)) + np.cumsum(rng.normal(0, 0.003, size=(frames, 33, 2)), axis=0)
+    values[:, :, 2] = rng.normal(0, 0.1, size=(frames, 33))
+    values[:, :, 3] = 0.99
+    return values, 1000.0 + np.arange(frames) * (1000.0 / 30)
+
+
+def json_body(values, timestamps) -> bytes:
+    landmark_data = [
+        {"landmarks": [{"x": x, "y": y, "z": z, "visibility": v} for x, y, z, v in frame], "timestamp": t}
+        for frame, t in zip(values.tolist(), timestamps.tolist())
+    ]
+    return json.dumps({"landmark_data": landmark_data}).encode()
+
+
+def from_json(body: bytes):
+    return features_from_landmark_data(json.loads(body)["landmark_data"])
+
+
+def from_packed(body: bytes):
+    return features_from_packed_landmarks(*decode_landmarks(body))
+
+
+def timed(fn, body: bytes, repeat: int) -> dict:
+    fn(body)  # first call pays for the scipy import
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        features = fn(body)
+        latencies.append(time.perf_counter() - started)
+    lat = np.array(latencies) * 1000.0
+    return {"features": features, "p50": float(np.percentile(lat, 50)), "p99": float(np.percentile(lat, 99))}
+
+
+def bench(args):
+    print(f"{args.repeat} runs per case; parse + feature extraction, no model call")
+    print(f"{'frames':>7} {'format':<22} {'body KB':>9} {'p50 ms':>9} {'p99 ms':>9} {'max rel diff':>13}")
+    for frames in args.frames:
+        values, timestamps = clip_arrays(frames)
+        arm = list(ARM_JOINTS)
+        cases = [
+            ("json, 33 landmarks", from_json, json_body(values, timestamps)),
+            ("packed, 33 x 4", from_packed, encode_landmarks(values, timestamps)),
+            ("packed, joints 11-16", from_packed, encode_landmarks(values[:, arm, :2], timestamps, arm)),
+        ]
+        reference = None
+        for label, fn, body in cases:
+            r = timed(fn, body, args.repeat)
+            if reference is None:
+                reference = r["features"]
+            # float32 on the wire: packed features differ from JSON only by that rounding
+            diff = max(abs(r["features"][k] - reference[k]) / max(abs(reference[k]), 1e-12) for k in reference)
+            print(f"{frames:>7} {label:<22} {len(body) / 1000:>9.1f} {r['p50']:>9.2f} {r['p99']:>9.2f} {diff:>13.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[300, 3000])
+    parser.add_argument("--repeat", type=int, default=50)
+    bench(parser.parse_args())
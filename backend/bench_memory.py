@@ -0,0 +1,96 @@
+# bench_memory.py
+"""
+Memory per worker when N workers fork from one master, as gunicorn.conf.py runs them, in
+three layouts:
+
+    no-preload  each worker loads the models itself after the fork
+    preload     the master loads them, no gc.freeze() (workers share the pages until touched)
+    freeze      the master runs model_registry.preload_for_fork(): load, then gc.freeze()
+
+    python bench_memory.py --workers 4
+    python bench_memory.py --workers 8 --requests 500 --layouts preload freeze
+
+Each worker loads what it still needs, scores --requests rows through the models, runs a
+full gc.collect() (which writes to the header of every tracked object it visits, so the
+unfrozen pages it shares get copied), and reports its /proc/self/smaps_rollup while all
+workers are still alive. USS (private clean + dirty) is the memory that worker alone costs;
+PSS splits the shared pages between the processes using them. Linux only.
+"""
+import argparse
+import gc
+import logging
+import multiprocessing as mp
+import os
+
+os.environ.setdefault("MODEL_WARMUP", "0")
+
+import numpy as np
+
+import main
+from model_registry import memory_usage, preload_for_fork, registry
+from mouse_model import predict_mouse
+
+LAYOUTS = ("no-preload", "preload", "freeze")
+
+
+def worker(requests: int, results, release):
+    registry.warm_up()
+    rng = np.random.default_rng(os.getpid())
+    rows = [{f: float(v) for f, v in zip(main.MOUSE_FEATURES, values)}
+            for values in rng.random((requests, len(main.MOUSE_FEATURES))) * 100]
+    for row in rows:
+        predict_mouse({**main.MOUSE_KEYSTROKE_DEFAULTS, **row})
+    gc.collect()
+    usage = memory_usage()
+    results.put(usage)
+    # Stay alive until every worker has measured, so PSS splits the shared pages N ways
+    release.wait()
+
+
+def run_layout(layout: str, workers: int, requests: int) -> list:
+    """Forks the workers from a child of this script, so every layout starts from a cold master."""
+    ctx = mp.get_context("fork")
+    summary = ctx.Queue()
+
+    def master():
+        if layout == "preload":
+            registry.warm_up()
+        elif layout == "freeze":
+            preload_for_fork()
+        results, release = ctx.Queue(), ctx.Event()
+        procs = [ctx.Process(target=worker, args=(requests, results, release)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        release.set()
+        for p in procs:
+            p.join()
+        summary.put(collected)
+
+    proc = ctx.Process(target=master)
+    proc.start()
+    collected = summary.get()
+    proc.join()
+    return collected
+
+
+def bench(args):
+    # Every worker logs each load (and each model missing from this checkout); keep the table readable
+    logging.disable(logging.WARNING)
+    print(f"{args.workers} workers, {args.requests} mouse predictions each, then gc.collect() (kB per worker)")
+    print(f"{'layout':<12} {'USS mean':>10} {'USS max':>10} {'PSS mean':>10} {'RSS mean':>10} {'USS total':>11}")
+    for layout in args.layouts:
+        usage = run_layout(layout, args.workers, args.requests)
+        uss = np.array([u["private_clean_kb"] + u["private_dirty_kb"] for u in usage])
+        pss = np.array([u["pss_kb"] for u in usage])
+        rss = np.array([u["rss_kb"] for u in usage])
+        print(f"{layout:<12} {uss.mean():>10.0f} {uss.max():>10.0f} {pss.mean():>10.0f} {rss.mean():>10.0f} "
+              f"{uss.sum():>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS))
+    bench(parser.parse_args())
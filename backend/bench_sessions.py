@@ -0,0 +1,142 @@
+# bench_sessions.py
+"""
+Latency of GET /sessions/{username} on a seeded history: the full streamed history, one keyset
+page, walking every page, a date range and a projection, next to the old unpaged handler
+(find everything, build the list, serialize it in one go).
+
+    python bench_sessions.py --sessions 2000 --repeat 5
+    python bench_sessions.py --mongo-url mongodb://localhost:27017 --sessions 100000
+
+Without --mongo-url it runs against mongomock-motor, an in-memory stand-in that ignores indexes,
+so those numbers only compare the handlers; index effects need a real mongod. Requests go
+through the ASGI app in-process (no lifespan, so sessions are written directly).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MODEL_WARMUP", "0")
+# The bench database is dropped at the end; never point it at the real one
+os.environ["MONGO_DB"] = os.getenv("BENCH_MONGO_DB", "stroke_recovery_bench")
+
+import httpx
+import numpy as np
+
+import main
+from database import db
+
+USERNAME = "bench_user"
+OTHER_USERS = 20
+
+
+def session_docs(username: str, count: int, rng, start: datetime) -> list:
+    return [{
+        "username": username,
+        "final_score": float(s),
+        "final_category": "Mild" if s > 60 else "Moderate",
+        "keystroke_score": float(s), "mouse_score": float(s), "webcam_score": float(s),
+        "timestamp": (start + timedelta(hours=6 * i)).isoformat(),
+        "pdf_filename": f"{username}_{i}.pdf",
+    } for i, s in enumerate(rng.uniform(20, 90, size=count))]
+
+
+async def seed(count: int):
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    await db.sessions.delete_many({})
+    for username in [USERNAME] + [f"other_{i}" for i in range(OTHER_USERS)]:
+        await db.sessions.insert_many(session_docs(username, count, rng, start))
+    await main.ensure_indexes()
+    return start + timedelta(hours=6 * count)
+
+
+async def unpaged_history(username: str):
+    """The handler before pagination: the whole history as one list."""
+    sessions = []
+    async for s in db.sessions.find({"username": username}):
+        s["id"] = str(s.pop("_id"))
+        sessions.append(s)
+    return json.dumps(sessions, default=str)
+
+
+async def timed(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await fn()
+        latencies.append(time.perf_counter() - started)
+    lat = np.array(latencies) * 1000.0
+    return {"rows": rows, "p50": float(np.percentile(lat, 50)), "p99": float(np.percentile(lat, 99))}
+
+
+async def bench(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.mongo_url:
+        db.url = args.mongo_url
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        db.client = AsyncMongoMockClient()
+    end = await seed(args.sessions)
+    path = f"/sessions/{USERNAME}"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        async def get(**params):
+            r = await client.get(path, params=params)
+            r.raise_for_status()
+            return r
+
+        async def old():
+            return len(json.loads(await unpaged_history(USERNAME)))
+
+        async def full():
+            return len((await get()).json())
+
+        async def first_page():
+            return len((await get(limit=args.page, order="desc")).json())
+
+        async def all_pages():
+            rows, cursor = 0, None
+            while True:
+                r = await get(limit=args.page, **({"cursor": cursor} if cursor else {}))
+                rows += len(r.json())
+                cursor = r.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    return rows
+
+        async def last_30_days():
+            return len((await get(since=(end - timedelta(days=30)).isoformat())).json())
+
+        async def projected():
+            return len((await get(fields="final_score,final_category")).json())
+
+        cases = [
+            ("old: unpaged list", old),
+            ("full history (streamed)", full),
+            (f"latest page (limit={args.page})", first_page),
+            (f"every page (limit={args.page})", all_pages),
+            ("since last 30 days", last_30_days),
+            ("fields=final_score,final_category", projected),
+        ]
+        backend = args.mongo_url or "mongomock-motor"
+        print(f"{args.sessions} sessions for {USERNAME} ({OTHER_USERS} other users alike), {backend}, "
+              f"{args.repeat} runs each")
+        print(f"{'request':<36} {'rows':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        for label, fn in cases:
+            r = await timed(fn, args.repeat)
+            print(f"{label:<36} {r['rows']:>7} {r['p50']:>9.2f} {r['p99']:>9.2f}")
+
+    await db.sessions.drop()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="sessions per user")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--mongo-url", help="a local mongod; defaults to the in-memory mongomock-motor")
+    asyncio.run(bench(parser.parse_args()))
@@ -0,0 +1,98 @@
+# bench_startup.py
+"""
+Cold-start latency of the API: time from process launch to the first answered GET / (the
+liveness check) and to the first answered prediction, with the models loaded
+
+    eager   before serving, as when they were loaded at import time (registry.warm_up())
+    warmup  in the background after startup (the default, MODEL_WARMUP=1)
+    lazy    on the first request that needs them (MODEL_WARMUP=0)
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --model keystroke --modes eager lazy
+
+Every run is a fresh interpreter, so imports and model loads are cold for Python (the OS
+page cache stays warm after the first run). The child runs the app's lifespan and sends the
+requests through the ASGI app in-process; no HTTP server is needed. Mongo is never reached:
+the index build runs in the background and is cancelled at shutdown.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MODES = ("eager", "warmup", "lazy")
+
+
+async def child(mode: str, model: str, launched: float):
+    """Runs in the spawned interpreter; prints the timestamps of the first answers as JSON."""
+    import logging
+
+    import httpx
+
+    imported_at = time.time()
+    import main
+    from model_registry import registry
+
+    imported = time.time()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    async with main.lifespan(main.app):
+        if mode == "eager":
+            registry.warm_up()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            (await client.get("/")).raise_for_status()
+            health = time.time()
+            if model == "keystroke":
+                payload = {f: 50.0 for f in main.KEYSTROKE_FEATURES}
+            else:
+                payload = {f: 50.0 for f in main.MOUSE_FEATURES}
+            (await client.post(f"/predict/{model}", json=payload)).raise_for_status()
+            predicted = time.time()
+    print(json.dumps({
+        "interpreter_ms": (imported_at - launched) * 1000.0,
+        "import_ms": (imported - imported_at) * 1000.0,
+        "health_ms": (health - launched) * 1000.0,
+        "prediction_ms": (predicted - launched) * 1000.0,
+    }))
+
+
+def run_once(mode: str, model: str) -> dict:
+    env = {**os.environ, "MODEL_WARMUP": "1" if mode == "warmup" else "0", "PREDICTION_CACHE_SIZE": "0"}
+    launched = time.time()
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--model", model, "--launched", repr(launched)],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench(args):
+    print(f"first /predict/{args.model} after launch, {args.runs} runs per mode (p50 / max, ms)")
+    print(f"{'mode':<8} {'interpreter':>12} {'import main':>12} {'first GET /':>16} {'first prediction':>18}")
+    for mode in args.modes:
+        runs = [run_once(mode, args.model) for _ in range(args.runs)]
+
+        def cell(key, width):
+            values = np.array([r[key] for r in runs])
+            return f"{np.percentile(values, 50):.0f} / {values.max():.0f}".rjust(width)
+
+        print(f"{mode:<8} {cell('interpreter_ms', 12)} {cell('import_ms', 12)} "
+              f"{cell('health_ms', 16)} {cell('prediction_ms', 18)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--model", choices=("keystroke", "mouse"), default="mouse")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--launched", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        import asyncio
+        asyncio.run(child(args.child, args.model, args.launched))
+    else:
+        bench(args)
@@ -0,0 +1,346 @@
+# compiled_trees.py
+"""
+Array-backed evaluation of XGBoost tree ensembles (MODEL_BACKEND=compiled).
+
+For 1-row and small-batch requests the XGBoost sklearn wrapper spends more time building a
+DMatrix and crossing into C++ than walking the trees. compile_model() exports the booster's
+trees into flat NumPy arrays (feature, threshold, children, default direction, leaf value);
+predict() then walks every tree for every row at once, one tree level per step, in
+preallocated per-thread buffers.
+
+Splits follow XGBoost exactly: inputs and thresholds are float32, a row goes left when
+x < threshold, and NaN takes the node's default direction. Every compiled model is checked
+against the original on generated probe rows before it is used; when anything is
+unsupported (categorical splits, other objectives, a custom `missing` value) or the check
+fails, the original model is kept.
+
+Compare a model file from the command line:
+    python compiled_trees.py models/dragdrop_model.joblib
+"""
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Backend Config ---
+# "native" serves the unpickled sklearn/XGBoost objects; "compiled" uses this module
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "native")
+# Rows evaluated per pass; bigger batches are split. Buffers are sized for this.
+COMPILED_MAX_BATCH = int(os.getenv("COMPILED_MAX_BATCH", 64))
+EQUIVALENCE_RTOL = 1e-5
+EQUIVALENCE_ATOL = 1e-5
+
+# Objective -> how the summed margin becomes the output
+_IDENTITY = {"reg:squarederror", "reg:linear", "reg:pseudohubererror", "reg:absoluteerror", "reg:squaredlogerror"}
+_LOGISTIC = {"binary:logistic", "reg:logistic"}
+_SOFTMAX = {"multi:softprob", "multi:softmax"}
+
+
+class UnsupportedModel(Exception):
+    pass
+
+
+def _parse_floats(text) -> list:
+    # XGBoost >= 2 writes e.g. "[5E-1]"; older versions a bare number
+    return [float(v) for v in str(text).strip("[]").split(",") if v.strip()]
+
+
+def _logit(p: float) -> float:
+    return math.log(p / (1.0 - p))
+
+
+class _Buffers:
+    def __init__(self, rows: int, n_features: int, columns: int):
+        shape = (rows, columns)
+        self.X = np.empty((rows, n_features), dtype=np.float32)
+        self.row_offset = (np.arange(rows, dtype=np.int64) * n_features)[:, None]
+        self.idx = np.empty(shape, dtype=np.int32)
+        self.feat = np.empty(shape, dtype=np.int64)
+        self.x = np.empty(shape, dtype=np.float32)
+        self.thr = np.empty(shape, dtype=np.float32)
+        self.go_right = np.empty(shape, dtype=bool)
+        self.missing = np.empty(shape, dtype=bool)
+        self.default_left = np.empty(shape, dtype=bool)
+        self.right = np.empty(shape, dtype=np.int32)
+        self.leaf = np.empty(shape, dtype=np.float32)
+
+
+class CompiledEnsemble:
+    """
+    predict() / predict_proba() compatible stand-in for an XGBRegressor or XGBClassifier.
+    Leaves point at themselves, so a fixed number of steps (the deepest tree) finishes every path.
+
+    XGBoost adds a class's trees one at a time onto its base margin in float32. float32 addition
+    is not associative, so a matmul or pairwise sum drifts from it by a few ulps. Each class
+    therefore gets one extra leaf node holding its base margin, walked like a tree ahead of
+    that class's trees, and a cumulative sum along each class's columns adds them up in XGBoost's order.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, groups,
+                 depth, n_features, n_groups, base_margin, objective, is_classifier):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.groups = groups
+        self.depth = depth
+        self.n_features = n_features
+        self.n_groups = n_groups
+        self.base_margin = base_margin
+        self.objective = objective
+        self.is_classifier = is_classifier
+
+        base_nodes = len(feature) + np.arange(n_groups)
+        self._nodes_feature = np.concatenate([feature, np.zeros(n_groups, dtype=feature.dtype)])
+        self._nodes_threshold = np.concatenate([threshold, np.zeros(n_groups, dtype=threshold.dtype)])
+        self._nodes_left = np.concatenate([left, base_nodes.astype(left.dtype)])
+        self._nodes_right = np.concatenate([right, base_nodes.astype(right.dtype)])
+        self._nodes_default_left = np.concatenate([default_left, np.ones(n_groups, dtype=bool)])
+        self._nodes_value = np.concatenate([value, np.asarray(base_margin, dtype=value.dtype)])
+        # Walk start per column: for each class, its base margin node and then its trees in order
+        starts, self._group_columns = [], []
+        for g in range(n_groups):
+            block = [base_nodes[g], *roots[groups == g]]
+            self._group_columns.append(slice(len(starts), len(starts) + len(block)))
+            starts.extend(block)
+        self._starts = np.asarray(starts, dtype=np.int32)
+        self._local = threading.local()
+
+    def _buffers(self) -> _Buffers:
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = _Buffers(COMPILED_MAX_BATCH, self.n_features, len(self._starts))
+            self._local.buf = buf
+        return buf
+
+    def _margin_chunk(self, X, out):
+        n = X.shape[0]
+        b = self._buffers()
+        b.X[:n] = X  # float32, like XGBoost's DMatrix
+        flat_X = b.X.reshape(-1)
+        idx, feat, x, thr = b.idx[:n], b.feat[:n], b.x[:n], b.thr[:n]
+        go_right, missing, default_left, right = b.go_right[:n], b.missing[:n], b.default_left[:n], b.right[:n]
+
+        # mode="clip" keeps np.take from buffering its output; every index is in range anyway
+        idx[...] = self._starts
+        for _ in range(self.depth):
+            np.take(self._nodes_feature, idx, out=feat, mode="clip")
+            np.add(feat, b.row_offset[:n], out=feat)
+            np.take(flat_X, feat, out=x, mode="clip")
+            np.take(self._nodes_threshold, idx, out=thr, mode="clip")
+            np.less(x, thr, out=go_right)
+            np.isnan(x, out=missing)
+            np.take(self._nodes_default_left, idx, out=default_left, mode="clip")
+            np.copyto(go_right, default_left, where=missing)
+            np.logical_not(go_right, out=go_right)
+            np.take(self._nodes_right, idx, out=right, mode="clip")
+            np.take(self._nodes_left, idx, out=idx, mode="clip")
+            np.copyto(idx, right, where=go_right)
+
+        leaf = b.leaf[:n]
+        np.take(self._nodes_value, idx, out=leaf, mode="clip")
+        # Sequential float32 sums, base margin first (a cumsum never reorders its additions)
+        for g, columns in enumerate(self._group_columns):
+            block = leaf[:, columns]
+            np.cumsum(block, axis=1, out=block)
+            out[:, g] = block[:, -1]
+
+    def margin(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}")
+        out = np.empty((X.shape[0], self.n_groups), dtype=np.float64)
+        for start in range(0, X.shape[0], COMPILED_MAX_BATCH):
+            stop = min(start + COMPILED_MAX_BATCH, X.shape[0])
+            self._margin_chunk(X[start:stop], out[start:stop])
+        return out
+
+    def _transform(self, margin):
+        if self.objective in _LOGISTIC:
+            return 1.0 / (1.0 + np.exp(-margin))
+        if self.objective in _SOFTMAX:
+            e = np.exp(margin - margin.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        return margin
+
+    def predict_proba(self, X):
+        prob = self._transform(self.margin(X))
+        if self.n_groups == 1:
+            return np.hstack([1.0 - prob, prob])
+        return prob
+
+    def predict(self, X):
+        margin = self.margin(X)
+        if self.is_classifier:
+            if self.n_groups == 1:
+                return (margin[:, 0] > 0.0).astype(np.int64)  # same as probability > 0.5
+            return margin.argmax(axis=1)
+        return self._transform(margin)[:, 0]
+
+
+def compile_xgb(model) -> CompiledEnsemble:
+    """Exports an XGBRegressor / XGBClassifier (or bare Booster) into a CompiledEnsemble."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    missing = getattr(model, "missing", np.nan)
+    if missing is not None and not (isinstance(missing, float) and math.isnan(missing)):
+        raise UnsupportedModel(f"missing={missing!r}")
+    try:
+        model.best_iteration
+        raise UnsupportedModel("early-stopped model (best_iteration)")
+    except AttributeError:
+        pass
+
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in _IDENTITY | _LOGISTIC | _SOFTMAX:
+        raise UnsupportedModel(f"objective {objective}")
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise UnsupportedModel(f"booster {gbm['name']}")
+    params = learner["learner_model_param"]
+    n_features = int(params["num_feature"])
+    n_groups = max(1, int(params["num_class"]))
+
+    base = _parse_floats(params["base_score"])
+    if objective in _LOGISTIC:
+        base = [_logit(b) for b in base]
+    base_margin = np.array(base if len(base) == n_groups else base[:1] * n_groups, dtype=np.float64)
+
+    trees = gbm["model"]["trees"]
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise UnsupportedModel("categorical splits")
+        lc = np.asarray(tree["left_children"], dtype=np.int64)
+        rc = np.asarray(tree["right_children"], dtype=np.int64)
+        is_leaf = lc == -1
+        nodes = np.arange(len(lc))
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+        threshold.append(np.where(is_leaf, np.float32(0), cond))
+        left.append(np.where(is_leaf, nodes, lc) + offset)
+        right.append(np.where(is_leaf, nodes, rc) + offset)
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        # A leaf's value is stored in split_conditions
+        value.append(np.where(is_leaf, cond, np.float32(0)))
+        roots.append(offset)
+        depth = max(depth, _tree_depth(lc, rc))
+        offset += len(lc)
+
+    return CompiledEnsemble(
+        feature=np.concatenate(feature).astype(np.int64),
+        threshold=np.concatenate(threshold).astype(np.float32),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(value).astype(np.float32),
+        roots=np.asarray(roots, dtype=np.int32),
+        groups=np.asarray(gbm["model"]["tree_info"], dtype=np.int64),
+        depth=depth,
+        n_features=n_features,
+        n_groups=n_groups,
+        base_margin=base_margin,
+        objective=objective,
+        is_classifier=hasattr(model, "predict_proba"),
+    )
+
+
+def _tree_depth(lc, rc) -> int:
+    depth, frontier = 0, [0]
+    while frontier:
+        frontier = [c for n in frontier for c in (lc[n], rc[n]) if c != -1]
+        depth += 1 if frontier else 0
+    return depth
+
+
+def probe_rows(compiled: CompiledEnsemble, n_rows: int = 512, seed: int = 0) -> np.ndarray:
+    """Rows whose values sit on, just below and just above the split thresholds, plus some NaNs."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, compiled.n_features))
+    is_split = compiled.left != np.arange(len(compiled.left))
+    for f in range(compiled.n_features):
+        cuts = compiled.threshold[is_split & (compiled.feature == f)]
+        if len(cuts):
+            picks = rng.choice(cuts, size=n_rows).astype(np.float64)
+            X[:, f] = picks + rng.choice([-1.0, 0.0, 1.0], size=n_rows) * np.maximum(np.abs(picks), 1.0) * 1e-3
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def check_equivalence(model, compiled: CompiledEnsemble, X):
+    """
+    (largest absolute difference between the original and compiled outputs on X, whether they
+    agree within EQUIVALENCE_RTOL/ATOL). A differing class prediction counts as an infinite difference.
+    """
+    if compiled.is_classifier:
+        expected, got = model.predict_proba(X), compiled.predict_proba(X)
+        if not np.array_equal(model.predict(X), compiled.predict(X)):
+            return float("inf"), False
+    else:
+        expected, got = model.predict(X), compiled.predict(X)
+    diff = float(np.max(np.abs(np.asarray(expected, dtype=float) - got), initial=0.0))
+    return diff, bool(np.allclose(expected, got, rtol=EQUIVALENCE_RTOL, atol=EQUIVALENCE_ATOL))
+
+
+def compile_model(model, name: str = "model", backend: str = None):
+    """
+    The compiled stand-in for `model` when MODEL_BACKEND is "compiled" and it passes the
+    equivalence check; otherwise `model` itself. Never raises.
+    """
+    if (backend or MODEL_BACKEND) != "compiled" or not hasattr(model, "get_booster"):
+        return model
+    try:
+        compiled = compile_xgb(model)
+        diff, equivalent = check_equivalence(model, compiled, probe_rows(compiled))
+    except UnsupportedModel as e:
+        logger.warning("⚠️ Not compiling '%s' (unsupported: %s); using the original model", name, e)
+        return model
+    except Exception as e:
+        logger.warning("⚠️ Could not compile '%s': %s; using the original model", name, e)
+        return model
+    if not equivalent:
+        logger.warning("⚠️ Compiled '%s' differs from the original (max abs diff %s); using the original model", name, diff)
+        return model
+    logger.info("✅ Compiled '%s': %d trees, depth %d, max abs diff %.2e", name, len(compiled.roots), compiled.depth, diff)
+    return compiled
+
+
+def _latency(fn, X, repeats: int):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[len(times) // 2] * 1e6, times[int(len(times) * 0.99)] * 1e6
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python compiled_trees.py <model.joblib|model.pkl>")
+        sys.exit(1)
+    import joblib
+    original = joblib.load(sys.argv[1])
+    compiled = compile_xgb(original)
+    probe = probe_rows(compiled)
+    print(f"{len(compiled.roots)} trees, depth {compiled.depth}, {compiled.n_features} features, objective {compiled.objective}")
+    diff, equivalent = check_equivalence(original, compiled, probe)
+    print(f"max abs diff on {len(probe)} probe rows: {diff:.3e} ({'within' if equivalent else 'outside'} tolerance)")
+    for rows in (1, 8, 32):
+        X = probe[:rows]
+        native = _latency(original.predict, X, 2000)
+        fast = _latency(compiled.predict, X, 2000)
+        print(f"{rows:>3} rows  native p50 {native[0]:8.1f} us  p99 {native[1]:8.1f} us   "
+              f"compiled p50 {fast[0]:8.1f} us  p99 {fast[1]:8.1f} us")
@@ -0,0 +1,183 @@
+# database.py
+"""
+The one MongoDB client of the API process.
+
+Pool size, timeouts and write concern come from the environment, the client is opened and
+closed by the FastAPI lifespan, and a pymongo pool listener counts connections and checkout
+waits so the pool can be tuned under load (GET /metrics/db).
+"""
+import os
+import threading
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.write_concern import WriteConcern
+
+# --- MongoDB Config ---
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "stroke_recovery")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+# How long a request waits for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+# "1", "majority", ... ; MONGO_JOURNAL=1 also waits for the journal
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "1")
+MONGO_JOURNAL = os.getenv("MONGO_JOURNAL", "0") == "1"
+
+
+def _write_concern() -> WriteConcern:
+    w = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    return WriteConcern(w=w, j=True if MONGO_JOURNAL else None)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counters fed by pymongo's pool events. Events arrive on driver threads, hence the lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.created = 0
+        self.closed = 0
+        self.pool_clears = 0
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open -= 1
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", 0.0) or 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    # Events we do not count
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_ms_avg": round(1000 * self.checkout_wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_wait_ms_max": round(1000 * self.checkout_wait_max, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+class Database:
+    """
+    Holds the shared client. connect() is called by the lifespan; collections asked for before
+    that (scripts, tests without a lifespan) connect on first use.
+    """
+
+    def __init__(self, url=MONGO_URL, name=MONGO_DB):
+        self.url = url
+        self.name = name
+        self.client = None
+        self.pool = PoolMetrics()
+        self._collections = {}
+
+    def connect(self):
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                self.url,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[self.pool],
+            )
+        return self.client
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self._collections.clear()
+
+    def collection(self, name: str):
+        if name not in self._collections:
+            self._collections[name] = self.connect()[self.name].get_collection(name, write_concern=_write_concern())
+        return self._collections[name]
+
+    @property
+    def users(self):
+        return self.collection("users")
+
+    @property
+    def sessions(self):
+        return self.collection("sessions")
+
+    @property
+    def session_stats(self):
+        return self.collection("session_stats")
+
+    @property
+    def report_jobs(self):
+        return self.collection("report_jobs")
+
+    def metrics(self):
+        return {
+            "database": self.name,
+            "connected": self.client is not None,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "wait_queue_timeout_ms": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "write_concern": _write_concern().document,
+            "pool": self.pool.as_dict(),
+        }
+
+
+db = Database()
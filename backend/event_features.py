@@ -0,0 +1,183 @@
+# event_features.py
+"""
+Keystroke and mouse model features computed on the server from raw event logs, so every
+client is scored on the same definitions. Events arrive columnar (one array per field):
+
+    keystroke:  t      float[n]  event time, ms
+                down   bool[n]   true for key-down, false for key-up
+                key    str[n]    KeyboardEvent.key ("a", " ", "Backspace", "Shift", ...)
+                code   str[n]    optional KeyboardEvent.code ("KeyA", "ShiftLeft", ...)
+                target_text      the sentence the user was asked to type
+
+    mouse:      t, x, y  float[n]  pointer-move samples (ms, px)
+                target   [x, y]    where the movement should end; defaults to the last sample
+                task_type          numeric task code, passed through to the model
+
+The keystroke definitions reproduce what KeystrokeForm.jsx computes in the browser. Every
+feature is one pass of array operations over the whole log, except the text replay behind
+Errors, which follows the text field key by key.
+"""
+import numpy as np
+
+# The sentence KeystrokeForm.jsx asks for
+KEYSTROKE_TEST_SENTENCE = "The quick brown fox jumps over the lazy dog."
+MIN_KEY_EVENTS = 2
+MIN_POINTER_SAMPLES = 3
+
+
+def _column(values, name: str, n: int, dtype=float) -> np.ndarray:
+    arr = np.asarray(values, dtype=dtype)
+    if arr.shape != (n,):
+        raise ValueError(f"'{name}' must be a flat array of {n} values, got shape {arr.shape}")
+    return arr
+
+
+def _mean(values) -> float:
+    return float(values.mean()) if values.size else 0.0
+
+
+def _replay_text(key_down, target_text: str):
+    """
+    Replays key-downs into the text field like KeystrokeForm.jsx: a printable key appends a
+    character unless the text is already as long as the target (the form refuses longer input),
+    Backspace removes the last one. Returns (errors, index of the key-down that first makes the
+    text equal the target, or None). An error is counted when Backspace deletes a character
+    that differs from the target at its position, which is when the browser counts it.
+    A bounded walk, so this one loops over the (few hundred) key-downs.
+    """
+    text = []
+    errors = 0
+    for i, k in enumerate(key_down.tolist()):
+        if k == "Backspace":
+            if text:
+                if text[-1] != target_text[len(text) - 1]:
+                    errors += 1
+                text.pop()
+        elif len(k) == 1 and len(text) < len(target_text):
+            text.append(k)
+            if len(text) == len(target_text) and "".join(text) == target_text:
+                return errors, i
+    return errors, None
+
+
+def keystroke_features(t, down, key, target_text: str = KEYSTROKE_TEST_SENTENCE, code=None) -> dict:
+    """
+    keystroke_model.EXPECTED_FEATURES from a key event log. `code` (KeyboardEvent.code, one per
+    event) pairs key-downs with key-ups the way the browser does; without it events are paired
+    by key, which splits e.g. Shift+a down ("A") from a release after Shift ("a").
+    Raises ValueError on mismatched columns or too few events.
+    """
+    t = np.asarray(t, dtype=float)
+    n = t.shape[0] if t.ndim == 1 else -1
+    if n < MIN_KEY_EVENTS:
+        raise ValueError(f"Need at least {MIN_KEY_EVENTS} key events")
+    down = _column(down, "down", n, dtype=bool)
+    key = _column(key, "key", n, dtype=str)
+    code = key if code is None else _column(code, "code", n, dtype=str)
+    if not target_text:
+        raise ValueError("target_text must not be empty")
+
+    order = np.argsort(t, kind="stable")
+    if (order != np.arange(n)).any():
+        t, down, key, code = t[order], down[order], key[order], code[order]
+
+    # --- Text replay (key-downs only) ---
+    errors, done_at = _replay_text(key[down], target_text)
+    if done_at is not None:
+        # The form disables the field once the text matches: later events, including the
+        # release of the final key, never reach it
+        last = np.flatnonzero(down)[done_at]
+        t, down, key, code = t[:last + 1], down[:last + 1], key[:last + 1], code[:last + 1]
+    # Every Backspace, even on an empty field
+    corrections = int((key[down] == "Backspace").sum())
+
+    # Typing time runs from the first event to the moment the text matches the target (the
+    # browser starts at focus, which is not in the log); an unfinished log ends at its last key-down
+    t_down = t[down]
+    elapsed_min = (t_down[-1] - t[0]) / 60000.0 if t_down.size else 0.0
+    words = len(target_text.split())
+    wpm = words / elapsed_min if elapsed_min > 0 else 0.0
+    cpm = len(target_text) / elapsed_min if elapsed_min > 0 else 0.0
+
+    # --- Dwell: key-up minus the latest unmatched key-down of the same physical key ---
+    codes = np.unique(code, return_inverse=True)[1]
+    by_key = np.lexsort((t, codes))  # grouped by key, in time order within a key
+    k_codes, k_down, k_t = codes[by_key], down[by_key], t[by_key]
+    pairs = (k_codes[1:] == k_codes[:-1]) & k_down[:-1] & ~k_down[1:]
+    dwell = (k_t[1:] - k_t[:-1])[pairs]
+
+    # --- Flight: time between consecutive key-ups, as in the browser ---
+    flight = np.diff(t[~down])
+    consistency = 100.0 - float(np.abs(np.diff(flight)).mean()) if flight.size > 1 else 100.0
+
+    return {
+        "Errors": errors,
+        "CorrectionBehavior": corrections,
+        "TypingSpeed_WPM": wpm,
+        "TypingSpeed_CPM": cpm,
+        "AverageDwellTime": _mean(dwell),
+        "AverageFlightTime": _mean(flight),
+        "Consistency": consistency,
+        "AccuracyScore": 10.0 * (len(target_text) - errors) / len(target_text),
+    }
+
+
+def mouse_features(t, x, y, target=None, task_type: float = 0) -> dict:
+    """
+    The mouse half of mouse_model.EXPECTED_FEATURES from pointer-move samples:
+      distance_error   px from the last sample to the target
+      time_taken_ms    first to last sample
+      path_length_px   summed segment lengths
+      path_efficiency  straight start-to-target distance / path length
+      movement_jerk    mean |d3 position / dt3|, px/s^3
+      log_movement_jerk  log1p(movement_jerk)
+      aiming_error     mean px distance of the samples from the start-to-target line
+    Raises ValueError on mismatched columns or too few samples.
+    """
+    t = np.asarray(t, dtype=float)
+    n = t.shape[0] if t.ndim == 1 else -1
+    if n < MIN_POINTER_SAMPLES:
+        raise ValueError(f"Need at least {MIN_POINTER_SAMPLES} pointer samples")
+    points = np.empty((n, 2))
+    points[:, 0] = _column(x, "x", n)
+    points[:, 1] = _column(y, "y", n)
+
+    order = np.argsort(t, kind="stable")
+    if (order != np.arange(n)).any():
+        t, points = t[order], points[order]
+
+    start, end = points[0], points[-1]
+    goal = end if target is None else _column(target, "target", 2)
+    segments = np.diff(points, axis=0)
+    path_length = float(np.hypot(segments[:, 0], segments[:, 1]).sum())
+    ideal = goal - start
+    ideal_length = float(np.hypot(*ideal))
+
+    # Perpendicular distance of each sample from the start-target line (2D cross product)
+    if ideal_length > 0:
+        offsets = points - start
+        aiming_error = float(np.abs(offsets[:, 0] * ideal[1] - offsets[:, 1] * ideal[0]).mean() / ideal_length)
+    else:
+        aiming_error = 0.0
+
+    # Jerk by finite differences over samples with a time step; repeated timestamps are dropped
+    dt = np.diff(t) / 1000.0
+    moving = dt > 0
+    jerk = 0.0
+    if moving.sum() >= 3:
+        dt = dt[moving]
+        vel = segments[moving] / dt[:, None]
+        acc = np.diff(vel, axis=0) / dt[1:, None]
+        jerk_vec = np.diff(acc, axis=0) / dt[2:, None]
+        jerk = float(np.hypot(jerk_vec[:, 0], jerk_vec[:, 1]).mean())
+
+    return {
+        "distance_error": float(np.hypot(*(end - goal))),
+        "time_taken_ms": float(t[-1] - t[0]),
+        "path_length_px": path_length,
+        "path_efficiency": ideal_length / path_length if path_length > 0 else 0.0,
+        "movement_jerk": jerk,
+        "log_movement_jerk": float(np.log1p(jerk)),
+        "aiming_error": aiming_error,
+        "task_type": float(task_type),
+    }
@@ -0,0 +1,19 @@
+# gunicorn.conf.py
+# Multi-worker deployment that shares the model memory between workers:
+#     gunicorn -c gunicorn.conf.py main:app
+import os
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import main in the master so the models can be loaded once, before fork
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    from model_registry import preload_for_fork, memory_usage
+
+    preload_for_fork()
+    server.log.info(f"Models preloaded in master: {memory_usage()}")
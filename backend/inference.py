@@ -0,0 +1,145 @@
+# inference.py
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from logging_config import request_id_var
+
+# --- Executor Config ---
+# "thread" keeps one copy of the models per API process; "process" sidesteps the GIL
+# for the pandas/NumPy parts at the cost of loading the models in every pool worker.
+# With "process", a model version change recycles the pool (see recycle()).
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", min(4, os.cpu_count() or 1)))
+# Requests allowed to wait for a free worker before new ones are rejected with 503
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", 32))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", 1))
+
+
+class InferenceSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, model_name: str, retry_after: int = INFERENCE_RETRY_AFTER):
+        super().__init__(f"Inference pool saturated ({model_name})")
+        self.model_name = model_name
+        self.retry_after = retry_after
+
+
+def _timed_call(fn, args, request_id):
+    # Runs inside the worker; perf_counter is CLOCK_MONOTONIC so the timestamps are
+    # comparable with the submitting process even for the process pool.
+    # Executors do not carry context variables over, so the request id is passed explicitly.
+    token = request_id_var.set(request_id)
+    try:
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, started, time.perf_counter()
+    finally:
+        request_id_var.reset(token)
+
+
+class ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+
+    def record(self, wait: float, exec_time: float):
+        self.calls += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.exec_total += exec_time
+        self.exec_max = max(self.exec_max, exec_time)
+
+    def as_dict(self):
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "queue_wait_ms_avg": round(1000 * self.wait_total / calls, 3),
+            "queue_wait_ms_max": round(1000 * self.wait_max, 3),
+            "exec_ms_avg": round(1000 * self.exec_total / calls, 3),
+            "exec_ms_max": round(1000 * self.exec_max, 3),
+        }
+
+
+class InferenceExecutor:
+    """
+    Bounded pool that runs the synchronous sklearn/XGBoost predict functions off the event loop.
+    Admission is checked on the event loop thread, so the pending counter needs no lock.
+    """
+
+    def __init__(self, kind=INFERENCE_EXECUTOR, workers=INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.stats = {}
+        self._pool = None
+        # Bumped by recycle(); a result is from the current models only if it is unchanged
+        self.generation = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return self._pool
+
+    def _stats_for(self, model_name: str) -> ModelStats:
+        if model_name not in self.stats:
+            self.stats[model_name] = ModelStats()
+        return self.stats[model_name]
+
+    async def run(self, model_name: str, fn, *args):
+        stats = self._stats_for(model_name)
+        if self.pending >= self.workers + self.max_queue:
+            stats.rejected += 1
+            raise InferenceSaturated(model_name)
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _timed_call, fn, args, request_id_var.get()
+        )
+        # Release the slot when the worker is actually done, not when a caller times out
+        future.add_done_callback(self._release)
+        result, started, finished = await asyncio.shield(future)
+
+        stats.record(started - submitted, finished - started)
+        return result
+
+    def _release(self, future):
+        self.pending -= 1
+
+    def recycle(self):
+        """
+        Replaces a process pool with a fresh one, e.g. after a hot swap: pool workers hold their
+        own registry with the models they loaded first, and new workers load the manifest's
+        active versions. Calls already running finish on the old workers. Event loop thread only.
+        """
+        self.generation += 1
+        if self.kind == "process" and self._pool is not None:
+            old, self._pool = self._pool, None
+            old.shutdown(wait=False)
+
+    def metrics(self):
+        return {
+            "executor": self.kind,
+            "generation": self.generation,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "models": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+inference_executor = InferenceExecutor()
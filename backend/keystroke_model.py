@@ -1,16 +1,23 @@
-import joblib
+import logging
 import numpy as np
 import os
 from pathlib import Path
+from model_registry import registry, load_joblib
+from logging_config import log_sampled
+from compiled_trees import compile_model
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
 
 # Paths
 MODEL_PATH = BASE_DIR / "models" / "keystroke.joblib"
-model = joblib.load(MODEL_PATH)
-print(getattr(model, 'feature_names_in_', 'No feature names stored'))
 
-keystroke_model = joblib.load(MODEL_PATH)
+
+def _load_keystroke_model(files):
+    model = load_joblib(files["model"])
+    logger.debug("Keystroke model features: %s", getattr(model, 'feature_names_in_', 'No feature names stored'))
+    return compile_model(model, "keystroke")
 
 # Define the exact feature order the model was trained on.
 EXPECTED_FEATURES = [
@@ -24,25 +31,53 @@ EXPECTED_FEATURES = [
     'AccuracyScore'
 ]
 
+# Loaded on first prediction (or by the API warm-up task), not at import time.
+# The version served comes from models/manifest.json; MODEL_PATH is the fallback.
+registry.register("keystroke", _load_keystroke_model, {"model": MODEL_PATH}, EXPECTED_FEATURES)
+
 def predict_keystroke(features: dict):
     try:
         if not features:
-            print("❌ No keystroke features received.")
+            logger.warning("❌ No keystroke features received.")
             return None
 
-        print("➡️ Keystroke features received:", features)
+        log_sampled(logger, "➡️ Keystroke features received: %s", features)
 
         # Create the feature vector in the correct order.
         # Use features.get(f, 0) to provide a default value if a feature is missing.
         feature_vector = [features.get(f, 0) for f in EXPECTED_FEATURES]
         X = np.array([feature_vector], dtype=float)
-        print("✅ Keystroke input shape:", X.shape)
+        logger.debug("✅ Keystroke input shape: %s", X.shape)
 
-        y_pred = keystroke_model.predict(X)
+        y_pred = registry.get("keystroke").predict(X)
+        registry.shadow_score("keystroke", lambda candidate: candidate.predict(X), y_pred)
 
-        print("✅ Keystroke prediction:", y_pred)
+        logger.debug("✅ Keystroke prediction: %s", y_pred)
         return float(y_pred[0])
 
     except Exception as e:
-        print("⚠️ Keystroke prediction error:", e)
+        logger.warning("⚠️ Keystroke prediction error: %s", e)
         return None
+
+
+def predict_keystroke_batch(feature_dicts: list):
+    """Scores many feature dicts with a single model call. Empty or failing rows come back as None."""
+    results = [None] * len(feature_dicts)
+    rows = [i for i, features in enumerate(feature_dicts) if features]
+    if not rows:
+        return results
+
+    try:
+        X = np.array([[feature_dicts[i].get(f, 0) for f in EXPECTED_FEATURES] for i in rows], dtype=float)
+        y_pred = registry.get("keystroke").predict(X)
+        registry.shadow_score("keystroke", lambda candidate: candidate.predict(X), y_pred)
+    except Exception as e:
+        # One malformed payload must not fail the whole batch; fall back to row by row
+        logger.warning("⚠️ Keystroke batch prediction error, retrying per row: %s", e)
+        for i in rows:
+            results[i] = predict_keystroke(feature_dicts[i])
+        return results
+
+    for i, y in zip(rows, y_pred):
+        results[i] = float(y)
+    return results
@@ -0,0 +1,73 @@
+# landmark_codec.py
+"""
+Compact binary wire format for webcam landmark clips (content type application/x-landmarks).
+
+All values little-endian:
+    magic           4 bytes   b"LMK1"
+    frames          uint32
+    landmarks       uint16    landmarks per frame (33, or fewer when subsetting)
+    coords          uint16    values per landmark, x and y first (2, 3 with z, 4 with visibility)
+    reserved        uint32    0
+    landmark_ids    uint16[landmarks]  MediaPipe index of each column; only present when
+                               landmarks != 33. Zero-padded to a multiple of 8 bytes.
+    timestamps      float64[frames]    milliseconds, same as the JSON "timestamp" field
+    values          float32[frames * landmarks * coords]
+
+Sending only landmarks 11-16 with coords=2 makes a frame 48 bytes of floats + 8 of timestamp.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"LMK1"
+CONTENT_TYPE = "application/x-landmarks"
+NUM_LANDMARKS = 33
+_HEADER = struct.Struct("<4sIHHI")  # 16 bytes, keeps the float arrays 8-byte aligned
+
+
+def _padded(nbytes: int) -> int:
+    return (nbytes + 7) // 8 * 8
+
+
+def decode_landmarks(body: bytes):
+    """
+    Returns (values, timestamps, landmark_ids) as read-only views over `body` (no copies).
+    landmark_ids is None when all 33 landmarks were sent. Raises ValueError on a malformed body.
+    """
+    if len(body) < _HEADER.size:
+        raise ValueError("Body too short for landmark header")
+    magic, frames, landmarks, coords, _ = _HEADER.unpack_from(body, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a landmark payload (bad magic)")
+    if coords < 2:
+        raise ValueError("At least x and y are required per landmark")
+
+    offset = _HEADER.size
+    landmark_ids = None
+    if landmarks != NUM_LANDMARKS:
+        landmark_ids = np.frombuffer(body, dtype="<u2", count=landmarks, offset=offset)
+        offset += _padded(2 * landmarks)
+
+    expected = offset + 8 * frames + 4 * frames * landmarks * coords
+    if len(body) != expected:
+        raise ValueError(f"Expected {expected} bytes for {frames} frames, got {len(body)}")
+
+    timestamps = np.frombuffer(body, dtype="<f8", count=frames, offset=offset)
+    offset += 8 * frames
+    values = np.frombuffer(body, dtype="<f4", count=frames * landmarks * coords, offset=offset)
+    return values.reshape(frames, landmarks, coords), timestamps, landmark_ids
+
+
+def encode_landmarks(values, timestamps, landmark_ids=None) -> bytes:
+    """Inverse of decode_landmarks, for clients and tooling."""
+    values = np.ascontiguousarray(values, dtype="<f4")
+    frames, landmarks, coords = values.shape
+    parts = [_HEADER.pack(MAGIC, frames, landmarks, coords, 0)]
+    if landmarks != NUM_LANDMARKS:
+        if landmark_ids is None or len(landmark_ids) != landmarks:
+            raise ValueError("landmark_ids must name every landmark column when subsetting")
+        ids = np.asarray(landmark_ids, dtype="<u2").tobytes()
+        parts.append(ids + b"\0" * (_padded(len(ids)) - len(ids)))
+    parts.append(np.ascontiguousarray(timestamps, dtype="<f8").tobytes())
+    parts.append(values.tobytes())
+    return b"".join(parts)
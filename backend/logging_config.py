@@ -0,0 +1,155 @@
+# logging_config.py
+"""
+Logging for the API and the model modules.
+
+- Levels from LOG_LEVEL; LOG_FORMAT=json emits one JSON object per line for the log pipeline.
+- Every record carries the request id of the HTTP request it belongs to (X-Request-ID, set by
+  the middleware in main.py), including records written on inference worker threads.
+- Full payload dumps (feature dicts, feature vectors) go through log_sampled(): DEBUG only, and
+  only for a LOG_DEBUG_SAMPLE_RATE fraction of calls.
+- Handlers only enqueue; a QueueListener thread does the formatting and the stdout write, and
+  records are dropped (and counted) rather than blocking when the queue is full.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+
+# --- Logging Config ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.01))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+_handler = None
+_stream = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id() -> str:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never waits for the writer thread: a full queue drops the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """Installs the queued handler on the root logger and starts the writer thread. Idempotent."""
+    global _listener, _handler, _stream
+    if _handler is None:
+        _stream = logging.StreamHandler(sys.stdout)
+        if LOG_FORMAT == "json":
+            _stream.setFormatter(JsonFormatter())
+        else:
+            _stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+        _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        # Handler filters run in the thread that logs, where the request's context is current
+        _handler.addFilter(RequestIdFilter())
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_handler)
+        # The driver's own DEBUG output would drown ours
+        logging.getLogger("pymongo").setLevel(max(root.level, logging.INFO))
+        # The writer thread does not survive fork (gunicorn preload), so each child starts its own
+        os.register_at_fork(after_in_child=_restart_in_child)
+    if _listener is None:
+        _listener = logging.handlers.QueueListener(_handler.queue, _stream, respect_handler_level=True)
+        _listener.start()
+
+
+def _restart_in_child():
+    global _listener
+    if _listener is not None:
+        _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        _listener = None
+        setup_logging()
+
+
+def shutdown_logging():
+    """Writes out whatever is still queued; called at the end of the API lifespan."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: takes X-Request-ID from the caller (or makes one) and echoes it in the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"")[:64].decode("latin-1")
+        request_id = incoming or new_request_id()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+def log_sampled(logger: logging.Logger, msg: str, *args):
+    """DEBUG-level payload dump for a sample of calls; the arguments are only formatted when it is written."""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_DEBUG_SAMPLE_RATE:
+        logger.debug(msg, *args)
+
+
+def metrics():
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "format": LOG_FORMAT,
+        "debug_sample_rate": LOG_DEBUG_SAMPLE_RATE,
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
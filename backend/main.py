@@ -1,24 +1,110 @@
 import warnings
-from fastapi import FastAPI, HTTPException, Request, Depends, status, File, UploadFile, Query
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, Field, RootModel, EmailStr
-from typing import Dict, Any, Optional
-from motor.motor_asyncio import AsyncIOMotorClient
-import jwt
+import logging
+from fastapi import FastAPI, HTTPException, Request, Depends, File, UploadFile, Query, WebSocket, WebSocketDisconnect
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel, Field, RootModel, EmailStr, field_validator
+from typing import Dict, Any, Optional, List, Literal
 from datetime import datetime, timedelta
+import base64
 from bson import ObjectId
 import os
+import asyncio
+import time
 
-from fastapi.responses import FileResponse
-from sklearn.exceptions import InconsistentVersionWarning
-warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
+import contextlib
+from contextlib import asynccontextmanager
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
+# sklearn's InconsistentVersionWarning, matched by message so sklearn is not imported
+# until the first model is actually unpickled
+warnings.filterwarnings("ignore", message="Trying to unpickle estimator")
 
 from fastapi.middleware.cors import CORSMiddleware
-from keystroke_model import predict_keystroke
-from mouse_model import predict_mouse
-from webcam_models import predict_webcam
-
-app = FastAPI(title="Stroke Recovery Combined API with Auth & Sessions")
+from logging_config import setup_logging, shutdown_logging, RequestIdMiddleware
+import logging_config
+setup_logging()
+logger = logging.getLogger("main")
+
+from keystroke_model import predict_keystroke_batch, EXPECTED_FEATURES as KEYSTROKE_FEATURES
+from mouse_model import predict_mouse_batch, EXPECTED_FEATURES as MOUSE_FEATURES
+from webcam_models import predict_webcam, predict_webcam_batch, features_from_landmark_data, window_params, WebcamModel
+from inference import inference_executor, InferenceSaturated
+from batching import MicroBatcher
+from rescore import score_chunk
+from model_registry import registry, memory_usage
+from streaming import StreamingWebcamSession, FrameError
+from landmark_codec import decode_landmarks, CONTENT_TYPE as LANDMARKS_CONTENT_TYPE
+from event_features import keystroke_features, mouse_features, KEYSTROKE_TEST_SENTENCE
+from webcam_models import features_from_packed_landmarks
+import analytics
+from pdf_store import PdfStore
+from report_generator import ReportGenerator
+from prediction_cache import PredictionCache
+from database import db
+from session_writer import SessionWriter, AnalyticsUpdateFailed
+from auth import (
+    auth_cache, authenticate_user, check_owner, create_access_token, get_admin_user, get_current_user, get_user,
+    hash_password, password_executor, ACCESS_TOKEN_EXPIRE_MINUTES,
+)
+from pymongo.errors import DuplicateKeyError
+import json
+
+# Load the models in the background after startup instead of at import time
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+# How often each worker checks models/manifest.json for new active/shadow versions
+MODEL_MANIFEST_POLL = float(os.getenv("MODEL_MANIFEST_POLL", 30))
+
+async def watch_model_manifest():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(MODEL_MANIFEST_POLL)
+        await loop.run_in_executor(None, registry.refresh)
+
+def log_task_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("❌ Background task %s failed", task.get_name(), exc_info=task.exception())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    loop = asyncio.get_running_loop()
+    # Activation runs on a worker thread; the pool is recycled from the event loop.
+    # Removed at shutdown, so a restarted lifespan does not leave one behind on a closed loop.
+    def recycle_executor(name):
+        loop.call_soon_threadsafe(inference_executor.recycle)
+    registry.add_listener(recycle_executor)
+    if MODEL_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, registry.warm_up)
+    manifest_watcher = asyncio.create_task(watch_model_manifest())
+    db.connect()
+    # In the background: an unreachable Mongo must not hold up startup for the server selection timeout
+    index_task = asyncio.create_task(ensure_indexes())
+    index_task.add_done_callback(log_task_failure)
+    yield
+    registry.remove_listener(recycle_executor)
+    manifest_watcher.cancel()
+    if not index_task.done():
+        # Still waiting on server selection: nothing to finish, the client is about to close
+        index_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await index_task
+    # Queued sessions are written before the Mongo client closes
+    await session_writer.close()
+    inference_executor.shutdown()
+    password_executor.shutdown()
+    report_generator.shutdown()
+    await prediction_cache.close()
+    db.close()
+    shutdown_logging()
+
+app = FastAPI(title="Stroke Recovery Combined API with Auth & Sessions", lifespan=lifespan)
+
+@app.exception_handler(InferenceSaturated)
+async def inference_saturated_handler(request: Request, exc: InferenceSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 origins = [
     "http://localhost:3000",
@@ -31,61 +117,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
 )
-
-MONGO_DETAILS = "mongodb://localhost:27017"
-client = AsyncIOMotorClient(MONGO_DETAILS)
-database = client.stroke_recovery
-user_collection = database.get_collection("users")
-session_collection = database.get_collection("sessions")
+# Tags every log line written while serving a request with its id
+app.add_middleware(RequestIdMiddleware)
 
 PDF_FOLDER = "generated_pdfs"
-os.makedirs(PDF_FOLDER, exist_ok=True)
-
-SECRET_KEY = "your_secret_key"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-async def get_user(username: str):
-    user = await user_collection.find_one({"username": username})
-    return user
-
-async def authenticate_user(username: str, password: str):
-    user = await get_user(username)
-    if not user:
-        return False
-    if user["password"] != password:
-        return False
-    return user
-
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
-
-    user = await get_user(username)
-    if user is None:
-        raise credentials_exception
+pdf_store = PdfStore(PDF_FOLDER)
+report_generator = ReportGenerator(pdf_store, db)
+
+# Saved sessions are grouped into insert_many batches (see session_writer.py)
+session_writer = SessionWriter(db)
+
+# Single-row requests are coalesced into batched model calls
+batchers = {
+    "keystroke": MicroBatcher("keystroke", predict_keystroke_batch),
+    "mouse": MicroBatcher("mouse", predict_mouse_batch),
+    "webcam": MicroBatcher("webcam", predict_webcam_batch),
+}
+
+# Identical feature vectors scored by the same model version are answered from here
+prediction_cache = PredictionCache(
+    {"keystroke": KEYSTROKE_FEATURES, "mouse": MOUSE_FEATURES, "webcam": WebcamModel.FEATURE_NAMES},
+    registry.version,
+)
 
-    return user
+async def predict_cached(name: str, payload):
+    if name == "webcam" and "landmark_data" in payload:
+        if payload.get("window_s"):
+            # A bad window size is the client's error (ValueError, a 400) rather than a failed prediction
+            window_params(payload)
+            # Per-window scores come with their own model calls; the request is one executor call
+            return await inference_executor.run("webcam", predict_webcam, payload)
+        # Clip preprocessing runs as one executor call per clip, so concurrent clips spread over
+        # the pool workers; only the model call is batched (and cached, on the clip's features)
+        payload = await inference_executor.run("webcam_features", features_from_landmark_data, payload["landmark_data"])
+        if payload is None:
+            return None
+    key = prediction_cache.key(name, payload)
+    if key is None:
+        prediction_cache.bypass(name)
+        return await batchers[name].submit(payload)
+    hit, result = await prediction_cache.get(name, key)
+    if hit:
+        return result
+    generation = inference_executor.generation
+    result = await batchers[name].submit(payload)
+    # Failed predictions are not cached so a retry gets a real attempt, and neither is a result
+    # that may come from a pool worker still holding the models from before a version change
+    if result is not None and generation == inference_executor.generation:
+        await prediction_cache.set(key, result)
+    return result
+
+# Per-modality budgets (seconds) for /predict/all
+MODALITY_TIMEOUTS = {
+    "keystroke": float(os.getenv("KEYSTROKE_TIMEOUT", 2.0)),
+    "mouse": float(os.getenv("MOUSE_TIMEOUT", 2.0)),
+    "webcam": float(os.getenv("WEBCAM_TIMEOUT", 10.0)),
+}
 
 class UserSignup(BaseModel):
     email: EmailStr
@@ -109,11 +198,47 @@ class MouseFeatures(RootModel[Dict[str, Any]]):
 class WebcamFeatures(RootModel[Dict[str, Any]]):
     root: Dict[str, Any] = Field(...)
 
+# Largest raw event log accepted by the /events endpoints
+EVENT_LOG_MAX = int(os.getenv("EVENT_LOG_MAX", 100000))
+
+class KeystrokeEvents(BaseModel):
+    """Columnar key event log: t (ms), down (key-down vs key-up), key and optionally code, one entry per event."""
+    t: List[float] = Field(..., max_length=EVENT_LOG_MAX)
+    down: List[bool] = Field(..., max_length=EVENT_LOG_MAX)
+    key: List[str] = Field(..., max_length=EVENT_LOG_MAX)
+    code: Optional[List[str]] = Field(None, max_length=EVENT_LOG_MAX)
+    target_text: str = KEYSTROKE_TEST_SENTENCE
+
+class MouseEvents(BaseModel):
+    """Columnar pointer-move samples: t (ms), x and y (px), one entry per sample."""
+    t: List[float] = Field(..., max_length=EVENT_LOG_MAX)
+    x: List[float] = Field(..., max_length=EVENT_LOG_MAX)
+    y: List[float] = Field(..., max_length=EVENT_LOG_MAX)
+    target: Optional[List[float]] = Field(None, min_length=2, max_length=2)
+    task_type: float = 0
+
 class AllFeatures(BaseModel):
     keystroke_features: Optional[Dict[str, Any]] = None
     mouse_features: Optional[Dict[str, Any]] = None
     webcam_features: Optional[WebcamFeatures] = None
 
+class BatchItem(BaseModel):
+    id: Optional[Any] = None
+    modality: Literal["keystroke", "mouse", "webcam"]
+    features: Dict[str, Any]
+
+# Largest item list accepted by /predict/batch; bigger jobs go through rescore.py
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 10000))
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., max_length=BATCH_MAX_ITEMS)
+    chunk_size: int = Field(256, ge=1, le=4096)
+
+class ReportBatchRequest(BaseModel):
+    session_ids: List[str] = []
+    # Each username adds that patient's most recent session
+    usernames: List[str] = []
+
 class PredictionSession(BaseModel):
     username: str
     final_score: float
@@ -124,11 +249,25 @@ class PredictionSession(BaseModel):
     timestamp: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
     pdf_filename: str
 
+    @field_validator("timestamp")
+    @classmethod
+    def utc_timestamp(cls, value: str) -> str:
+        # Stored as naive UTC isoformat so history queries and analytics can compare strings;
+        # an unparseable timestamp is a 422 here rather than a failure when it is aggregated
+        return analytics.normalize_timestamp(value)
+
 @app.post("/signup", tags=["Auth"], status_code=201)
 async def signup(user: UserSignup):
     if await get_user(user.username):
         raise HTTPException(status_code=400, detail="Username already exists")
-    await user_collection.insert_one(user.dict())
+    doc = user.dict()
+    doc["password"] = await hash_password(user.password)
+    try:
+        await db.users.insert_one(doc)
+    except DuplicateKeyError:
+        # Two signups racing past the check above; the unique index lets only one through
+        raise HTTPException(status_code=400, detail="Username already exists")
+    auth_cache.invalidate_user(user.username)
     return {"message": "User created successfully"}
 
 @app.post("/signin", tags=["Auth"], response_model=Token)
@@ -152,79 +291,428 @@ async def upload_pdf(
     username: str = Query(..., description="Username of the patient"),
     file: UploadFile = File(...)
 ):
-    os.makedirs(PDF_FOLDER, exist_ok=True)
     timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
     filename = f"StrokeReport_{username}_{timestamp}.pdf"
-    file_path = os.path.join(PDF_FOLDER, filename)
+    if pdf_store.path_for(filename) is None:
+        raise HTTPException(status_code=400, detail="Invalid username for a report filename")
 
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Streamed to disk in chunks and stored once per distinct content
+    sha256, deduplicated = await pdf_store.save_upload(file, filename)
+    return {"filename": filename, "sha256": sha256, "deduplicated": deduplicated}
 
-    return {"filename": filename}
+async def ensure_indexes():
+    try:
+        await db.sessions.create_index([("username", 1), ("timestamp", 1), ("_id", 1)])
+    except Exception as e:
+        # Serving must not depend on index creation; the queries still work, only slower
+        logger.warning("⚠️ Could not create session indexes: %s", e)
+    try:
+        # Fails if duplicate usernames already exist; clean those up and restart
+        await db.users.create_index("username", unique=True)
+    except Exception as e:
+        logger.warning("⚠️ Could not create the unique username index: %s", e)
+    try:
+        await report_generator.ensure_indexes()
+    except Exception as e:
+        # Expired report jobs are still hidden by ReportGenerator.job, just not deleted
+        logger.warning("⚠️ Could not create the report job TTL index: %s", e)
 
 @app.post("/sessions", tags=["Sessions"])
 async def save_session(session: PredictionSession):
-    await session_collection.insert_one(session.dict())
-    return {"message": "Session saved"}
+    doc = session.dict()
+    try:
+        await session_writer.submit(doc)
+    except AnalyticsUpdateFailed as e:
+        # Not a 503: the session is stored, and retrying would save it twice
+        raise HTTPException(
+            status_code=500,
+            detail=f"Session saved, but the recovery analytics could not be updated: {e}",
+        )
+    except Exception as e:
+        logger.error("❌ Session not saved: %s", e)
+        raise HTTPException(status_code=503, detail="Session could not be saved, please retry")
+    return {"message": "Session saved" if session_writer.mode == "acknowledged" else "Session queued"}
+
+SESSION_FIELDS = set(PredictionSession.model_fields)
+
+def encode_session_cursor(session: dict) -> str:
+    raw = json.dumps([session["timestamp"], str(session["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_session_cursor(cursor: str):
+    try:
+        timestamp, oid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return timestamp, ObjectId(oid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def iso_utc(value: datetime) -> str:
+    # Stored timestamps are naive UTC isoformat strings, which sort lexicographically
+    return analytics.normalize_timestamp(value)
+
+async def stream_sessions(docs):
+    yield "["
+    first = True
+    async for s in docs:
+        s["id"] = str(s.pop("_id"))
+        yield ("" if first else ",") + json.dumps(s, default=str)
+        first = False
+    yield "]"
+
+async def iterate(items):
+    for item in items:
+        yield item
 
 @app.get("/sessions/{username}", tags=["Sessions"])
-async def get_session_history(username: str):
-    cursor = session_collection.find({"username": username})
-    sessions = []
-    async for s in cursor:
-        s["id"] = str(s["_id"])
-        del s["_id"]
-        sessions.append(s)
-    return sessions
+async def get_session_history(
+    username: str,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to stream the full history"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated session fields to return"),
+    order: Literal["asc", "desc"] = "asc",
+):
+    """
+    Sessions ordered by (timestamp, _id) through the (username, timestamp, _id) index.
+    Pages use keyset pagination: pass the X-Next-Cursor header back as `cursor`.
+    """
+    # Sessions this user saved a moment ago may still be queued for writing
+    await session_writer.flush_user(username)
+    query = {"username": username}
+    time_range = {}
+    if since:
+        time_range["$gte"] = iso_utc(since)
+    if until:
+        time_range["$lt"] = iso_utc(until)
+    if time_range:
+        query["timestamp"] = time_range
+
+    direction = 1 if order == "asc" else -1
+    if cursor:
+        after_ts, after_id = decode_session_cursor(cursor)
+        op = "$gt" if direction == 1 else "$lt"
+        query["$and"] = [{"$or": [
+            {"timestamp": {op: after_ts}},
+            {"timestamp": after_ts, "_id": {op: after_id}},
+        ]}]
+
+    projection = None
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - SESSION_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {sorted(unknown)}")
+        # timestamp is always needed to build the next cursor
+        projection = {f: 1 for f in requested | {"timestamp"}}
+
+    docs = db.sessions.find(query, projection).sort([("timestamp", direction), ("_id", direction)])
+    if limit is None:
+        return StreamingResponse(stream_sessions(docs), media_type="application/json")
+
+    # One extra row tells whether there is a next page; a page is bounded, so it is fine in memory
+    page = await docs.limit(limit + 1).to_list(length=limit + 1)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_session_cursor(page[-1])
+    return StreamingResponse(stream_sessions(iterate(page)), media_type="application/json", headers=headers)
+
+@app.get("/analytics/{username}", tags=["Analytics"])
+async def get_recovery_analytics(username: str, current_user: dict = Depends(get_current_user)):
+    """Score slope, rolling averages and category change, read from the precomputed per-user aggregate."""
+    check_owner(current_user, username)
+    await session_writer.flush_user(username)
+    doc = await db.session_stats.find_one({"_id": username})
+    if doc is None:
+        raise HTTPException(status_code=404, detail="No sessions recorded for this user")
+    return analytics.summarize(doc)
+
+@app.post("/analytics/{username}/rebuild", tags=["Analytics"])
+async def rebuild_recovery_analytics(username: str, current_user: dict = Depends(get_admin_user)):
+    await session_writer.flush_user(username)
+    doc = await analytics.rebuild(db.sessions, db.session_stats, username)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="No sessions recorded for this user")
+    return analytics.summarize(doc)
 
 @app.get("/sessions/pdf/{filename}", tags=["Sessions"])
-async def download_pdf(filename: str):
-    file_path = os.path.join(PDF_FOLDER, filename)
-    if not os.path.exists(file_path):
+async def download_pdf(filename: str, request: Request):
+    stored = await pdf_store.stat(filename)
+    if stored is None:
         raise HTTPException(status_code=404, detail="PDF not found")
-    return FileResponse(path=file_path, filename=filename, media_type="application/pdf")
+    file_path, sha256 = stored
+
+    # The content hash is a strong validator: same ETag means byte-identical report
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse streams the file in chunks and answers Range / If-Range requests itself
+    return FileResponse(path=file_path, filename=filename, media_type="application/pdf", headers=headers)
+
+REPORT_BATCH_MAX = int(os.getenv("REPORT_BATCH_MAX", 1000))
+
+def parse_session_id(session_id: str) -> ObjectId:
+    try:
+        return ObjectId(session_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid session id: {session_id}")
+
+@app.post("/reports/batch", tags=["Reports"], status_code=202)
+async def generate_report_batch(data: ReportBatchRequest, current_user: dict = Depends(get_admin_user)):
+    """Renders many patients' reports in parallel; poll /reports/jobs/{job_id}, then fetch the zip."""
+    if not data.session_ids and not data.usernames:
+        raise HTTPException(status_code=400, detail="Give session_ids and/or usernames")
+    if len(data.session_ids) + len(data.usernames) > REPORT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {REPORT_BATCH_MAX} reports per batch")
+
+    oids = [parse_session_id(sid) for sid in data.session_ids]
+    sessions = {}
+    async for s in db.sessions.find({"_id": {"$in": oids}}):
+        sessions[str(s["_id"])] = s
+    missing = [sid for sid in dict.fromkeys(data.session_ids) if sid not in sessions]
+
+    # Latest session per patient, each a single (username, timestamp, _id) index probe
+    if data.usernames:
+        await session_writer.flush()
+    latest = await asyncio.gather(*(
+        db.sessions.find_one({"username": u}, sort=[("timestamp", -1), ("_id", -1)])
+        for u in dict.fromkeys(data.usernames)
+    ))
+    for username, s in zip(dict.fromkeys(data.usernames), latest):
+        if s is None:
+            missing.append(username)
+        else:
+            sessions[str(s["_id"])] = s
+
+    return (await report_generator.submit(sessions, missing, owner=current_user["username"])).as_dict()
+
+@app.post("/reports/{session_id}", tags=["Reports"], status_code=202)
+async def generate_report(session_id: str, current_user: dict = Depends(get_current_user)):
+    """Starts rendering one stored session's report; the finished PDF is served by /sessions/pdf/{filename}."""
+    session = await db.sessions.find_one({"_id": parse_session_id(session_id)})
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    check_owner(current_user, session.get("username"))
+    return (await report_generator.submit({session_id: session}, owner=current_user["username"])).as_dict()
+
+@app.get("/reports/jobs/{job_id}", tags=["Reports"])
+async def report_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await report_generator.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired report job")
+    check_owner(current_user, job.owner)
+    return job.as_dict()
+
+@app.get("/reports/jobs/{job_id}/archive", tags=["Reports"])
+async def report_job_archive(job_id: str, current_user: dict = Depends(get_admin_user)):
+    job = await report_generator.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired report job")
+    if job.finished is None:
+        raise HTTPException(status_code=409, detail="Report job is still running")
+    data = await report_generator.archive(job)
+    return Response(
+        content=data,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="StrokeReports_{job.id}.zip"'},
+    )
 
 # Prediction endpoints (your existing models) left unchanged
 @app.get("/")
 def home():
     return {"message": "Stroke Recovery Prediction API with Auth & Sessions is running!"}
 
+@app.get("/ready", tags=["Monitoring"])
+async def readiness():
+    models = registry.status()
+    ready = all(m["loaded"] for m in models.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "models": models})
+
 @app.post("/predict/keystroke", tags=["Individual Models"])
 async def predict_keystroke_endpoint(data: KeystrokeFeatures):
     try:
-        score = predict_keystroke(data.root)
+        score = await predict_cached("keystroke", data.root)
         if score is None:
             raise HTTPException(status_code=400, detail="Keystroke prediction failed.")
         return {"keystroke_score": float(score)}
+    except (HTTPException, InferenceSaturated):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Keystroke model error: {str(e)}")
 
+# The mouse model also takes the keystroke inputs; a mouse-only request scores them as 0
+MOUSE_KEYSTROKE_DEFAULTS = {
+    'Errors': 0, 'CorrectionBehavior': 0, 'TypingSpeed_WPM': 0,
+    'TypingSpeed_CPM': 0, 'AverageDwellTime': 0, 'AverageFlightTime': 0,
+    'Consistency': 0, 'AccuracyScore': 0, 'IdleTime_Ratio': 0
+}
+
 @app.post("/predict/mouse", tags=["Individual Models"])
 async def predict_mouse_endpoint(data: MouseFeatures):
     try:
-        defaults = {
-            'Errors': 0, 'CorrectionBehavior': 0, 'TypingSpeed_WPM': 0,
-            'TypingSpeed_CPM': 0, 'AverageDwellTime': 0, 'AverageFlightTime': 0,
-            'Consistency': 0, 'AccuracyScore': 0, 'IdleTime_Ratio': 0
-        }
-        combined = {**defaults, **data.root}
-        score = predict_mouse(combined)
+        combined = {**MOUSE_KEYSTROKE_DEFAULTS, **data.root}
+        score = await predict_cached("mouse", combined)
         return {"mouse_score": float(score)}
+    except InferenceSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mouse model error: {str(e)}")
 
 @app.post("/predict/webcam", tags=["Individual Models"])
 async def predict_webcam_endpoint(data: WebcamFeatures):
     try:
-        result = predict_webcam(data.root)
-        return {
+        result = await predict_cached("webcam", data.root)
+        response = {
             "webcam_score": float(result.get("recovery_score", 0.0)),
             "webcam_class": result.get("class_prediction", "unknown")
         }
+        # Per-window scores when the landmark payload set window_s (and optionally step_s)
+        if "segments" in result:
+            response["segments"] = result["segments"]
+        return response
+    except InferenceSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Webcam model error: {str(e)}")
 
+@app.post("/predict/keystroke/events", tags=["Individual Models"])
+async def predict_keystroke_events_endpoint(data: KeystrokeEvents):
+    """Keystroke prediction from the raw key event log; the features are computed here, not by the client."""
+    try:
+        features = await inference_executor.run(
+            "keystroke_features", keystroke_features, data.t, data.down, data.key, data.target_text, data.code
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    score = await predict_cached("keystroke", features)
+    if score is None:
+        raise HTTPException(status_code=500, detail="Keystroke model error: prediction failed")
+    return {"keystroke_score": float(score), "features": features}
+
+@app.post("/predict/mouse/events", tags=["Individual Models"])
+async def predict_mouse_events_endpoint(data: MouseEvents):
+    """Mouse prediction from raw pointer-move samples; the features are computed here, not by the client."""
+    try:
+        features = await inference_executor.run(
+            "mouse_features", mouse_features, data.t, data.x, data.y, data.target, data.task_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    score = await predict_cached("mouse", {**MOUSE_KEYSTROKE_DEFAULTS, **features})
+    if score is None:
+        raise HTTPException(status_code=500, detail="Mouse model error: prediction failed")
+    return {"mouse_score": float(score), "features": features}
+
+async def run_modality(name: str, payload):
+    """Returns (result, failure reason, elapsed ms); never raises so one modality cannot sink /predict/all."""
+    started = time.perf_counter()
+    reason = None
+    try:
+        result = await asyncio.wait_for(
+            predict_cached(name, payload), timeout=MODALITY_TIMEOUTS[name]
+        )
+        if result is None:
+            reason = "prediction failed"
+    except asyncio.TimeoutError:
+        result, reason = None, f"timed out after {MODALITY_TIMEOUTS[name]}s"
+    except InferenceSaturated:
+        result, reason = None, "inference pool saturated"
+    except Exception as e:
+        result, reason = None, str(e)
+    return result, reason, round((time.perf_counter() - started) * 1000, 3)
+
+@app.post("/predict/webcam/packed", tags=["Individual Models"])
+async def predict_webcam_packed_endpoint(request: Request):
+    """Webcam prediction from the binary landmark format in landmark_codec.py (application/x-landmarks)."""
+    if request.headers.get("content-type", "").split(";")[0].strip() != LANDMARKS_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Expected Content-Type {LANDMARKS_CONTENT_TYPE}")
+    try:
+        values, timestamps, landmark_ids = decode_landmarks(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        features = await inference_executor.run(
+            "webcam_features", features_from_packed_landmarks, values, timestamps, landmark_ids
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if features is None:
+        raise HTTPException(status_code=400, detail="Not enough landmark data to process.")
+
+    result = await predict_cached("webcam", features)
+    if result is None:
+        raise HTTPException(status_code=500, detail="Webcam model error: prediction failed")
+    return {
+        "webcam_score": float(result["recovery_score"]),
+        "webcam_class": result["class_prediction"]
+    }
+
+@app.websocket("/ws/predict/webcam")
+async def stream_webcam_endpoint(websocket: WebSocket):
+    """
+    Send {"landmarks": [...], "timestamp": t} frames (or {"frames": [...]}) while recording,
+    then {"type": "stop"}; the score is sent back and the socket closed. A malformed message
+    or frame is answered with {"error": ...} and skipped; the stream stays open.
+    """
+    await websocket.accept()
+    session = StreamingWebcamSession()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                await websocket.send_json({"error": "Message is not valid JSON"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": "Message must be a JSON object"})
+                continue
+            if message.get("type") == "stop":
+                break
+            frames = message["frames"] if "frames" in message else [message]
+            if not isinstance(frames, list):
+                await websocket.send_json({"error": "frames must be a list"})
+                continue
+            for i, frame in enumerate(frames):
+                try:
+                    session.add_frame(frame)
+                except FrameError as e:
+                    await websocket.send_json({"error": str(e), "frame_index": i})
+    except WebSocketDisconnect:
+        return
+
+    # The kinematics ran frame by frame; this only reads the running statistics
+    features = session.features()
+    if features is None:
+        await websocket.send_json({"error": "Not enough landmark data to process.", "frames": session.frames_received})
+        await websocket.close()
+        return
+
+    try:
+        result = await predict_cached("webcam", features)
+    except InferenceSaturated as e:
+        result = None
+        await websocket.send_json({"error": str(e), "retry_after": e.retry_after})
+    else:
+        if result is None:
+            await websocket.send_json({"error": "Webcam prediction failed."})
+        else:
+            await websocket.send_json({
+                "webcam_score": float(result["recovery_score"]),
+                "webcam_class": result["class_prediction"],
+                "frames": session.frames_received,
+            })
+    await websocket.close()
+
 @app.post("/predict/all", tags=["Combined Model"])
 async def predict_all_endpoint(data: AllFeatures, request: Request):
     try:
@@ -235,12 +723,14 @@ async def predict_all_endpoint(data: AllFeatures, request: Request):
         wc_score = raw.get("webcam_score")
         wc_class = raw.get("webcam_class")
 
+        # Fan the modalities out concurrently; each one has its own timeout
+        jobs = {}
         if ks_score is None and data.keystroke_features:
-            ks_score = predict_keystroke(data.keystroke_features)
+            jobs["keystroke"] = data.keystroke_features
 
         if ms_score is None and data.mouse_features:
             combined_mouse = {**(data.keystroke_features or {}), **data.mouse_features}
-            ms_score = predict_mouse(combined_mouse)
+            jobs["mouse"] = combined_mouse
 
         if wc_score is None:
             webcam_input = (
@@ -248,9 +738,21 @@ async def predict_all_endpoint(data: AllFeatures, request: Request):
                 else raw.get("webcam_features")
             )
             if webcam_input:
-                wc = predict_webcam(webcam_input)
-                wc_score = wc.get("recovery_score")
-                wc_class = wc.get("class_prediction")
+                jobs["webcam"] = webcam_input
+
+        outcomes = await asyncio.gather(
+            *(run_modality(name, payload) for name, payload in jobs.items())
+        )
+        results = dict(zip(jobs, outcomes))
+
+        if "keystroke" in results:
+            ks_score = results["keystroke"][0]
+        if "mouse" in results:
+            ms_score = results["mouse"][0]
+        if "webcam" in results:
+            wc = results["webcam"][0] or {}
+            wc_score = wc.get("recovery_score")
+            wc_class = wc.get("class_prediction")
 
         scores = [s for s in [ks_score, ms_score, wc_score] if s is not None]
         final_score = round(sum(scores) / len(scores), 2) if scores else None
@@ -271,12 +773,130 @@ async def predict_all_endpoint(data: AllFeatures, request: Request):
             "webcam_class": wc_class,
             "final_score": final_score,
             "final_category": final_category,
+            "modality_errors": {name: r[1] for name, r in results.items() if r[1]},
+            "timings_ms": {name: r[2] for name, r in results.items()},
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in /predict/all: {str(e)}")
 
 
+@app.post("/predict/batch", tags=["Combined Model"])
+async def predict_batch_endpoint(data: BatchRequest):
+    rows = [item.dict() for item in data.items]
+    chunks = [rows[i:i + data.chunk_size] for i in range(0, len(rows), data.chunk_size)]
+
+    def failed(chunk, error):
+        return [
+            {"index": i, "id": row["id"], "modality": row["modality"], "error": error}
+            for i, row in enumerate(chunk)
+        ]
+
+    async def score(chunk, before_stream=False):
+        # Any failure becomes error lines for this chunk's items; the stream always runs to the end
+        try:
+            return await inference_executor.run("batch", score_chunk, chunk)
+        except InferenceSaturated:
+            if before_stream:
+                raise
+            return failed(chunk, "inference pool saturated")
+        except Exception as e:
+            logger.error("❌ Batch chunk failed: %s", e)
+            return failed(chunk, f"{type(e).__name__}: {e}")
+
+    # Score the first chunk before streaming starts so a saturated pool is still a clean 503
+    first = await score(chunks[0], before_stream=True) if chunks else []
+
+    async def ndjson():
+        offset = 0
+        for n, chunk in enumerate(chunks):
+            results = first if n == 0 else await score(chunk)
+            for result in results:
+                result["index"] += offset
+                yield json.dumps(result) + "\n"
+            offset += len(chunk)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# Model registry endpoints; changing the active or shadow version needs an admin account
+@app.get("/models", tags=["Models"])
+async def list_models():
+    return registry.status()
+
+@app.post("/models/{name}/activate", tags=["Models"])
+async def activate_model(name: str, version: str = Query(...), current_user: dict = Depends(get_admin_user)):
+    if name not in registry.status():
+        raise HTTPException(status_code=404, detail="Unknown model")
+    try:
+        # Load + verify off the event loop; the swap itself is a single assignment
+        await asyncio.get_running_loop().run_in_executor(None, registry.activate, name, version)
+    except (KeyError, ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.status()[name]
+
+@app.post("/models/{name}/shadow", tags=["Models"])
+async def shadow_model(
+    name: str,
+    version: str = Query(...),
+    sample_rate: float = Query(0.1, ge=0.0, le=1.0),
+    current_user: dict = Depends(get_admin_user),
+):
+    if name not in registry.status():
+        raise HTTPException(status_code=404, detail="Unknown model")
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, registry.set_shadow, name, version, sample_rate)
+    except (KeyError, ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return registry.status()[name]
+
+@app.delete("/models/{name}/shadow", tags=["Models"])
+async def clear_shadow_model(name: str, current_user: dict = Depends(get_admin_user)):
+    if name not in registry.status():
+        raise HTTPException(status_code=404, detail="Unknown model")
+    registry.clear_shadow(name)
+    return registry.status()[name]
+
+
+@app.get("/metrics/memory", tags=["Monitoring"])
+async def memory_metrics():
+    # Per worker: compare pss_kb against rss_kb to see how much model memory is shared
+    return {"memory": memory_usage(), "models": registry.status()}
+
+
+@app.get("/metrics/inference", tags=["Monitoring"])
+async def inference_metrics():
+    metrics = inference_executor.metrics()
+    metrics["batching"] = {name: b.metrics() for name, b in batchers.items()}
+    metrics["reports"] = report_generator.metrics()
+    metrics["prediction_cache"] = prediction_cache.metrics()
+    return metrics
+
+
+@app.get("/metrics/auth", tags=["Monitoring"])
+async def auth_metrics():
+    metrics = auth_cache.metrics()
+    metrics["password_hashing"] = password_executor.metrics()
+    return metrics
+
+
+@app.get("/metrics/logging", tags=["Monitoring"])
+async def logging_metrics():
+    return logging_config.metrics()
+
+
+@app.get("/metrics/db", tags=["Monitoring"])
+async def db_metrics():
+    # checkout_wait_ms_* climbing while checked_out sits at max_pool_size means the pool is too small
+    return db.metrics()
+
+
+@app.get("/metrics/sessions", tags=["Monitoring"])
+async def session_write_metrics():
+    # pending/in_flight near the max queue size, or lag_ms_max far above max_delay_ms, means Mongo is not keeping up
+    return session_writer.metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
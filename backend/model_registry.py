@@ -0,0 +1,375 @@
+# model_registry.py
+"""
+Versioned model registry.
+
+backend/models/manifest.json lists, per model, its versions (files, SHA-256 checksums and
+feature list), the active version and an optional shadow candidate. Models load on first
+use, can be hot-swapped while requests are in flight, and a candidate can be shadow-scored
+on a sample of live traffic.
+
+Add a version from the command line (paths relative to backend/models):
+    python model_registry.py add mouse 2 model=mouse/2/dragdrop_model.joblib
+"""
+import gc
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+MANIFEST_PATH = MODELS_DIR / "manifest.json"
+
+# NumPy arrays inside uncompressed joblib files are memory-mapped read-only, so every
+# worker maps the same page-cache pages. Set MODEL_MMAP_MODE="" to disable.
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+
+def load_joblib(path):
+    """joblib.load that memory-maps arrays when the file allows it (compressed files load normally)."""
+    return joblib.load(path, mmap_mode=MODEL_MMAP_MODE)
+
+
+def sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(path=MANIFEST_PATH) -> dict:
+    if not Path(path).exists():
+        return {"models": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict, path=MANIFEST_PATH):
+    # Write-then-rename so other workers never read a half-written manifest
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+class ShadowStats:
+    def __init__(self, version: str, sample_rate: float):
+        self.version = version
+        self.sample_rate = sample_rate
+        self.rows = 0
+        self.errors = 0
+        self.abs_diff_total = 0.0
+        self.abs_diff_max = 0.0
+
+    def record(self, primary, candidate):
+        for p, c in zip(primary, candidate):
+            diff = abs(float(p) - float(c))
+            self.rows += 1
+            self.abs_diff_total += diff
+            self.abs_diff_max = max(self.abs_diff_max, diff)
+
+    def as_dict(self):
+        return {
+            "version": self.version,
+            "sample_rate": self.sample_rate,
+            "rows": self.rows,
+            "errors": self.errors,
+            "mean_abs_diff": round(self.abs_diff_total / self.rows, 6) if self.rows else None,
+            "max_abs_diff": round(self.abs_diff_max, 6),
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each model on first use instead of at import time.
+    Loading is guarded per model, so concurrent first requests trigger a single load.
+    Swapping a version only replaces the dict entry; requests that already hold the old
+    model object finish with it.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = Path(manifest_path)
+        self._manifest = read_manifest(self.manifest_path)
+        self._manifest_mtime = self._mtime()
+        self._manifest_lock = threading.Lock()
+        self._loaders = {}
+        self._default_files = {}
+        self._features = {}
+        self._models = {}
+        self._versions = {}
+        self._locks = {}
+        self._load_times = {}
+        self._errors = {}
+        self._shadows = {}
+        self._shadow_stats = {}
+        self._shadow_pool = None
+        self._listeners = []
+
+    def _mtime(self):
+        try:
+            return self.manifest_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def register(self, name: str, loader, default_files: dict, features=None):
+        """
+        loader(files) builds the model from a {role: Path} dict. default_files is used while
+        the manifest has no entry for this model; features guards against swapping in a
+        version trained on a different feature list.
+        """
+        self._loaders[name] = loader
+        self._default_files[name] = {role: Path(p) for role, p in default_files.items()}
+        self._features[name] = list(features) if features is not None else None
+        self._locks[name] = threading.Lock()
+
+    def add_listener(self, fn):
+        """fn(name) is called, on the thread that made the change, after a model's active or shadow version changes."""
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        """Stops calling fn; a listener that is not registered is ignored."""
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, name: str):
+        for fn in self._listeners:
+            try:
+                fn(name)
+            except Exception as e:
+                logger.warning("⚠️ Model change listener failed for '%s': %s", name, e)
+
+    # --- Manifest ---
+    def _entry(self, name: str) -> dict:
+        return self._manifest.get("models", {}).get(name, {})
+
+    def active_version(self, name: str):
+        return self._entry(name).get("active")
+
+    def _load_version(self, name: str, version):
+        """Loads and verifies one version without touching what is currently served."""
+        if version is None:
+            files = self._default_files[name]
+        else:
+            spec = self._entry(name).get("versions", {}).get(version)
+            if spec is None:
+                raise KeyError(f"Unknown version '{version}' for model '{name}'")
+            expected_features = self._features[name]
+            if spec.get("features") is not None and expected_features is not None and spec["features"] != expected_features:
+                raise ValueError(f"Model '{name}' version '{version}' was trained on a different feature list")
+            files = {role: MODELS_DIR / rel for role, rel in spec["files"].items()}
+            for role, checksum in spec.get("sha256", {}).items():
+                if checksum and sha256_file(files[role]) != checksum:
+                    raise ValueError(f"Checksum mismatch for model '{name}' version '{version}' ({role})")
+        return self._loaders[name](files)
+
+    # --- Serving ---
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._locks[name]:
+            if name not in self._models:
+                version = self.active_version(name)
+                started = time.perf_counter()
+                try:
+                    model = self._load_version(name, version)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._load_times[name] = time.perf_counter() - started
+                self._errors.pop(name, None)
+                self._versions[name] = version
+                self._models[name] = model
+                logger.info("✅ Loaded model '%s' (version %s) in %.1f ms", name, version, self._load_times[name] * 1000)
+            return self._models[name]
+
+    def version(self, name: str):
+        """Version currently served (or about to be loaded) for this model."""
+        return self._versions.get(name, self.active_version(name))
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """Loads the given (default: all) models; failures are recorded in status() instead of raised."""
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning("⚠️ Could not warm up model '%s': %s", name, e)
+
+    # --- Hot swap ---
+    def activate(self, name: str, version: str, persist: bool = True):
+        """
+        Loads `version` next to the live model, then swaps it in with a single assignment.
+        Slow loading and verification happen before the swap, so serving never pauses.
+        """
+        started = time.perf_counter()
+        model = self._load_version(name, version)
+        with self._locks[name]:
+            self._models[name] = model
+            self._versions[name] = version
+            self._load_times[name] = time.perf_counter() - started
+            self._errors.pop(name, None)
+        if persist:
+            with self._manifest_lock:
+                manifest = read_manifest(self.manifest_path)
+                manifest["models"].setdefault(name, {"versions": {}})["active"] = version
+                write_manifest(manifest, self.manifest_path)
+                self._manifest = manifest
+                self._manifest_mtime = self._mtime()
+        logger.info("🔁 Activated model '%s' version %s", name, version)
+        self._notify(name)
+
+    def refresh(self):
+        """
+        Picks up manifest changes made by another worker or by a deploy: activates new
+        versions and updates shadow settings. Cheap when the manifest is unchanged.
+        """
+        mtime = self._mtime()
+        if mtime is None or mtime == self._manifest_mtime:
+            return
+        previous = self._manifest
+        self._manifest = read_manifest(self.manifest_path)
+        self._manifest_mtime = mtime
+        for name in self._loaders:
+            entry = self._entry(name)
+            try:
+                if name in self._models and entry.get("active") != self._versions.get(name):
+                    self.activate(name, entry.get("active"), persist=False)
+                elif name not in self._models and entry.get("active") != previous.get("models", {}).get(name, {}).get("active"):
+                    # Not loaded here (e.g. only the process pool workers serve it), but they must still switch
+                    self._notify(name)
+                shadow = entry.get("shadow")
+                if shadow and shadow.get("version") != getattr(self._shadow_stats.get(name), "version", None):
+                    self.set_shadow(name, shadow["version"], shadow.get("sample_rate", 0.0), persist=False)
+                elif not shadow and name in self._shadows:
+                    self.clear_shadow(name, persist=False)
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.warning("⚠️ Could not apply manifest change for model '%s': %s", name, e)
+
+    # --- Shadow scoring ---
+    def set_shadow(self, name: str, version: str, sample_rate: float, persist: bool = True):
+        candidate = self._load_version(name, version)
+        self._shadows[name] = candidate
+        self._shadow_stats[name] = ShadowStats(version, sample_rate)
+        if persist:
+            self._persist_shadow(name, {"version": version, "sample_rate": sample_rate})
+        self._notify(name)
+
+    def clear_shadow(self, name: str, persist: bool = True):
+        self._shadows.pop(name, None)
+        self._shadow_stats.pop(name, None)
+        if persist:
+            self._persist_shadow(name, None)
+        self._notify(name)
+
+    def _persist_shadow(self, name: str, shadow):
+        with self._manifest_lock:
+            manifest = read_manifest(self.manifest_path)
+            manifest["models"].setdefault(name, {"versions": {}})["shadow"] = shadow
+            write_manifest(manifest, self.manifest_path)
+            self._manifest = manifest
+            self._manifest_mtime = self._mtime()
+
+    def shadow_score(self, name: str, score_fn, primary_scores):
+        """
+        With the configured probability, runs score_fn(candidate) on a background thread and
+        records how far its scores are from primary_scores. Never delays or fails the caller.
+        """
+        candidate = self._shadows.get(name)
+        stats = self._shadow_stats.get(name)
+        if candidate is None or random.random() >= stats.sample_rate:
+            return
+        if self._shadow_pool is None:
+            self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+        def run():
+            try:
+                stats.record(primary_scores, score_fn(candidate))
+            except Exception:
+                stats.errors += 1
+
+        self._shadow_pool.submit(run)
+
+    def status(self):
+        return {
+            name: {
+                "loaded": name in self._models,
+                "version": self.version(name),
+                "available_versions": sorted(self._entry(name).get("versions", {})),
+                "load_ms": round(self._load_times[name] * 1000, 3) if name in self._load_times else None,
+                "error": self._errors.get(name),
+                "shadow": self._shadow_stats[name].as_dict() if name in self._shadow_stats else None,
+            }
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
+
+
+def preload_for_fork():
+    """
+    Loads every model in the parent process right before workers are forked.
+    Model memory (including the XGBoost/sklearn native buffers) is then shared copy-on-write,
+    and gc.freeze() keeps the collector from touching, and so copying, those pages in the children.
+    """
+    registry.warm_up()
+    gc.freeze()
+
+
+def memory_usage():
+    """Resident memory of this process in kB; Pss splits shared pages across the processes using them."""
+    usage = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[key.lower() + "_kb"] = int(value.split()[0])
+    except OSError:
+        # Not Linux: peak RSS is the best portable figure
+        import resource
+        usage["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def add_version(name: str, version: str, files: dict, features=None, activate=False):
+    """Records a new version in the manifest with checksums computed from the files on disk."""
+    manifest = read_manifest()
+    entry = manifest["models"].setdefault(name, {"active": None, "shadow": None, "versions": {}})
+    entry["versions"][version] = {
+        "files": files,
+        "sha256": {role: sha256_file(MODELS_DIR / rel) for role, rel in files.items()},
+        "features": features,
+        "added": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    if activate or entry["active"] is None:
+        entry["active"] = version
+    write_manifest(manifest)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 5 or sys.argv[1] != "add":
+        print("usage: python model_registry.py add <model> <version> <role>=<path> [...]")
+        sys.exit(1)
+    _, _, model_name, model_version, *file_args = sys.argv
+    # Reuse the current active version's feature list so the new version passes the guard
+    current = read_manifest()["models"].get(model_name, {})
+    current_features = current.get("versions", {}).get(current.get("active"), {}).get("features")
+    add_version(model_name, model_version, dict(arg.split("=", 1) for arg in file_args), current_features)
+    print(f"Added {model_name} version {model_version}")
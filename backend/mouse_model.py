@@ -1,14 +1,18 @@
-import joblib
+import logging
 import numpy as np
 import os
 from pathlib import Path
+from model_registry import registry, load_joblib
+from logging_config import log_sampled
+from compiled_trees import compile_model
+
+logger = logging.getLogger(__name__)
 
 
 BASE_DIR = Path(__file__).resolve().parent
 
 # Paths
 MODEL_PATH = BASE_DIR / "models" / "dragdrop_model.joblib"
-mouse_model = joblib.load(MODEL_PATH)
 
 # Define the exact feature order the model was trained on.
 EXPECTED_FEATURES = [
@@ -34,23 +38,51 @@ EXPECTED_FEATURES = [
     'IdleTime_Ratio' # This is a likely candidate from your features.txt
 ]
 
+# Loaded on first prediction (or by the API warm-up task), not at import time.
+# The version served comes from models/manifest.json; MODEL_PATH is the fallback.
+registry.register("mouse", lambda files: compile_model(load_joblib(files["model"]), "mouse"), {"model": MODEL_PATH}, EXPECTED_FEATURES)
+
 def predict_mouse(features: dict):
     try:
         if not features:
-            print("❌ No mouse features received.")
+            logger.warning("❌ No mouse features received.")
             return None
 
-        print("➡️ Mouse features received:", features)
+        log_sampled(logger, "➡️ Mouse features received: %s", features)
         # Create the feature vector in the correct order.
         feature_vector = [features.get(f, 0) for f in EXPECTED_FEATURES]
         X = np.array([feature_vector], dtype=float)
-        print("✅ Mouse input shape:", X.shape)
+        logger.debug("✅ Mouse input shape: %s", X.shape)
 
-        y_pred = mouse_model.predict(X)
-        print("✅ Mouse prediction:", y_pred)
+        y_pred = registry.get("mouse").predict(X)
+        registry.shadow_score("mouse", lambda candidate: candidate.predict(X), y_pred)
+        logger.debug("✅ Mouse prediction: %s", y_pred)
 
         return float(y_pred[0])
 
     except Exception as e:
-        print("⚠️ Mouse prediction error:", e)
+        logger.warning("⚠️ Mouse prediction error: %s", e)
         return None
+
+
+def predict_mouse_batch(feature_dicts: list):
+    """Scores many feature dicts with a single model call. Empty or failing rows come back as None."""
+    results = [None] * len(feature_dicts)
+    rows = [i for i, features in enumerate(feature_dicts) if features]
+    if not rows:
+        return results
+
+    try:
+        X = np.array([[feature_dicts[i].get(f, 0) for f in EXPECTED_FEATURES] for i in rows], dtype=float)
+        y_pred = registry.get("mouse").predict(X)
+        registry.shadow_score("mouse", lambda candidate: candidate.predict(X), y_pred)
+    except Exception as e:
+        # One malformed payload must not fail the whole batch; fall back to row by row
+        logger.warning("⚠️ Mouse batch prediction error, retrying per row: %s", e)
+        for i in rows:
+            results[i] = predict_mouse(feature_dicts[i])
+        return results
+
+    for i, y in zip(rows, y_pred):
+        results[i] = float(y)
+    return results
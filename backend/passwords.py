@@ -0,0 +1,153 @@
+# passwords.py
+"""
+Password hashing for stored user credentials.
+
+PASSWORD_SCHEME picks scrypt (hashlib, the default, no extra package), argon2 or bcrypt.
+The latter two are optional dependencies:
+    pip install argon2-cffi   # PASSWORD_SCHEME=argon2
+    pip install bcrypt        # PASSWORD_SCHEME=bcrypt
+When the configured scheme's package is not installed, new hashes fall back to scrypt (with
+a warning at the first hash) rather than failing every signup.
+Hashes are self-describing ($argon2id$..., $2b$..., $scrypt$...), so any stored hash can
+still be verified after the scheme or cost changes. needs_rehash() tells the login path to
+upgrade it. Passwords stored in plain text before hashing existed verify too, and always
+need a rehash.
+
+These functions are CPU-bound on purpose; call them from auth.py's password executor, not
+on the event loop.
+"""
+import base64
+import hashlib
+import hmac
+import importlib.util
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# --- Hashing Config ---
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "scrypt")
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+SCRYPT_LOG_N = int(os.getenv("SCRYPT_LOG_N", 15))
+SCRYPT_R = int(os.getenv("SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("SCRYPT_P", 1))
+
+_argon2_hasher = None
+_active_scheme = None
+
+# Scheme -> the module it needs; scrypt only needs hashlib
+_SCHEME_MODULES = {"argon2": "argon2", "bcrypt": "bcrypt"}
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _argon2():
+    global _argon2_hasher
+    if _argon2_hasher is None:
+        from argon2 import PasswordHasher
+        _argon2_hasher = PasswordHasher(
+            time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=ARGON2_PARALLELISM
+        )
+    return _argon2_hasher
+
+
+def _bcrypt_secret(password: str) -> bytes:
+    # bcrypt only looks at the first 72 bytes (and newer versions refuse longer input)
+    return password.encode()[:72]
+
+
+def _scrypt(password: str, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+    n = 1 << log_n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=2 * 128 * n * r + (1 << 20), dklen=32)
+
+
+def _installed(scheme: str) -> bool:
+    module = _SCHEME_MODULES.get(scheme)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def active_scheme() -> str:
+    """The scheme new hashes use: PASSWORD_SCHEME, or scrypt when its package is missing."""
+    global _active_scheme
+    if _active_scheme is None:
+        if PASSWORD_SCHEME not in ("argon2", "bcrypt", "scrypt"):
+            raise ValueError(f"Unknown PASSWORD_SCHEME '{PASSWORD_SCHEME}'")
+        if _installed(PASSWORD_SCHEME):
+            _active_scheme = PASSWORD_SCHEME
+        else:
+            logger.warning(
+                "⚠️ PASSWORD_SCHEME=%s needs the '%s' package, which is not installed; hashing with scrypt",
+                PASSWORD_SCHEME, _SCHEME_MODULES[PASSWORD_SCHEME],
+            )
+            _active_scheme = "scrypt"
+    return _active_scheme
+
+
+def scheme_of(stored: str):
+    if stored.startswith("$argon2"):
+        return "argon2"
+    if stored.startswith(("$2a$", "$2b$", "$2y$")):
+        return "bcrypt"
+    if stored.startswith("$scrypt$"):
+        return "scrypt"
+    return None
+
+
+def hash_password(password: str) -> str:
+    scheme = active_scheme()
+    if scheme == "argon2":
+        return _argon2().hash(password)
+    if scheme == "bcrypt":
+        import bcrypt
+        return bcrypt.hashpw(_bcrypt_secret(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P)
+    return f"$scrypt$ln={SCRYPT_LOG_N},r={SCRYPT_R},p={SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(stored: str, password: str) -> bool:
+    scheme = scheme_of(stored)
+    if scheme is None:
+        # Legacy plain-text record
+        return hmac.compare_digest(stored.encode(), password.encode())
+    if not _installed(scheme):
+        # Made while the package was installed; the account cannot sign in until it is again
+        logger.error("❌ Stored %s hash cannot be verified: the '%s' package is not installed", scheme, _SCHEME_MODULES[scheme])
+        return False
+    if scheme == "argon2":
+        from argon2.exceptions import VerificationError, InvalidHashError
+        try:
+            return _argon2().verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    if scheme == "bcrypt":
+        import bcrypt
+        return bcrypt.checkpw(_bcrypt_secret(password), stored.encode())
+    try:
+        _, _, params, salt, digest = stored.split("$")
+        cost = dict(item.split("=") for item in params.split(","))
+        expected = _scrypt(password, _unb64(salt), int(cost["ln"]), int(cost["r"]), int(cost["p"]))
+    except (ValueError, KeyError):
+        return False
+    return hmac.compare_digest(expected, _unb64(digest))
+
+
+def needs_rehash(stored: str) -> bool:
+    """True when the stored hash is not in the configured scheme and cost."""
+    scheme = scheme_of(stored)
+    if scheme != active_scheme():
+        return True
+    if scheme == "argon2":
+        return _argon2().check_needs_rehash(stored)
+    if scheme == "bcrypt":
+        return int(stored.split("$")[2]) != BCRYPT_ROUNDS
+    return stored.split("$")[2] != f"ln={SCRYPT_LOG_N},r={SCRYPT_R},p={SCRYPT_P}"
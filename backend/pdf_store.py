@@ -0,0 +1,125 @@
+# pdf_store.py
+"""
+Content-addressed storage for report PDFs.
+
+Each distinct PDF is stored once as blobs/<sha256>.pdf. The per-session name the frontend
+knows (StrokeReport_<user>_<ts>.pdf) is a hard link to that blob in the PDF folder, so the
+existing download URLs keep working and re-uploading the same report costs no extra space.
+The digest of every name is kept in index/<name>.sha256 and used as the strong ETag.
+
+All filesystem work runs in worker threads; uploads are hashed and written chunk by chunk.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class PdfStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.index_dir = os.path.join(root, "index")
+        for d in (self.root, self.blob_dir, self.index_dir):
+            os.makedirs(d, exist_ok=True)
+
+    def path_for(self, filename: str):
+        # Names come from the URL; never let them point outside the PDF folder
+        if os.path.basename(filename) != filename or filename.startswith("."):
+            return None
+        return os.path.join(self.root, filename)
+
+    async def save_upload(self, upload, filename: str):
+        """
+        Streams an UploadFile into the store under `filename`.
+        Returns (sha256 hex digest, whether the content was already stored).
+        """
+        digest = hashlib.sha256()
+        fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, dir=self.blob_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+            sha = digest.hexdigest()
+            deduplicated = await asyncio.to_thread(self._commit, tmp_path, sha, filename)
+        except BaseException:
+            await asyncio.to_thread(self._discard, tmp_path)
+            raise
+        return sha, deduplicated
+
+    def _write_bytes(self, data: bytes, sha: str, filename: str) -> bool:
+        fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            return self._commit(tmp_path, sha, filename)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+
+    async def save_bytes(self, data: bytes, filename: str):
+        """Same as save_upload for content already in memory, e.g. a server-rendered report."""
+        sha = hashlib.sha256(data).hexdigest()
+        deduplicated = await asyncio.to_thread(self._write_bytes, data, sha, filename)
+        return sha, deduplicated
+
+    def _discard(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _commit(self, tmp_path: str, sha: str, filename: str) -> bool:
+        blob = os.path.join(self.blob_dir, f"{sha}.pdf")
+        deduplicated = os.path.exists(blob)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, blob)
+
+        target = self.path_for(filename)
+        link_tmp = target + ".link"
+        self._discard(link_tmp)
+        try:
+            os.link(blob, link_tmp)
+        except OSError:
+            # Filesystems without hard links still get a working (if not deduplicated) file
+            shutil.copyfile(blob, link_tmp)
+        os.replace(link_tmp, target)
+        self._write_index(filename, sha)
+        return deduplicated
+
+    def _write_index(self, filename: str, sha: str):
+        index_path = os.path.join(self.index_dir, filename + ".sha256")
+        with open(index_path + ".tmp", "w") as f:
+            f.write(sha)
+        os.replace(index_path + ".tmp", index_path)
+
+    def _stat(self, filename: str):
+        path = self.path_for(filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        index_path = os.path.join(self.index_dir, filename + ".sha256")
+        try:
+            with open(index_path) as f:
+                sha = f.read().strip()
+        except FileNotFoundError:
+            # Reports stored before content addressing: hash once, then remember it
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+            sha = digest.hexdigest()
+            self._write_index(filename, sha)
+        return path, sha
+
+    async def stat(self, filename: str):
+        """(path, sha256) for a stored report, or None if it does not exist."""
+        return await asyncio.to_thread(self._stat, filename)
@@ -1,7 +1,65 @@
 # pose_analysis.py
-import mediapipe as mp
 import numpy as np
-import time
+
+# MediaPipe Pose landmark indices used for the arm kinematics
+L_SHOULDER, R_SHOULDER = 11, 12
+L_ELBOW, R_ELBOW = 13, 14
+L_WRIST, R_WRIST = 15, 16
+
+# Per-frame features produced by process_landmarks / process_landmark_batch
+FRAME_FEATURES = [
+    "Lelbowangle", "Relbowangle", "Lshoulderangle", "Rshoulderangle",
+    "Lshoulderspeed", "Rshoulderspeed", "Langlevel", "Ranglevel",
+    "Lsmoothness", "Rsmoothness", "Lshoulderspeednorm", "Rshoulderspeednorm"
+]
+
+
+# The joints the arm kinematics read, in the order process_landmark_batch uses them
+ARM_JOINTS = [L_SHOULDER, L_ELBOW, L_WRIST, R_SHOULDER, R_ELBOW, R_WRIST]
+
+
+def arm_joints_to_array(landmark_data):
+    """
+    Packs a list of {"landmarks": [...], "timestamp": t} frames into (frames x 6 x 2) ARM_JOINTS
+    positions, a (frames,) timestamp vector and (frames x 6) MediaPipe "visibility" scores, 1.0
+    where a landmark has none (or null). Frames without landmarks or timestamp are skipped, same
+    as the per-frame path; landmarks other than the arm joints are never unpacked.
+    """
+    frames = [f for f in landmark_data if f.get("landmarks") and f.get("timestamp")]
+    values = np.empty((len(frames), len(ARM_JOINTS), 3), dtype=float)
+    timestamps = np.empty(len(frames), dtype=float)
+    for i, frame in enumerate(frames):
+        landmarks = frame["landmarks"]
+        values[i] = [
+            (p['x'], p['y'], 1.0 if p.get('visibility') is None else p['visibility'])
+            for p in (landmarks[j] for j in ARM_JOINTS)
+        ]
+        timestamps[i] = frame["timestamp"]
+    return values[:, :, :2], timestamps, values[:, :, 2]
+
+
+def arm_joint_columns(landmark_ids=None):
+    """
+    Column of each ARM_JOINTS landmark in a landmark array. landmark_ids gives the MediaPipe
+    index of each column when only a subset was sent; by default the columns are the 33 pose landmarks.
+    """
+    if landmark_ids is None:
+        return list(ARM_JOINTS)
+    column = {int(lm): i for i, lm in enumerate(landmark_ids)}
+    missing = [j for j in ARM_JOINTS if j not in column]
+    if missing:
+        raise ValueError(f"Landmarks {missing} are required for the arm kinematics")
+    return [column[j] for j in ARM_JOINTS]
+
+
+def _angle_deg_batch(a, b, c):
+    """Vectorized version of PoseAnalyzer._angle_deg over (..., 2) point arrays."""
+    ba = a - b
+    bc = c - b
+    denom = (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)) + 1e-8
+    cosang = np.clip(np.einsum('...i,...i->...', ba, bc) / denom, -1.0, 1.0)
+    return np.degrees(np.arccos(cosang))
+
 
 class PoseAnalyzer:
     """
@@ -10,10 +68,18 @@ class PoseAnalyzer:
     """
 
     def __init__(self, ema_alpha=0.35):
-        self.mp_pose = mp.solutions.pose
-
         # EMA smoothing for coordinates
         self.ema_alpha = ema_alpha
+        self.reset()
+
+    @property
+    def mp_pose(self):
+        # mediapipe is heavy and the landmark path never needs it, so import on access only
+        import mediapipe as mp
+        return mp.solutions.pose
+
+    def reset(self):
+        """Clears the kinematic state so the next frame starts a new clip."""
         self.ema = {
             "L_sh": None, "L_el": None, "L_wr": None,
             "R_sh": None, "R_el": None, "R_wr": None
@@ -137,4 +203,79 @@ class PoseAnalyzer:
         self.prev_angles["R_elbow"] = R_elbow_angle
         self.prev_time = now
 
-        return features
\ No newline at end of file
+        return features
+
+    def process_landmark_batch(self, coords, timestamps, landmark_ids=None):
+        """
+        Input: (frames x landmarks x coords) landmark array, x and y first, and a (frames,)
+        timestamp vector in ms. landmark_ids gives the MediaPipe index of each landmark column
+        when only a subset was sent; by default the columns are the 33 pose landmarks.
+        Output: A dictionary of per-frame feature arrays, keyed like process_landmarks.
+
+        Computes the whole clip with array operations and starts from a fresh kinematic
+        state, so the result equals feeding every frame to a new PoseAnalyzer.
+        Does not read or modify the streaming state of this instance.
+        """
+        from scipy.signal import lfilter
+
+        timestamps = np.asarray(timestamps, dtype=float)
+        n = len(timestamps)
+
+        joint_ids = arm_joint_columns(landmark_ids)
+        # Only the six arm joints (x, y) are copied out of the input, whatever its dtype or width
+        joints = np.take(np.asarray(coords), joint_ids, axis=1)[:, :, :2].astype(float)
+
+        # EMA smoothing along the time axis: y[t] = a * x[t] + (1 - a) * y[t-1], y[0] = x[0]
+        a = self.ema_alpha
+        ema, _ = lfilter([a], [1.0, -(1 - a)], joints, axis=0, zi=(1 - a) * joints[:1])
+        L_sh, L_el, L_wr = ema[:, 0], ema[:, 1], ema[:, 2]
+        R_sh, R_el, R_wr = ema[:, 3], ema[:, 4], ema[:, 5]
+
+        # Angles
+        L_elbow_angle = _angle_deg_batch(L_sh, L_el, L_wr)
+        R_elbow_angle = _angle_deg_batch(R_sh, R_el, R_wr)
+        L_shoulder_angle = _angle_deg_batch(L_el, L_sh, L_wr)
+        R_shoulder_angle = _angle_deg_batch(R_el, R_sh, R_wr)
+
+        # Frames with a usable time step; the first frame never has one
+        dt = np.zeros(n)
+        dt[1:] = np.diff(timestamps) / 1000.0  # Convert ms to seconds
+        moving = dt > 1e-6
+        dt_m = dt[moving][:, None, None]
+
+        # Velocities come from consecutive EMA positions, while acceleration and jerk
+        # difference against the previous *moving* frame (the state is frozen otherwise).
+        shoulders = ema[:, [0, 3]]
+        disp = np.zeros_like(shoulders)
+        disp[1:] = shoulders[1:] - shoulders[:-1]
+        vel = disp[moving] / dt_m
+        prev_vel = np.zeros_like(vel)
+        prev_vel[1:] = vel[:-1]
+        acc = (vel - prev_vel) / dt_m
+        prev_acc = np.zeros_like(acc)
+        prev_acc[1:] = acc[:-1]
+
+        speed = np.zeros((n, 2))
+        jerk = np.zeros((n, 2))
+        speed[moving] = np.linalg.norm(vel, axis=-1)
+        jerk[moving] = np.linalg.norm((acc - prev_acc) / dt_m, axis=-1)
+
+        # Elbow angular velocity (deg/sec)
+        elbow_angles = np.stack([L_elbow_angle, R_elbow_angle], axis=-1)
+        angle_step = np.zeros((n, 2))
+        angle_step[1:] = np.abs(np.diff(elbow_angles, axis=0))
+        angle_vel = np.zeros((n, 2))
+        angle_vel[moving] = angle_step[moving] / dt[moving][:, None]
+
+        # Normalized speed (speed relative to a body size proxy)
+        body = np.linalg.norm(L_sh - R_sh, axis=-1) + 1e-8
+
+        return {
+            "Lelbowangle": L_elbow_angle, "Relbowangle": R_elbow_angle,
+            "Lshoulderangle": L_shoulder_angle, "Rshoulderangle": R_shoulder_angle,
+            "Lshoulderspeed": speed[:, 0], "Rshoulderspeed": speed[:, 1],
+            "Langlevel": angle_vel[:, 0], "Ranglevel": angle_vel[:, 1],
+            "Lsmoothness": jerk[:, 0], "Rsmoothness": jerk[:, 1],
+            "Lshoulderspeednorm": speed[:, 0] / body,
+            "Rshoulderspeednorm": speed[:, 1] / body
+        }
\ No newline at end of file
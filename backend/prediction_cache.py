@@ -0,0 +1,158 @@
+# prediction_cache.py
+"""
+Result cache in front of the keystroke, mouse and webcam predictors.
+
+The key is a hash of the feature vector in the model's own feature order (EXPECTED_FEATURES /
+FEATURE_NAMES, missing features as 0, exactly as the predictors build it) plus the served
+model version, so a hot swap never returns the old model's score. Entries live in a
+size-bounded LRU with a TTL; with PREDICTION_CACHE_REDIS_URL set, a Redis-compatible server
+is used as a second level shared by all workers.
+
+Lookups run on the event loop thread only, so the LRU needs no lock.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Cache Config ---
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 4096))  # 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 300))
+# e.g. redis://localhost:6379/0 (needs the `redis` package); unset keeps the cache per process
+PREDICTION_CACHE_REDIS_URL = os.getenv("PREDICTION_CACHE_REDIS_URL")
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class PredictionCache:
+    def __init__(self, feature_orders: dict, version_fn, maxsize=PREDICTION_CACHE_SIZE,
+                 ttl=PREDICTION_CACHE_TTL, redis_url=PREDICTION_CACHE_REDIS_URL):
+        """feature_orders maps model name -> feature list; version_fn(name) gives the served version."""
+        self.feature_orders = feature_orders
+        self.version_fn = version_fn
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._entries = OrderedDict()
+        self._redis = None
+        self.evictions = 0
+        self.expired = 0
+        self.redis_errors = 0
+        self.stats = {name: CacheStats() for name in feature_orders}
+
+    def key(self, name: str, features: dict):
+        """Cache key for a feature dict, or None when the payload cannot be cached."""
+        if self.maxsize <= 0 or not features or "landmark_data" in features:
+            # Raw landmark clips are turned into features inside the model; only feature dicts are cached
+            return None
+        try:
+            vector = np.array([features.get(f, 0) for f in self.feature_orders[name]], dtype=float)
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.blake2b(vector.tobytes(), digest_size=16).hexdigest()
+        return f"pred:{name}:{self.version_fn(name)}:{digest}"
+
+    def _get_redis(self):
+        if self._redis is None and self.redis_url:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                logger.warning("⚠️ PREDICTION_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only")
+                self.redis_url = None
+                return None
+            self._redis = redis_asyncio.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, name: str, key: str):
+        """Returns (hit, value)."""
+        stats = self.stats[name]
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                stats.hits += 1
+                return True, value
+            del self._entries[key]
+            self.expired += 1
+
+        shared = self._get_redis()
+        if shared is not None:
+            try:
+                raw = await shared.get(key)
+            except Exception as e:
+                # The shared level is an optimisation; an unreachable server only costs the hit
+                self.redis_errors += 1
+                raw = None
+                logger.warning("⚠️ Prediction cache Redis error: %s", e)
+            if raw is not None:
+                value = json.loads(raw)
+                self._store_local(key, value)
+                stats.hits += 1
+                stats.shared_hits += 1
+                return True, value
+
+        stats.misses += 1
+        return False, None
+
+    def _store_local(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def set(self, key: str, value):
+        self._store_local(key, value)
+        shared = self._get_redis()
+        if shared is not None:
+            try:
+                await shared.set(key, json.dumps(value), ex=max(1, int(self.ttl)))
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("⚠️ Prediction cache Redis error: %s", e)
+
+    def bypass(self, name: str):
+        self.stats[name].bypassed += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "ttl_s": self.ttl,
+            "shared_backend": "redis" if self.redis_url else None,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "redis_errors": self.redis_errors,
+            "models": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
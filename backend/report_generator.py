@@ -0,0 +1,414 @@
+# report_generator.py
+"""
+Server-side rendering of the stroke recovery report (same sections as the frontend's
+StrokeReportPDF.jsx) from a stored PredictionSession.
+
+Reports are rendered by a small, dependency-free PDF writer on a process pool, as background
+jobs that can be polled. The output depends only on the session and REPORT_TEMPLATE_VERSION,
+so it is cached in the PDF store as Report_<session id>_t<version>.pdf: rendering a session
+twice is a file lookup. Bump REPORT_TEMPLATE_VERSION whenever the layout changes.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import textwrap
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# --- Report Config ---
+REPORT_TEMPLATE_VERSION = "1"
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", min(4, os.cpu_count() or 1)))
+# Jobs stay pollable for this long (seconds) after they finish, or after they were created
+# if the worker running them died
+REPORT_JOB_TTL = float(os.getenv("REPORT_JOB_TTL", 3600))
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 40
+
+# Colours from StrokeReportPDF.jsx
+PAGE_BG = (0.976, 0.980, 0.984)      # #f9fafb
+HEADER_BG = (0.118, 0.227, 0.541)    # #1e3a8a
+CARD_BORDER = (0.898, 0.906, 0.922)  # #e5e7eb
+TITLE = (0.118, 0.227, 0.541)        # #1e3a8a
+LABEL = (0.216, 0.255, 0.318)        # #374151
+VALUE = (0.067, 0.094, 0.153)        # #111827
+BAR_FILL = (0.231, 0.510, 0.965)     # #3b82f6
+FOOTER = (0.420, 0.447, 0.502)       # #6b7280
+WHITE = (1, 1, 1)
+
+
+# --- PDF Writer ---
+def _pdf_text(text: str) -> bytes:
+    # Standard 14 fonts with WinAnsiEncoding cover Latin-1 plus a few typographic characters
+    raw = str(text).encode("cp1252", "replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _rgb(color, stroke=False) -> bytes:
+    return ("%.3f %.3f %.3f %s" % (*color, "RG" if stroke else "rg")).encode()
+
+
+class _Canvas:
+    """Collects content-stream operators; y is measured from the top of the page."""
+
+    def __init__(self):
+        self.ops = []
+
+    def rect(self, x, top, width, height, fill, stroke=None):
+        self.ops.append(_rgb(fill))
+        y = PAGE_HEIGHT - top - height
+        if stroke:
+            self.ops.append(_rgb(stroke, stroke=True))
+            self.ops.append(b"%.2f %.2f %.2f %.2f re B" % (x, y, width, height))
+        else:
+            self.ops.append(b"%.2f %.2f %.2f %.2f re f" % (x, y, width, height))
+
+    def text(self, x, top, text, size=12, bold=False, color=VALUE):
+        font = b"F2" if bold else b"F1"
+        self.ops.append(
+            b"BT /%s %d Tf %s %.2f %.2f Td (%s) Tj ET"
+            % (font, size, _rgb(color), x, PAGE_HEIGHT - top - size, _pdf_text(text))
+        )
+
+    def stream(self) -> bytes:
+        return b"\n".join(self.ops)
+
+
+def _pdf_document(content: bytes, title: str) -> bytes:
+    """One A4 page with Helvetica / Helvetica-Bold. No timestamps, so equal input gives equal bytes."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content) + 1, content),
+        b"<< /Title (%s) /Producer (Stroke Recovery Prediction System) >>" % _pdf_text(title),
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\n" % (len(objects) + 1, len(objects)))
+    out.write(b"startxref\n%d\n%%%%EOF\n" % xref)
+    return out.getvalue()
+
+
+# --- Report Template ---
+def _score(value):
+    return float(value) if value is not None else 0.0
+
+
+def render_report(session: dict) -> bytes:
+    """
+    PDF bytes for one session. Runs in the report process pool, so it only takes plain data.
+    The frontend prints the time of rendering; here the session's own timestamp is used, so a
+    report never changes once rendered.
+    """
+    c = _Canvas()
+    content_width = PAGE_WIDTH - 2 * MARGIN
+    c.rect(0, 0, PAGE_WIDTH, PAGE_HEIGHT, PAGE_BG)
+
+    top = MARGIN
+    c.rect(MARGIN, top, content_width, 60, HEADER_BG)
+    c.text(MARGIN + 18, top + 18, "Stroke Recovery Medical Report", size=24, bold=True, color=WHITE)
+    top += 85
+
+    def card(title, height):
+        nonlocal top
+        c.rect(MARGIN, top, content_width, height, WHITE, stroke=CARD_BORDER)
+        c.text(MARGIN + 18, top + 18, title, size=16, bold=True, color=TITLE)
+        body_top = top + 46
+        top += height + 20
+        return body_top
+
+    def row(row_top, label, value):
+        c.text(MARGIN + 18, row_top, label, bold=True, color=LABEL)
+        c.text(MARGIN + 158, row_top, value)
+
+    timestamp = session.get("timestamp") or ""
+    row_top = card("Patient Information", 100)
+    row(row_top, "Name:", session.get("username") or "N/A")
+    row(row_top + 20, "Session Recorded:", timestamp.replace("T", " ")[:19] or "N/A")
+
+    final_score = session.get("final_score")
+    row_top = card("Final Recovery Assessment", 100)
+    row(row_top, "Recovery Rate:", f"{final_score:.2f} %" if final_score else "N/A")
+    row(row_top + 20, "Category:", session.get("final_category") or "N/A")
+
+    bar_top = card("Detailed Scores", 170)
+    bar_width = content_width - 36
+    for label, field in (("Keystroke Score", "keystroke_score"), ("Mouse Score", "mouse_score"), ("Webcam Score", "webcam_score")):
+        value = _score(session.get(field))
+        c.text(MARGIN + 18, bar_top, f"{label}: {value:.2f}%", color=LABEL)
+        c.rect(MARGIN + 18, bar_top + 18, bar_width, 12, CARD_BORDER)
+        c.rect(MARGIN + 18, bar_top + 18, bar_width * min(max(value, 0.0) / 100, 1.0), 12, BAR_FILL)
+        bar_top += 40
+
+    paragraph = (
+        f"Based on the above metrics, the patient exhibits {session.get('final_category') or 'an unknown'} "
+        "level of motor recovery. It is recommended to continue consistent physiotherapy and "
+        "digital rehabilitation sessions for best results."
+    )
+    lines = textwrap.wrap(paragraph, width=85)
+    line_top = card("Interpretation & Recommendations", 60 + 16 * len(lines))
+    for line in lines:
+        c.text(MARGIN + 18, line_top, line, size=11)
+        line_top += 16
+
+    year = timestamp[:4] if timestamp[:4].isdigit() else str(datetime.utcnow().year)
+    c.text(MARGIN + 90, PAGE_HEIGHT - 40, f"© {year} Stroke Recovery Prediction System — Confidential Medical Report.", size=10, color=FOOTER)
+
+    return _pdf_document(c.stream(), f"Stroke Recovery Report - {session.get('username', '')}")
+
+
+def report_filename(session_id: str) -> str:
+    return f"Report_{session_id}_t{REPORT_TEMPLATE_VERSION}.pdf"
+
+
+def _plain_session(session: dict) -> dict:
+    # Only picklable fields cross into the pool
+    fields = ("username", "timestamp", "final_score", "final_category", "keystroke_score", "mouse_score", "webcam_score")
+    return {f: session.get(f) for f in fields}
+
+
+# --- Jobs ---
+class ReportJob:
+    def __init__(self, session_ids, job_id=None, created=None, owner=None):
+        self.id = job_id or uuid.uuid4().hex
+        # Username that started the job; only they (or an admin) may poll it
+        self.owner = owner
+        self.status = "queued"
+        self.created = created or time.time()
+        self.finished = None
+        self.results = {sid: {"session_id": sid, "status": "queued"} for sid in session_ids}
+        # Position of each result in the stored document's results array
+        self._positions = {sid: i for i, sid in enumerate(self.results)}
+
+    def as_dict(self):
+        results = list(self.results.values())
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "template_version": REPORT_TEMPLATE_VERSION,
+            "total": len(results),
+            "done": sum(r["status"] == "done" for r in results),
+            "failed": sum(r["status"] == "failed" for r in results),
+            "created": datetime.utcfromtimestamp(self.created).isoformat(),
+            "finished": datetime.utcfromtimestamp(self.finished).isoformat() if self.finished else None,
+            "results": results,
+        }
+
+    def to_doc(self, ttl: float) -> dict:
+        return {
+            "_id": self.id,
+            "owner": self.owner,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "results": list(self.results.values()),
+            "expires_at": _expiry(self.finished or self.created, ttl),
+        }
+
+    @classmethod
+    def from_doc(cls, doc: dict):
+        job = cls([], job_id=doc["_id"], created=doc["created"], owner=doc.get("owner"))
+        job.status = doc["status"]
+        job.finished = doc.get("finished")
+        job.results = {r["session_id"]: r for r in doc.get("results", [])}
+        return job
+
+
+def _expiry(since: float, ttl: float) -> datetime:
+    # A TTL index on expires_at removes the job document (naive datetimes are read as UTC)
+    return datetime.utcfromtimestamp(since + ttl)
+
+
+class ReportGenerator:
+    """
+    Renders reports on a process pool. Jobs run in the API worker that accepted them and their
+    state is written to the report_jobs collection, so any worker can answer a poll; the PDFs
+    themselves are in the shared PDF store. Concurrent requests for the same uncached report
+    in one worker share a single render.
+    """
+
+    def __init__(self, store, database, workers=REPORT_WORKERS, job_ttl=REPORT_JOB_TTL):
+        self.store = store
+        self.db = database
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self._inflight = {}
+        self._pool = None
+        self.rendered = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.job_store_errors = 0
+        self.render_total = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: the renderer needs only the stdlib, so workers start small instead of
+            # forking the API process with its models and threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def render(self, session_id: str, session: dict):
+        """Returns (filename, cached)."""
+        filename = report_filename(session_id)
+        if await self.store.stat(filename) is not None:
+            self.cache_hits += 1
+            return filename, True
+
+        inflight = self._inflight.get(filename)
+        if inflight is not None:
+            await asyncio.shield(inflight)
+            return filename, False
+
+        loop = asyncio.get_running_loop()
+        inflight = loop.create_future()
+        self._inflight[filename] = inflight
+        try:
+            started = time.perf_counter()
+            pool = self._get_pool()
+            try:
+                data = await loop.run_in_executor(pool, render_report, _plain_session(session))
+            except BrokenProcessPool:
+                # A crashed worker poisons the whole pool; start a fresh one for later renders
+                if self._pool is pool:
+                    self._pool = None
+                raise
+            await self.store.save_bytes(data, filename)
+            self.rendered += 1
+            self.render_total += time.perf_counter() - started
+            inflight.set_result(filename)
+        except Exception as e:
+            inflight.set_exception(e)
+            # Mark it retrieved: without waiters the error would be logged as never retrieved
+            inflight.exception()
+            raise
+        finally:
+            if not inflight.done():
+                inflight.cancel()
+            self._inflight.pop(filename, None)
+        return filename, False
+
+    async def ensure_indexes(self):
+        await self.db.report_jobs.create_index("expires_at", expireAfterSeconds=0)
+
+    async def submit(self, sessions: dict, missing=(), owner=None):
+        """
+        Starts a job rendering every {session_id: session} in parallel; ids in `missing` are
+        reported as failed. Returns the job once it is stored, before anything is rendered.
+        """
+        self._prune()
+        job = ReportJob(list(sessions) + list(missing), owner=owner)
+        for sid in missing:
+            job.results[sid].update(status="failed", error="Session not found")
+            self.failures += 1
+        # Stored first, so a poll landing on another worker right away finds the job
+        await self.db.report_jobs.insert_one(job.to_doc(self.job_ttl))
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, sessions))
+        return job
+
+    async def _update(self, job: ReportJob, fields: dict):
+        # Progress updates are best effort: the job still finishes and this worker still answers
+        try:
+            await self.db.report_jobs.update_one({"_id": job.id}, {"$set": fields})
+        except Exception as e:
+            self.job_store_errors += 1
+            logger.warning("⚠️ Could not update report job %s: %s", job.id, e)
+
+    async def _run(self, job: ReportJob, sessions: dict):
+        job.status = "running"
+        await self._update(job, {"status": job.status})
+
+        async def one(sid, session):
+            result = job.results[sid]
+            result["username"] = session.get("username")
+            result["status"] = "running"
+            try:
+                filename, cached = await self.render(sid, session)
+                result.update(status="done", filename=filename, cached=cached)
+            except Exception as e:
+                self.failures += 1
+                result.update(status="failed", error=str(e))
+            await self._update(job, {f"results.{job._positions[sid]}": result})
+
+        # The pool bounds actual parallelism; the rest wait in its queue
+        await asyncio.gather(*(one(sid, s) for sid, s in sessions.items()))
+        job.finished = time.time()
+        job.status = "failed" if job.results and all(r["status"] == "failed" for r in job.results.values()) else "done"
+        await self._update(job, {
+            "status": job.status,
+            "finished": job.finished,
+            "results": list(job.results.values()),
+            "expires_at": _expiry(job.finished, self.job_ttl),
+        })
+
+    async def job(self, job_id: str):
+        """The job from this worker's memory if it runs here, otherwise from the report_jobs collection."""
+        self._prune()
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        doc = await self.db.report_jobs.find_one({"_id": job_id})
+        # The TTL monitor only runs once a minute
+        if doc is None or doc["expires_at"] < datetime.utcnow():
+            return None
+        return ReportJob.from_doc(doc)
+
+    def _prune(self):
+        # Kept until they expire, in case the final update did not reach the collection
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def _zip(self, job: ReportJob) -> bytes:
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+            for result in job.results.values():
+                if result["status"] != "done":
+                    continue
+                path = self.store.path_for(result["filename"])
+                archive.write(path, arcname=f"{result['username']}_{result['session_id']}.pdf")
+        return out.getvalue()
+
+    async def archive(self, job: ReportJob) -> bytes:
+        """Zip of every successfully rendered report in a finished job."""
+        return await asyncio.to_thread(self._zip, job)
+
+    def metrics(self):
+        statuses = [j.status for j in self.jobs.values()]
+        return {
+            "template_version": REPORT_TEMPLATE_VERSION,
+            "workers": self.workers,
+            "rendered": self.rendered,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "job_store_errors": self.job_store_errors,
+            "render_ms_avg": round(1000 * self.render_total / self.rendered, 3) if self.rendered else None,
+            "in_flight": len(self._inflight),
+            "jobs": {s: statuses.count(s) for s in ("queued", "running", "done", "failed")},
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,150 @@
+# rescore.py
+"""
+Offline re-scoring of stored feature payloads, e.g. after a model update.
+
+    python rescore.py sessions.jsonl -o scores.jsonl --workers 4 --chunk-size 512
+
+Input rows are JSONL or Parquet with a "modality" column (keystroke, mouse or webcam),
+an optional "id", and either a "features" object or the feature columns themselves.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+MODALITIES = ("keystroke", "mouse", "webcam")
+META_COLUMNS = ("id", "modality", "features")
+
+
+def _batch_function(modality: str):
+    # Imported on demand so a worker only loads the models it actually needs
+    if modality == "keystroke":
+        from keystroke_model import predict_keystroke_batch
+        return predict_keystroke_batch
+    if modality == "mouse":
+        from mouse_model import predict_mouse_batch
+        return predict_mouse_batch
+    from webcam_models import predict_webcam_batch
+    return predict_webcam_batch
+
+
+def _score_row(batch_fn, features):
+    try:
+        return batch_fn([features])[0]
+    except Exception as e:
+        return e
+
+
+def score_chunk(rows: list) -> list:
+    """
+    Scores a chunk of {"modality", "features", "id"} rows with one batched call per modality.
+    Returns one result dict per row, in input order.
+    """
+    results = [None] * len(rows)
+    by_modality = {}
+    for i, row in enumerate(rows):
+        modality = row.get("modality")
+        if modality not in MODALITIES:
+            results[i] = {"index": i, "id": row.get("id"), "modality": modality, "error": "unknown modality"}
+            continue
+        by_modality.setdefault(modality, []).append(i)
+
+    for modality, indices in by_modality.items():
+        batch_fn = _batch_function(modality)
+        try:
+            predictions = batch_fn([rows[i]["features"] for i in indices])
+        except Exception:
+            # One bad row must not fail the chunk: score row by row and report the ones that raise
+            predictions = [_score_row(batch_fn, rows[i]["features"]) for i in indices]
+        for i, prediction in zip(indices, predictions):
+            result = {"index": i, "id": rows[i].get("id"), "modality": modality}
+            if isinstance(prediction, Exception):
+                result["error"] = f"{type(prediction).__name__}: {prediction}"
+            elif prediction is None:
+                result["error"] = "prediction failed"
+            elif modality == "webcam":
+                result["score"] = prediction["recovery_score"]
+                result["class"] = prediction["class_prediction"]
+            else:
+                result["score"] = prediction
+            results[i] = result
+    return results
+
+
+def normalize_row(row: dict) -> dict:
+    """Accepts both {"modality", "features": {...}} and flat rows with the feature columns inline."""
+    features = row.get("features")
+    if isinstance(features, str):
+        features = json.loads(features)
+    if features is None:
+        features = {k: v for k, v in row.items() if k not in META_COLUMNS}
+    return {"id": row.get("id"), "modality": row.get("modality"), "features": features}
+
+
+def read_rows(path: str):
+    if path.endswith(".parquet"):
+        import pandas as pd
+        for row in pd.read_parquet(path).to_dict(orient="records"):
+            yield normalize_row(row)
+        return
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield normalize_row(json.loads(line))
+
+
+def chunked(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored feature payloads with the current models.")
+    parser.add_argument("input", help="JSONL or .parquet file")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    workers = args.workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    total = 0
+
+    def write(chunk_results):
+        nonlocal total
+        for result in chunk_results:
+            result["index"] += total
+            out.write(json.dumps(result) + "\n")
+        total += len(chunk_results)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bounded window of in-flight chunks keeps memory flat; draining from the left keeps input order
+            in_flight = deque()
+            for chunk in chunked(read_rows(args.input), args.chunk_size):
+                in_flight.append(pool.submit(score_chunk, chunk))
+                if len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().result())
+            while in_flight:
+                write(in_flight.popleft().result())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} rows/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
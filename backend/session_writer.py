@@ -0,0 +1,248 @@
+# session_writer.py
+"""
+Write-behind queue for saved prediction sessions.
+
+POST /sessions enqueues the document; the queue is written with one insert_many per batch,
+when SESSION_WRITE_BATCH_SIZE documents are waiting or SESSION_WRITE_MAX_DELAY_MS after the
+first one arrived, whichever comes first. In acknowledged mode a session that arrives while
+nothing is queued or being written goes out at once, and whatever queued up behind a write
+goes out as soon as it finishes, so the delay only applies under load. The per-user
+analytics aggregate is then updated for the inserted documents in one ordered bulk write,
+so it only ever counts stored sessions.
+
+SESSION_WRITE_MODE:
+- "acknowledged": the request waits until its batch is stored (errors reach the client,
+  including an AnalyticsUpdateFailed when the session was stored but its aggregate was not).
+- "fire_and_forget": the request returns once the session is queued; failed batches are
+  retried, then logged and counted. A full queue makes callers wait instead of growing.
+
+Readers of a user's history call flush_user() first, so a patient always sees their own
+sessions; other users' sessions stay queued. Everything runs on the event loop thread, so
+no locks are needed.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+import analytics
+
+logger = logging.getLogger(__name__)
+
+# --- Write-behind Config ---
+SESSION_WRITE_MODE = os.getenv("SESSION_WRITE_MODE", "acknowledged")
+SESSION_WRITE_BATCH_SIZE = int(os.getenv("SESSION_WRITE_BATCH_SIZE", 100))
+SESSION_WRITE_MAX_DELAY_MS = float(os.getenv("SESSION_WRITE_MAX_DELAY_MS", 50))
+SESSION_WRITE_MAX_QUEUE = int(os.getenv("SESSION_WRITE_MAX_QUEUE", 10000))
+SESSION_WRITE_RETRIES = int(os.getenv("SESSION_WRITE_RETRIES", 3))
+
+_DUPLICATE_KEY = 11000
+
+
+class AnalyticsUpdateFailed(Exception):
+    """The session was stored, but folding it into the user's analytics aggregate failed."""
+
+
+class SessionWriter:
+    def __init__(self, database, mode=SESSION_WRITE_MODE, batch_size=SESSION_WRITE_BATCH_SIZE,
+                 max_delay_ms=SESSION_WRITE_MAX_DELAY_MS, max_queue=SESSION_WRITE_MAX_QUEUE,
+                 retries=SESSION_WRITE_RETRIES):
+        if mode not in ("acknowledged", "fire_and_forget"):
+            raise ValueError(f"Unknown SESSION_WRITE_MODE '{mode}'")
+        self.db = database
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_queue = max_queue
+        self.retries = retries
+        self._docs = []
+        self._waiters = []
+        self._queued_at = []
+        self._timer = None
+        self._writes = set()
+        self._closed = False
+        # metrics
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.analytics_failures = 0
+        self.last_analytics_error = None
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.retried = 0
+        self.backpressure_waits = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self._docs)
+
+    async def submit(self, doc: dict):
+        """Queues one session document; in acknowledged mode, returns once it is stored."""
+        if self._closed:
+            raise RuntimeError("Session writer is shut down")
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._docs.append(doc)
+        self._waiters.append(waiter)
+        self._queued_at.append(time.monotonic())
+        self.queued += 1
+
+        if len(self._docs) >= self.batch_size:
+            self._flush_now()
+        elif self.mode == "acknowledged" and not self._writes:
+            # Idle: waiting for company would only add latency to this request
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_now)
+
+        if self.mode == "acknowledged":
+            return await waiter
+        if self.pending + self._in_flight() > self.max_queue:
+            # Back-pressure: this caller waits for its own batch rather than letting the queue grow
+            self.backpressure_waits += 1
+            await asyncio.shield(waiter)
+
+    def _in_flight(self) -> int:
+        return sum(size for _, size, _ in self._writes)
+
+    def _flush_now(self, indices=None):
+        """Starts writing the queue, or only the queued documents at `indices`."""
+        if indices is None:
+            docs, waiters, queued_at = self._docs, self._waiters, self._queued_at
+            self._docs, self._waiters, self._queued_at = [], [], []
+        else:
+            take = set(indices)
+            docs, waiters, queued_at = ([item for i, item in enumerate(column) if i in take]
+                                        for column in (self._docs, self._waiters, self._queued_at))
+            self._docs, self._waiters, self._queued_at = ([item for i, item in enumerate(column) if i not in take]
+                                                          for column in (self._docs, self._waiters, self._queued_at))
+        if self._timer is not None and not self._docs:
+            self._timer.cancel()
+            self._timer = None
+        if docs:
+            task = asyncio.ensure_future(self._write_batch(docs, waiters, queued_at))
+            entry = (task, len(docs), frozenset(doc.get("username") for doc in docs))
+            self._writes.add(entry)
+            task.add_done_callback(lambda _: self._write_done(entry))
+
+    def _write_done(self, entry):
+        self._writes.discard(entry)
+        if self.mode == "acknowledged" and self._docs and not self._writes:
+            # What queued up behind this write goes out now rather than at the timer
+            self._flush_now()
+
+    async def _insert(self, docs):
+        """insert_many with retries. Returns (indices of the stored documents, last error or None)."""
+        remaining = list(range(len(docs)))
+        stored = set()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(0.1 * 2 ** attempt)
+            try:
+                await self.db.sessions.insert_many([docs[i] for i in remaining], ordered=False)
+                return stored.union(remaining), None
+            except BulkWriteError as e:
+                # insert_many sets each _id before sending, so documents stored by an earlier
+                # attempt come back as duplicates; those count as written
+                failed = {
+                    remaining[err["index"]] for err in e.details.get("writeErrors", [])
+                    if err.get("code") != _DUPLICATE_KEY
+                }
+                stored.update(i for i in remaining if i not in failed)
+                remaining = [i for i in remaining if i in failed]
+                error = e
+                if not remaining:
+                    return stored, None
+            except PyMongoError as e:
+                error = e
+        return stored, error
+
+    async def _write_batch(self, docs, waiters, queued_at):
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(docs))
+        stored, error = await self._insert(docs)
+
+        now = time.monotonic()
+        for i in stored:
+            lag = now - queued_at[i]
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+        self.written += len(stored)
+        if error is not None:
+            self.failed += len(docs) - len(stored)
+            logger.error("❌ Could not store %d session(s): %s", len(docs) - len(stored), error)
+
+        analytics_error = None
+        if stored:
+            try:
+                await analytics.record_sessions(self.db.session_stats, [docs[i] for i in sorted(stored)])
+            except Exception as e:
+                # The sessions are stored; POST /analytics/{username}/rebuild repairs the aggregate.
+                # Logged with the traceback so the alerting on ERROR records sees the cause.
+                self.analytics_failures += 1
+                self.last_analytics_error = f"{type(e).__name__}: {e}"
+                users = sorted({docs[i].get("username") for i in stored}, key=str)
+                logger.exception("❌ Analytics update failed for %d stored session(s) of %s", len(stored), users)
+                analytics_error = AnalyticsUpdateFailed(str(e))
+
+        for i, waiter in enumerate(waiters):
+            if waiter.done():
+                continue
+            if i in stored and analytics_error is not None:
+                waiter.set_exception(analytics_error)
+                waiter.exception()
+            elif i in stored:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+                # Nobody awaits a fire-and-forget waiter; mark the exception as retrieved
+                waiter.exception()
+
+    async def flush(self):
+        """Writes everything queued so far and waits for all writes in progress."""
+        self._flush_now()
+        if self._writes:
+            await asyncio.gather(*(task for task, _, _ in list(self._writes)), return_exceptions=True)
+
+    async def flush_user(self, username: str):
+        """Writes the user's queued sessions and waits for every write holding one of them."""
+        mine = [i for i, doc in enumerate(self._docs) if doc.get("username") == username]
+        if mine:
+            self._flush_now(mine)
+        tasks = [task for task, _, users in self._writes if username in users]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        """Stops accepting sessions and writes out the queue; called from the API lifespan."""
+        self._closed = True
+        await self.flush()
+        if self.failed:
+            logger.warning("⚠️ %d session(s) could not be stored during this run", self.failed)
+
+    def metrics(self):
+        return {
+            "mode": self.mode,
+            "batch_size": self.batch_size,
+            "max_delay_ms": self.max_delay * 1000.0,
+            "pending": self.pending,
+            "in_flight": self._in_flight(),
+            "queued": self.queued,
+            "written": self.written,
+            "failed": self.failed,
+            "analytics_failures": self.analytics_failures,
+            "last_analytics_error": self.last_analytics_error,
+            "batches": self.batches,
+            "avg_batch_size": round((self.written + self.failed) / self.batches, 2) if self.batches else None,
+            "max_batch_seen": self.max_batch_seen,
+            "retried_batches": self.retried,
+            "backpressure_waits": self.backpressure_waits,
+            "lag_ms_avg": round(self.lag_total / self.written * 1000.0, 3) if self.written else None,
+            "lag_ms_max": round(self.lag_max * 1000.0, 3),
+        }
@@ -0,0 +1,104 @@
+# streaming.py
+import logging
+import math
+import os
+
+import numpy as np
+
+try:
+    from .pose_analysis import PoseAnalyzer, ARM_JOINTS, FRAME_FEATURES
+    from .webcam_models import FrameSelector, RunningColumnStats, feature_plan, MIN_CLIP_FRAMES
+except ImportError:
+    from pose_analysis import PoseAnalyzer, ARM_JOINTS, FRAME_FEATURES
+    from webcam_models import FrameSelector, RunningColumnStats, feature_plan, MIN_CLIP_FRAMES
+
+logger = logging.getLogger(__name__)
+
+# Selected frames per connection (20 minutes at 30 fps); later frames are answered with an error frame
+WEBCAM_STREAM_MAX_FRAMES = int(os.getenv("WEBCAM_STREAM_MAX_FRAMES", 36000))
+
+# A frame must reach the last arm joint (right wrist) for the kinematics
+MIN_LANDMARKS = max(ARM_JOINTS) + 1
+
+
+class FrameError(ValueError):
+    """A streamed frame that cannot be used; the client gets an error frame and can continue."""
+
+
+def _number(value, what: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise FrameError(f"{what} must be a finite number")
+    return float(value)
+
+
+def parse_frame(frame):
+    """
+    (timestamp, arm joints (6 x 2), visibility (6,)) for one {"landmarks": [...], "timestamp": t}
+    frame, or None for a frame without landmarks or timestamp, which the whole-clip path skips too.
+    Raises FrameError for anything malformed. A missing or null visibility counts as 1.0.
+    """
+    if not isinstance(frame, dict):
+        raise FrameError("Each frame must be an object")
+    landmarks, timestamp = frame.get("landmarks"), frame.get("timestamp")
+    if not landmarks or not timestamp:
+        return None
+    if not isinstance(landmarks, list) or len(landmarks) < MIN_LANDMARKS:
+        raise FrameError(f"landmarks must be a list of at least {MIN_LANDMARKS} points")
+    joints = np.empty((len(ARM_JOINTS), 2))
+    visibility = np.empty(len(ARM_JOINTS))
+    for row, j in enumerate(ARM_JOINTS):
+        point = landmarks[j]
+        if not isinstance(point, dict):
+            raise FrameError(f"landmark {j} must be an object with x and y")
+        joints[row] = _number(point.get("x"), f"landmark {j} x"), _number(point.get("y"), f"landmark {j} y")
+        v = point.get("visibility")
+        visibility[row] = 1.0 if v is None else _number(v, f"landmark {j} visibility")
+    return _number(timestamp, "timestamp"), joints, visibility
+
+
+class StreamingWebcamSession:
+    """
+    Selects frames as they arrive, by the rules /predict/webcam applies to a whole clip
+    (duplicates, low visibility, decimation to WEBCAM_TARGET_FPS), runs the per-frame
+    kinematics on each selected frame and folds it into running column statistics. Memory
+    stays constant however long the stream, and features() only reads the statistics.
+
+    A streamed clip scores like the same clip sent in one request, up to float rounding, as
+    long as it has at most WEBCAM_MAX_FRAMES selected frames: the whole-clip path thins
+    longer clips evenly, which needs the whole clip, so a stream uses all its frames instead.
+    """
+
+    def __init__(self):
+        self.frames_received = 0
+        self.frames_kept = 0
+        self._selector = FrameSelector()
+        self._analyzer = PoseAnalyzer()
+        self._stats = RunningColumnStats(len(FRAME_FEATURES))
+
+    def _keep(self, selected):
+        for timestamp, joints in selected:
+            # process_landmarks reads landmarks by MediaPipe index; only the arm joints are needed
+            landmarks = {j: {"x": x, "y": y} for j, (x, y) in zip(ARM_JOINTS, joints.tolist())}
+            frame = self._analyzer.process_landmarks(landmarks, timestamp)
+            self._stats.add([frame[c] for c in FRAME_FEATURES])
+            self.frames_kept += 1
+
+    def add_frame(self, frame):
+        """Raises FrameError for a malformed frame, which is then not counted."""
+        parsed = parse_frame(frame)
+        if parsed is not None and self.frames_kept >= WEBCAM_STREAM_MAX_FRAMES:
+            raise FrameError(f"At most {WEBCAM_STREAM_MAX_FRAMES} frames per stream")
+        self.frames_received += 1
+        if parsed is not None:
+            timestamp, joints, visibility = parsed
+            self._keep(self._selector.add((timestamp, joints), timestamp, joints, visibility))
+
+    def features(self):
+        if self.frames_received < MIN_CLIP_FRAMES:
+            return None
+        # The frame held back for the lookahead is decided now that no more will come
+        self._keep(self._selector.finish())
+        if self.frames_kept < MIN_CLIP_FRAMES:
+            logger.warning("⚠️ Feature extraction from landmarks failed: %d usable frames.", self.frames_kept)
+            return None
+        return feature_plan.features(self._stats.stats())
@@ -0,0 +1,84 @@
+"""Synthetic landmark clips shaped like the MediaPipe Pose frames the frontend sends."""
+import numpy as np
+
+from landmark_codec import NUM_LANDMARKS
+
+
+def synthetic_clip(seed, frames=90, fps=30.0, jitter_ms=4.0, stalls=0, visibility=False):
+    """
+    Both arms swinging with noise, sampled at a jittery frame rate like a browser camera.
+    `stalls` frames repeat the previous timestamp, which the kinematics treat as zero-dt frames.
+    """
+    rng = np.random.default_rng(seed)
+    t = 1000.0 + np.cumsum(np.full(frames, 1000.0 / fps) + rng.uniform(-jitter_ms, jitter_ms, frames))
+    for i in rng.choice(np.arange(1, frames), size=stalls, replace=False):
+        t[i] = t[i - 1]
+    phase = 2 * np.pi * (t - t[0]) / 1000.0 * rng.uniform(0.3, 1.2)
+    base = rng.uniform(0.2, 0.8, size=(33, 2))
+    clip = []
+    for i in range(frames):
+        points = base + rng.normal(0, 0.004, size=(33, 2))
+        points[[13, 14], 1] += 0.08 * np.sin(phase[i])
+        points[[15, 16]] += 0.12 * np.array([np.cos(phase[i]), np.sin(phase[i])])
+        landmarks = [{"x": float(x), "y": float(y), "z": 0.0} for x, y in points]
+        if visibility:
+            for p in landmarks:
+                p["visibility"] = 0.99
+        clip.append({"landmarks": landmarks, "timestamp": float(t[i])})
+    return clip
+
+
+def motion_clip(fps, seconds=4.0, jitter_ms=0.0, seed=0):
+    """
+    The same noise-free arm motion for a given seed, sampled at any frame rate, so a clip
+    recorded at 60 or 120 fps can be compared with the same movement recorded at 30 fps.
+    Each arm swings from a swaying shoulder with the elbow bent between about 35 and 105
+    degrees, so the joint angles stay away from the straight-arm singularity.
+    """
+    params = np.random.default_rng(seed)
+    frequency = params.uniform(0.4, 0.9)
+    base = params.uniform(0.3, 0.7, size=(33, 2))
+    swing, bend, lag = params.uniform(0.3, 0.6, 2), params.uniform(0.2, 0.3, 2), params.uniform(0, np.pi, 2)
+    rng = np.random.default_rng([seed, int(fps)])
+    n = int(seconds * fps)
+    t = 1000.0 + np.arange(n) * 1000.0 / fps + rng.uniform(-jitter_ms, jitter_ms, n)
+    phase = 2 * np.pi * frequency * (t - 1000.0) / 1000.0
+    clip = []
+    for i in range(n):
+        points = base.copy()
+        for side, (shoulder, elbow, wrist) in enumerate(((11, 13, 15), (12, 14, 16))):
+            mirror = 1.0 if side else -1.0
+            points[shoulder] += 0.01 * np.array([np.sin(0.5 * phase[i]), 0.0])
+            upper = swing[side] * np.sin(phase[i] + lag[side])
+            flex = np.pi * (0.6 + bend[side] * np.sin(phase[i]))
+            points[elbow] = points[shoulder] + 0.15 * np.array([mirror * np.sin(upper), np.cos(upper)])
+            points[wrist] = points[elbow] + 0.12 * np.array([mirror * np.sin(upper + flex), np.cos(upper + flex)])
+        landmarks = [{"x": float(x), "y": float(y), "visibility": 0.99} for x, y in points]
+        clip.append({"landmarks": landmarks, "timestamp": float(t[i])})
+    return clip
+
+
+def landmarks_to_array(landmark_data, with_visibility=False):
+    """
+    Packs a list of {"landmarks": [...], "timestamp": t} frames into a (frames x 33 x 2)
+    coordinate array and a (frames,) timestamp vector.
+    Frames without landmarks or timestamp are skipped, same as the per-frame path.
+    with_visibility also returns a (frames x 33) array of the MediaPipe "visibility"
+    scores, 1.0 where a landmark has none (or null).
+    """
+    frames = [f for f in landmark_data if f.get("landmarks") and f.get("timestamp")]
+    width = 3 if with_visibility else 2
+    coords = np.empty((len(frames), NUM_LANDMARKS, width), dtype=float)
+    timestamps = np.empty(len(frames), dtype=float)
+    for i, frame in enumerate(frames):
+        if with_visibility:
+            coords[i] = [
+                (p['x'], p['y'], 1.0 if p.get('visibility') is None else p['visibility'])
+                for p in frame["landmarks"][:NUM_LANDMARKS]
+            ]
+        else:
+            coords[i] = [(p['x'], p['y']) for p in frame["landmarks"][:NUM_LANDMARKS]]
+        timestamps[i] = frame["timestamp"]
+    if with_visibility:
+        return coords[:, :, :2], timestamps, coords[:, :, 2]
+    return coords, timestamps
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+# The backend modules import each other by bare name, as when uvicorn runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def webcam_model_files(tmp_path_factory):
+    """
+    Small XGBoost classifier/regressor pair and label encoder on the webcam feature list,
+    saved the way models/ stores them (the real ones are Git LFS objects).
+    """
+    from sklearn.preprocessing import LabelEncoder
+    from xgboost import XGBClassifier, XGBRegressor
+    from webcam_models import WebcamModel
+
+    from clips import landmarks_to_array, synthetic_clip
+    from webcam_models import analyse_clip
+
+    # Trained around features of synthetic clips, so different clips get different scores
+    rng = np.random.default_rng(0)
+    seen = []
+    for seed in range(40):
+        coords, timestamps = landmarks_to_array(synthetic_clip(seed=1000 + seed, frames=40, fps=(15.0, 30.0)[seed % 2]))
+        features, _ = analyse_clip(coords, timestamps)
+        seen.append([features[f] for f in WebcamModel.FEATURE_NAMES])
+    seen = np.nan_to_num(np.array(seen))
+    X = seen[rng.integers(0, len(seen), 400)] * rng.normal(1.0, 0.1, size=(400, seen.shape[1]))
+    z = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-9)
+    signal = z[:, :10].sum(axis=1)
+    labels = np.array(["mild", "moderate", "severe"])[np.digitize(signal, np.quantile(signal, [1 / 3, 2 / 3]))]
+    encoder = LabelEncoder().fit(labels)
+    classifier = XGBClassifier(n_estimators=20, max_depth=4).fit(X, encoder.transform(labels))
+    regressor = XGBRegressor(n_estimators=20, max_depth=4).fit(X, 60 + 5 * signal)
+
+    root = tmp_path_factory.mktemp("webcam_models")
+    files = {"encoder": root / "encoder.pkl", "classifier": root / "classifier.pkl", "regressor": root / "regressor.pkl"}
+    for role, obj in (("encoder", encoder), ("classifier", classifier), ("regressor", regressor)):
+        joblib.dump(obj, files[role])
+    return files
+
+
+@pytest.fixture(scope="session")
+def webcam_model(webcam_model_files):
+    from webcam_models import WebcamModel
+    return WebcamModel(webcam_model_files)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """The shared `db` on an in-memory mongomock-motor client, and an empty auth cache."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    import auth
+    import main
+    from auth_cache import AuthCache
+    from database import db
+
+    monkeypatch.setattr(db, "client", AsyncMongoMockClient())
+    monkeypatch.setattr(db, "_collections", {})
+    cache = AuthCache(ttl=30)
+    monkeypatch.setattr(auth, "auth_cache", cache)
+    monkeypatch.setattr(main, "auth_cache", cache)
+    return db
+
+
+@pytest.fixture
+def login(mongo):
+    """login(username, role=None) stores the user and returns bearer headers for them."""
+    import asyncio
+
+    from auth import create_access_token
+
+    def login(username, role=None):
+        user = {"username": username, "email": f"{username}@example.com", "password": "unused"}
+        if role:
+            user["role"] = role
+        asyncio.run(mongo.users.insert_one(user))
+        return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+    return login
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import analytics
+
+
+def test_timestamps_normalise_to_naive_utc():
+    # Dashboard.jsx sends new Date().toISOString(), which ends in "Z"
+    assert analytics.normalize_timestamp("2026-03-01T10:00:00.000Z") == "2026-03-01T10:00:00"
+    assert analytics.normalize_timestamp("2026-03-01T12:00:00+02:00") == "2026-03-01T10:00:00"
+    assert analytics.normalize_timestamp("2026-03-01T10:00:00") == "2026-03-01T10:00:00"
+    assert analytics.days_since_epoch("2025-01-02T00:00:00Z") == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("value", ["yesterday", "", None, 12345])
+def test_invalid_timestamps_raise_value_error(value):
+    with pytest.raises(ValueError):
+        analytics.parse_timestamp(value)
+
+
+def test_stats_update_uses_normalised_timestamp():
+    session = {"username": "u", "timestamp": "2026-03-01T10:00:00Z", "final_score": 70.0, "final_category": "good"}
+    update = analytics.stats_update(session)
+    assert update["$max"] == {"last_timestamp": "2026-03-01T10:00:00"}
+    assert update["$push"]["final.recent"]["$sort"] == {"t": 1}
+    category = analytics.session_operations(session)[1]._filter
+    assert category["last_timestamp"] == "2026-03-01T10:00:00"
+
+
+def test_summarize_reads_aware_and_legacy_values():
+    doc = {
+        "_id": "u",
+        "last_category": "good",
+        "category_since": "2026-03-01T00:00:00Z",
+        "final": {"n": 2, "sum_t": 1.0, "sum_tt": 1.0, "sum_y": 110.0, "sum_ty": 60.0,
+                  "recent": [50.0, {"t": 1.0, "y": 60.0}]},
+    }
+    summary = analytics.summarize(doc, now=datetime(2026, 3, 2))
+    assert summary["days_since_category_change"] == 1.0
+    assert summary["trends"]["final"]["rolling_avg"] == 55.0
+    assert summary["trends"]["final"]["slope_per_day"] == 10.0
+
+
+def test_analytics_endpoints_need_the_owner_or_an_admin(mongo, login, monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    import main
+
+    doc = {"_id": "alice", "last_category": "good", "category_since": "2026-03-01T00:00:00",
+           "final": {"n": 1, "sum_t": 0.0, "sum_tt": 0.0, "sum_y": 70.0, "sum_ty": 0.0, "recent": [{"t": 0.0, "y": 70.0}]}}
+    asyncio.run(mongo.session_stats.insert_one(dict(doc)))
+    rebuilt = []
+
+    async def rebuild(sessions, stats, username):
+        rebuilt.append(username)
+        return dict(doc)
+
+    monkeypatch.setattr(analytics, "rebuild", rebuild)
+    alice, bob, admin = login("alice"), login("bob"), login("root", role="admin")
+    client = TestClient(main.app)
+
+    assert client.get("/analytics/alice").status_code == 401
+    assert client.get("/analytics/alice", headers=bob).status_code == 403
+    assert client.get("/analytics/alice", headers=alice).status_code == 200
+    assert client.get("/analytics/alice", headers=admin).status_code == 200
+
+    assert client.post("/analytics/alice/rebuild").status_code == 401
+    assert client.post("/analytics/alice/rebuild", headers=alice).status_code == 403
+    assert client.post("/analytics/alice/rebuild", headers=admin).status_code == 200
+    assert rebuilt == ["alice"]
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import auth
+import auth_cache
+import main
+import passwords
+
+
+@pytest.fixture
+def client(mongo, monkeypatch):
+    # Cheap scrypt so each test hashes in milliseconds
+    monkeypatch.setattr(passwords, "SCRYPT_LOG_N", 10)
+    return TestClient(main.app)
+
+
+def signup(client, username="alice", password="correct horse"):
+    return client.post("/signup", json={"username": username, "email": f"{username}@example.com", "password": password})
+
+
+def signin(client, username="alice", password="correct horse"):
+    return client.post("/signin", data={"username": username, "password": password})
+
+
+def test_default_scheme_needs_no_optional_package():
+    assert passwords.PASSWORD_SCHEME == "scrypt"
+    assert passwords.hash_password("pw").startswith("$scrypt$")
+
+
+def test_missing_package_falls_back_to_scrypt(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_SCHEME", "argon2")
+    monkeypatch.setattr(passwords, "_active_scheme", None)
+    monkeypatch.setattr(passwords, "_SCHEME_MODULES", {"argon2": "argon2_not_installed", "bcrypt": "bcrypt"})
+    stored = passwords.hash_password("pw")
+    assert stored.startswith("$scrypt$")
+    assert passwords.verify_password(stored, "pw")
+    assert not passwords.needs_rehash(stored)
+    # An argon2 hash stored while the package was installed is refused, not a 500
+    assert not passwords.verify_password("$argon2id$v=19$m=65536,t=3,p=1$c2FsdA$ZGlnZXN0", "pw")
+
+
+def test_signup_then_signin(client, mongo):
+    assert signup(client).status_code == 201
+    stored = asyncio.run(mongo.users.find_one({"username": "alice"}))["password"]
+    assert stored.startswith("$scrypt$") and "correct horse" not in stored
+
+    r = signin(client)
+    assert r.status_code == 200
+    token = r.json()["access_token"]
+    profile = client.get("/profile", headers={"Authorization": f"Bearer {token}"})
+    assert profile.json() == {"username": "alice", "email": "alice@example.com"}
+
+
+def test_duplicate_signup_is_rejected(client):
+    assert signup(client).status_code == 201
+    assert signup(client).status_code == 400
+
+
+def test_wrong_password_is_401(client):
+    signup(client)
+    assert signin(client, password="wrong").status_code == 401
+
+
+def test_unknown_user_is_401(client):
+    assert signin(client, username="nobody").status_code == 401
+
+
+def test_plaintext_password_is_hashed_on_login(client, mongo):
+    asyncio.run(mongo.users.insert_one({"username": "legacy", "email": "l@example.com", "password": "hunter2"}))
+    assert signin(client, username="legacy", password="wrong").status_code == 401
+    assert asyncio.run(mongo.users.find_one({"username": "legacy"}))["password"] == "hunter2"
+
+    assert signin(client, username="legacy", password="hunter2").status_code == 200
+    stored = asyncio.run(mongo.users.find_one({"username": "legacy"}))["password"]
+    assert stored.startswith("$scrypt$") and passwords.verify_password(stored, "hunter2")
+    # And the upgraded hash keeps working
+    assert signin(client, username="legacy", password="hunter2").status_code == 200
+
+
+def current_user(token):
+    return asyncio.run(auth.get_current_user(token))
+
+
+def test_role_change_is_seen_after_invalidation_or_ttl(mongo, login, monkeypatch):
+    token = login("alice")["Authorization"].split()[1]
+    assert "role" not in current_user(token)
+    asyncio.run(mongo.users.update_one({"username": "alice"}, {"$set": {"role": "admin"}}))
+
+    # Changed by another process: this one serves the cached record until it expires
+    assert "role" not in current_user(token)
+    auth.auth_cache.invalidate_user("alice")
+    assert asyncio.run(auth.get_admin_user(current_user(token)))["role"] == "admin"
+
+    asyncio.run(mongo.users.update_one({"username": "alice"}, {"$unset": {"role": ""}}))
+    now = auth_cache.time.time()
+    monkeypatch.setattr(auth_cache.time, "time", lambda: now + auth.auth_cache.ttl + 1)
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(auth.get_admin_user(current_user(token)))
+    assert denied.value.status_code == 403
+
+
+def test_password_rehash_invalidates_the_cached_user(client, mongo):
+    asyncio.run(mongo.users.insert_one({"username": "legacy", "email": "l@example.com", "password": "hunter2"}))
+    token = signin(client, username="legacy", password="hunter2").json()["access_token"]
+    # The first signin already upgraded the hash; put the plain text back and cache that record
+    asyncio.run(mongo.users.update_one({"username": "legacy"}, {"$set": {"password": "hunter2"}}))
+    auth.auth_cache.invalidate_user("legacy")
+    assert current_user(token)["password"] == "hunter2"
+
+    assert signin(client, username="legacy", password="hunter2").status_code == 200
+    assert current_user(token)["password"].startswith("$scrypt$")
@@ -0,0 +1,66 @@
+import pytest
+
+import auth_cache
+from auth_cache import AuthCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_user_hit_and_miss(clock):
+    cache = AuthCache(ttl=30)
+    assert cache.get_user("alice") is None
+    cache.remember_user("alice", {"username": "alice"})
+    assert cache.get_user("alice") == {"username": "alice"}
+    assert cache.metrics()["users"] == {"size": 1, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = AuthCache(ttl=30)
+    cache.remember_user("alice", {"username": "alice"})
+    cache.remember_token("t", "alice")
+    clock[0] += 29
+    assert cache.get_user("alice") is not None and cache.token_subject("t") == "alice"
+    clock[0] += 2
+    assert cache.get_user("alice") is None and cache.token_subject("t") is None
+
+
+def test_token_never_outlives_its_exp_claim(clock):
+    cache = AuthCache(ttl=30)
+    cache.remember_token("t", "alice", exp=clock[0] + 5)
+    clock[0] += 6
+    assert cache.token_subject("t") is None
+
+
+def test_invalidation_drops_the_user_and_their_tokens(clock):
+    cache = AuthCache(ttl=30)
+    cache.remember_user("alice", {"username": "alice"})
+    cache.remember_token("t1", "alice")
+    cache.remember_token("t2", "alice")
+    cache.remember_token("t3", "bob")
+    cache.invalidate_user("alice")
+    assert cache.get_user("alice") is None
+    assert cache.token_subject("t1") is None and cache.token_subject("t2") is None
+    assert cache.token_subject("t3") == "bob"
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_lru_evicts_the_oldest_entry():
+    cache = AuthCache(ttl=30, maxsize=2)
+    for name in ("a", "b"):
+        cache.remember_user(name, {"username": name})
+    cache.get_user("a")
+    cache.remember_user("c", {"username": "c"})
+    assert cache.get_user("b") is None
+    assert cache.get_user("a") is not None and cache.get_user("c") is not None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = AuthCache(ttl=0)
+    cache.remember_user("alice", {"username": "alice"})
+    cache.remember_token("t", "alice")
+    assert cache.get_user("alice") is None and cache.token_subject("t") is None
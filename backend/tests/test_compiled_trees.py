@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+import compiled_trees
+from compiled_trees import CompiledEnsemble, compile_model, compile_xgb
+
+N_FEATURES = 12
+
+
+def training_data(seed=0, rows=600):
+    # NaNs in training too, so the splits learn both default directions
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, N_FEATURES))
+    signal = X[:, 0] + 0.5 * X[:, 1] * X[:, 2] - np.abs(X[:, 3])
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return X, signal
+
+
+def random_rows(seed, rows):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(scale=2.0, size=(rows, N_FEATURES))
+    X[rng.random(X.shape) < 0.15] = np.nan
+    X[0] = np.nan  # a row with nothing but defaults
+    X[1] = 1e30
+    X[2] = -1e30
+    return X
+
+
+@pytest.fixture(scope="module")
+def models():
+    from xgboost import XGBClassifier, XGBRegressor
+
+    X, signal = training_data()
+    regressor = XGBRegressor(n_estimators=30, max_depth=5).fit(X, 50 + 10 * signal)
+    binary = XGBClassifier(n_estimators=30, max_depth=4).fit(X, (signal > 0).astype(int))
+    multiclass = XGBClassifier(n_estimators=30, max_depth=4).fit(
+        X, np.digitize(signal, np.quantile(signal, [0.25, 0.5, 0.75]))
+    )
+    return {"regressor": regressor, "binary": binary, "multiclass": multiclass}
+
+
+@pytest.mark.parametrize("kind", ["regressor", "binary", "multiclass"])
+@pytest.mark.parametrize("rows", [1, 7, compiled_trees.COMPILED_MAX_BATCH + 1, 500])
+def test_compiled_matches_native_on_random_inputs(models, kind, rows):
+    model = models[kind]
+    compiled = compile_xgb(model)
+    X = random_rows(seed=rows, rows=max(rows, 3))[:rows]
+
+    if kind == "regressor":
+        # Same float32 additions in the same order: not just close, identical
+        assert np.array_equal(compiled.predict(X).astype(np.float32), model.predict(X))
+    else:
+        assert np.array_equal(compiled.predict(X), model.predict(X))
+        assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["regressor", "binary", "multiclass"])
+def test_compiled_matches_native_on_threshold_probes(models, kind):
+    # Values on and right next to every split threshold, where float32 rounding matters
+    model = models[kind]
+    compiled = compile_xgb(model)
+    for seed in range(3):
+        X = compiled_trees.probe_rows(compiled, n_rows=300, seed=seed)
+        diff, equivalent = compiled_trees.check_equivalence(model, compiled, X)
+        assert equivalent and diff <= 1e-5
+
+
+def test_compile_model_uses_the_compiled_backend_only_when_asked(models):
+    regressor = models["regressor"]
+    assert compile_model(regressor, backend="native") is regressor
+    assert isinstance(compile_model(regressor, backend="compiled"), CompiledEnsemble)
+
+
+def test_compile_model_keeps_unsupported_models():
+    from xgboost import XGBRegressor
+
+    X, signal = training_data(rows=200)
+    custom_missing = XGBRegressor(n_estimators=5, missing=-1.0).fit(np.nan_to_num(X, nan=-1.0), signal)
+    assert compile_model(custom_missing, backend="compiled") is custom_missing
+
+
+@pytest.fixture
+def compiled_webcam_model(webcam_model_files, monkeypatch):
+    from webcam_models import WebcamModel
+
+    monkeypatch.setattr(compiled_trees, "MODEL_BACKEND", "compiled")
+    return WebcamModel(webcam_model_files)
+
+
+def test_cached_label_mapping_matches_the_encoder(webcam_model):
+    indices = np.arange(len(webcam_model.encoder.classes_))
+    assert list(webcam_model._class_labels(indices)) == list(webcam_model.encoder.inverse_transform(indices))
+    with pytest.raises(ValueError):
+        webcam_model._class_labels(np.array([len(indices)]))
+
+
+def test_compiled_webcam_model_matches_native(webcam_model, compiled_webcam_model):
+    from webcam_models import WebcamModel
+
+    assert isinstance(compiled_webcam_model.class_model, CompiledEnsemble)
+    assert isinstance(compiled_webcam_model.reg_model, CompiledEnsemble)
+    rng = np.random.default_rng(1)
+    rows = [
+        {f: float(v) for f, v in zip(WebcamModel.FEATURE_NAMES, values)}
+        for values in rng.normal(size=(40, len(WebcamModel.FEATURE_NAMES))) * 5
+    ]
+    native, compiled = webcam_model.predict_batch(rows), compiled_webcam_model.predict_batch(rows)
+    assert [r["class_prediction"] for r in compiled] == [r["class_prediction"] for r in native]
+    assert_allclose(
+        [r["recovery_score"] for r in compiled], [r["recovery_score"] for r in native], rtol=1e-5, atol=1e-4
+    )
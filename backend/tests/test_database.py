@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import database
+from database import Database, PoolMetrics
+
+
+def test_client_uses_the_configured_pool(monkeypatch):
+    monkeypatch.setattr(database, "MONGO_MAX_POOL_SIZE", 42)
+    monkeypatch.setattr(database, "MONGO_MIN_POOL_SIZE", 3)
+    monkeypatch.setattr(database, "MONGO_MAX_IDLE_TIME_MS", 15000)
+    monkeypatch.setattr(database, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 250)
+    monkeypatch.setattr(database, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 1500)
+    db = Database(url="mongodb://localhost:27017", name="pool_test")
+    client = db.connect()
+    try:
+        # No connection is made until the first operation
+        options = client.delegate.options
+        pool = options.pool_options
+        assert (pool.max_pool_size, pool.min_pool_size) == (42, 3)
+        assert pool.max_idle_time_seconds == 15.0
+        assert pool.wait_queue_timeout == 0.25
+        assert options.server_selection_timeout == 1.5
+        assert db.pool in options.event_listeners
+        assert db.connect() is client
+    finally:
+        db.close()
+    assert db.client is None
+
+
+def test_collections_carry_the_write_concern(monkeypatch):
+    monkeypatch.setattr(database, "MONGO_WRITE_CONCERN", "majority")
+    monkeypatch.setattr(database, "MONGO_JOURNAL", True)
+    db = Database(url="mongodb://localhost:27017", name="pool_test")
+    try:
+        assert db.sessions.write_concern.document == {"w": "majority", "j": True}
+        assert db.sessions is db.collection("sessions")
+    finally:
+        db.close()
+    monkeypatch.setattr(database, "MONGO_WRITE_CONCERN", "1")
+    monkeypatch.setattr(database, "MONGO_JOURNAL", False)
+    assert database._write_concern().document == {"w": 1}
+
+
+def test_pool_metrics_count_checkouts():
+    metrics = PoolMetrics()
+    event = SimpleNamespace(duration=0.004)
+    metrics.connection_created(event)
+    metrics.connection_created(event)
+    metrics.connection_checked_out(event)
+    metrics.connection_checked_out(SimpleNamespace(duration=0.010))
+    metrics.connection_checked_in(event)
+    metrics.connection_check_out_failed(event)
+    metrics.connection_closed(event)
+    stats = metrics.as_dict()
+    assert (stats["open"], stats["created"], stats["closed"]) == (1, 2, 1)
+    assert (stats["checked_out"], stats["max_checked_out"], stats["checkouts"]) == (1, 2, 2)
+    assert stats["checkout_failures"] == 1
+    assert stats["checkout_wait_ms_avg"] == 7.0 and stats["checkout_wait_ms_max"] == 10.0
+
+
+def test_ensure_indexes_creates_every_index(mongo):
+    import main
+
+    asyncio.run(main.ensure_indexes())
+    sessions = asyncio.run(mongo.sessions.index_information())
+    assert [("username", 1), ("timestamp", 1), ("_id", 1)] in [i["key"] for i in sessions.values()]
+    users = asyncio.run(mongo.users.index_information())
+    assert any(i["key"] == [("username", 1)] and i.get("unique") for i in users.values())
+    jobs = asyncio.run(mongo.report_jobs.index_information())
+    assert any(i["key"] == [("expires_at", 1)] and i.get("expireAfterSeconds") == 0 for i in jobs.values())
+
+
+def test_ensure_indexes_only_warns_when_mongo_fails(mongo, monkeypatch, caplog):
+    import main
+
+    async def unreachable(*args, **kwargs):
+        raise RuntimeError("no server")
+
+    for name in ("sessions", "users", "report_jobs"):
+        monkeypatch.setattr(mongo.collection(name), "create_index", unreachable)
+    asyncio.run(main.ensure_indexes())
+    assert caplog.text.count("no server") == 3
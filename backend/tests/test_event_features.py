@@ -0,0 +1,59 @@
+import pytest
+
+from event_features import keystroke_features
+
+# Typing "cAt": a wrong "x" corrected with Backspace, a "z" past the end of the (full) field,
+# "A" released after Shift, and events after the text matched, which the disabled field drops.
+#          t,    down,  key,         code
+EVENTS = [
+    (1000, True, "c", "KeyC"), (1080, False, "c", "KeyC"),
+    (1150, True, "x", "KeyX"), (1230, False, "x", "KeyX"),
+    (1300, True, "t", "KeyT"), (1360, False, "t", "KeyT"),
+    (1420, True, "z", "KeyZ"), (1470, False, "z", "KeyZ"),  # field is full: ignored
+    (1550, True, "Backspace", "Backspace"), (1610, False, "Backspace", "Backspace"),  # deletes a correct "t"
+    (1680, True, "Backspace", "Backspace"), (1740, False, "Backspace", "Backspace"),  # deletes the wrong "x"
+    (1800, True, "Shift", "ShiftLeft"), (1850, True, "A", "KeyA"),
+    (1900, False, "Shift", "ShiftLeft"), (1940, False, "a", "KeyA"),
+    (2000, True, "t", "KeyT"),  # "cAt": done
+    (2070, False, "t", "KeyT"), (2100, True, "x", "KeyX"),
+]
+
+# Worked out by hand from KeystrokeForm.jsx's handlers for the events above
+BROWSER = {
+    "Errors": 1,
+    "CorrectionBehavior": 2,
+    "TypingSpeed_WPM": 60.00,  # 1 word in 1000 ms
+    "TypingSpeed_CPM": 180.00,
+    "AverageDwellTime": 72.50,  # 80 80 60 50 60 60 100 90
+    "AverageFlightTime": 122.86,  # key-ups 1080 ... 1940
+    "Consistency": 61.67,
+    "AccuracyScore": 6.67,
+}
+
+
+def replay(with_code=True):
+    t, down, key, code = zip(*EVENTS)
+    return keystroke_features(t, down, key, target_text="cAt", code=code if with_code else None)
+
+
+def test_replayed_log_matches_the_browser():
+    features = replay()
+    for name, expected in BROWSER.items():
+        assert round(features[name], 2) == pytest.approx(expected), name
+
+
+def test_without_codes_a_shifted_key_is_paired_by_key():
+    # "A" down and "a" up are different keys, so that press has no dwell time
+    assert replay(with_code=False)["AverageDwellTime"] == pytest.approx(490 / 7)
+
+
+def test_an_unfinished_log_ends_at_its_last_key_down():
+    t, down, key, _ = zip(*EVENTS[:4])
+    features = keystroke_features(t, down, key, target_text="cAt")
+    assert features["Errors"] == 0
+    assert features["TypingSpeed_WPM"] == pytest.approx(1 / (150 / 60000))
+
+
+def test_mismatched_columns_raise():
+    with pytest.raises(ValueError, match="code"):
+        keystroke_features([0, 1], [True, False], ["a", "a"], code=["KeyA"])
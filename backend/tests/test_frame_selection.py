@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import webcam_models
+from webcam_models import (
+    features_from_landmark_data, select_frames, window_bounds, window_params, FrameSelector, WebcamModel,
+)
+
+from clips import motion_clip, synthetic_clip
+
+# Per-clip extremes (max, min, range) depend on which frames are sampled, and the jerk behind
+# the smoothness features is dominated by timestamp jitter at any frame rate
+STABLE_FEATURES = [f for f in WebcamModel.FEATURE_NAMES if f.endswith(("_mean", "_std")) and "smoothness" not in f]
+
+
+@pytest.mark.parametrize("fps", [60.0, 120.0])
+def test_high_frame_rate_clips_match_30fps(fps):
+    # Evenly timed, the decimated clip is the 30 fps recording, up to timestamp rounding
+    for seed in range(3):
+        reference = features_from_landmark_data(motion_clip(30.0, seed=seed))
+        decimated = features_from_landmark_data(motion_clip(fps, seed=seed))
+        np.testing.assert_allclose(
+            [decimated[f] for f in WebcamModel.FEATURE_NAMES], [reference[f] for f in WebcamModel.FEATURE_NAMES],
+            rtol=1e-6, atol=1e-6,
+        )
+
+
+@pytest.mark.parametrize("fps", [60.0, 120.0])
+@pytest.mark.parametrize("seed", range(4))
+def test_jittery_high_frame_rate_clips_match_30fps_within_tolerance(fps, seed):
+    # Decimated to WEBCAM_TARGET_FPS (30), a fast camera gives the features of a 30 fps one
+    reference = features_from_landmark_data(motion_clip(30.0, jitter_ms=3.0, seed=seed))
+    decimated = features_from_landmark_data(motion_clip(fps, jitter_ms=3.0, seed=seed))
+    np.testing.assert_allclose(
+        [decimated[f] for f in STABLE_FEATURES], [reference[f] for f in STABLE_FEATURES], rtol=0.05, atol=1.0
+    )
+
+
+@pytest.mark.parametrize("fps, step", [(60.0, 2), (120.0, 4)])
+def test_evenly_timed_clip_keeps_every_nth_frame(fps, step):
+    clip = motion_clip(fps, seed=7)
+    assert features_from_landmark_data(clip) == features_from_landmark_data(clip[::step])
+
+
+def test_clip_at_target_rate_is_not_decimated(monkeypatch):
+    clip = synthetic_clip(seed=8, visibility=True)
+    full_rate = features_from_landmark_data(clip)
+    monkeypatch.setattr(webcam_models, "WEBCAM_TARGET_FPS", 0)
+    assert features_from_landmark_data(clip) == full_rate
+
+
+def messy_frames(seed, n=600):
+    """Mixed 30-120 fps timing with stalls, backward jumps, gaps, resent frames and low visibility."""
+    rng = np.random.default_rng(seed)
+    t = 1000.0 + np.cumsum(rng.choice([1000 / 120, 1000 / 60, 1000 / 30], n) + rng.uniform(-3, 3, n))
+    t[rng.random(n) < 0.05] -= 50.0
+    t[rng.random(n) < 0.02] += 400.0
+    stalled = np.flatnonzero(rng.random(n) < 0.05)
+    t[stalled[stalled > 0]] = t[stalled[stalled > 0] - 1]
+    joints = rng.normal(size=(n, 6, 2))
+    resent = np.flatnonzero(rng.random(n) < 0.05)
+    joints[resent[resent > 0]] = joints[resent[resent > 0] - 1]
+    visibility = np.where(rng.random((n, 1)) < 0.1, 0.2, 0.99) * np.ones((n, 6))
+    return t, joints, visibility
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("target_fps", [30.0, 15.0, 0.0])
+def test_frame_selector_matches_select_frames(seed, target_fps):
+    t, joints, visibility = messy_frames(seed)
+    selector = FrameSelector(target_fps)
+    streamed = []
+    for i in range(len(t)):
+        streamed += selector.add(i, float(t[i]), joints[i], visibility[i])
+    streamed += selector.finish()
+    whole = select_frames(t, joints, visibility, target_fps=target_fps, max_frames=len(t))
+    assert streamed == whole.tolist()
+    assert 0 < len(whole) < len(t)
+
+
+def test_one_window_allowed(monkeypatch):
+    monkeypatch.setattr(webcam_models, "WEBCAM_MAX_WINDOWS", 1)
+    timestamps = 1000.0 + np.arange(300) * 33.3
+    lo, hi = window_bounds(timestamps, 2.0, 0.5)
+    assert lo.tolist() == [0]
+    assert hi.tolist() == [np.searchsorted(timestamps, timestamps[0] + 2000.0)]
+
+
+@pytest.mark.parametrize("window_s, step_s", [(-1, None), (2, -0.5), ("abc", None), (float("inf"), None), (2, float("nan"))])
+def test_bad_window_params_raise(window_s, step_s):
+    with pytest.raises(ValueError):
+        window_params({"window_s": window_s, "step_s": step_s})
+
+
+def test_bad_window_params_are_a_400():
+    clip = synthetic_clip(seed=9)
+    response = TestClient(main.app).post("/predict/webcam", json={"landmark_data": clip, "window_s": -2})
+    assert response.status_code == 400
+    assert "window_s" in response.json()["detail"]
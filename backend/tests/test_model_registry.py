@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from inference import InferenceExecutor
+from model_registry import ModelRegistry
+
+
+def _pid(_):
+    return os.getpid()
+
+
+@pytest.fixture
+def registry(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"models": {"m": {
+        "active": "1", "shadow": None,
+        "versions": {"1": {"files": {}}, "2": {"files": {}}},
+    }}}))
+    reg = ModelRegistry(manifest)
+    reg.register("m", lambda files: object(), {})
+    return reg
+
+
+def test_version_changes_notify_listeners(registry):
+    changes = []
+    registry.add_listener(changes.append)
+    registry.get("m")
+    registry.activate("m", "2")
+    registry.set_shadow("m", "1", 0.5)
+    registry.clear_shadow("m")
+    assert changes == ["m", "m", "m"]
+    assert registry.version("m") == "2"
+
+
+def test_refresh_notifies_for_models_not_loaded_here(registry, tmp_path):
+    changes = []
+    registry.add_listener(changes.append)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["models"]["m"]["active"] = "2"
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    os.utime(tmp_path / "manifest.json", (0, 0))
+    registry.refresh()
+    assert changes == ["m"]
+    assert not registry.is_loaded("m")
+    assert registry.version("m") == "2"
+
+
+def test_recycle_replaces_process_pool():
+    executor = InferenceExecutor(kind="process", workers=1, max_queue=1)
+    try:
+        before = executor._get_pool().submit(_pid, None).result()
+        executor.recycle()
+        after = executor._get_pool().submit(_pid, None).result()
+        assert executor.generation == 1
+        assert before != after
+    finally:
+        executor.shutdown()
+
+
+def test_removed_listener_is_not_called(registry):
+    changes = []
+    registry.add_listener(changes.append)
+    registry.remove_listener(changes.append)
+    registry.remove_listener(changes.append)  # already gone: ignored
+    registry.activate("m", "2")
+    assert changes == []
+
+
+def test_lifespan_restarts_leave_no_listeners_behind(mongo, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "MODEL_WARMUP", False)
+    # The lifespan closes the shared session writer on the way out
+    monkeypatch.setattr(main.session_writer, "_closed", False)
+    before = list(main.registry._listeners)
+    for _ in range(2):
+        with TestClient(main.app):
+            assert len(main.registry._listeners) == len(before) + 1
+        assert main.registry._listeners == before
+        main.session_writer._closed = False
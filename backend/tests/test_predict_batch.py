@@ -0,0 +1,33 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # No context manager: the lifespan (Mongo, model warm-up) is not needed here
+    return TestClient(main.app)
+
+
+def test_a_failing_chunk_becomes_error_lines(client, monkeypatch):
+    def score_chunk(rows):
+        if rows[0]["id"] == 1:
+            raise RuntimeError("worker died")
+        return [{"index": i, "id": r["id"], "modality": r["modality"], "score": 50.0} for i, r in enumerate(rows)]
+
+    monkeypatch.setattr(main, "score_chunk", score_chunk)
+    items = [{"id": i, "modality": "mouse", "features": {"x": i}} for i in range(3)]
+    response = client.post("/predict/batch", json={"items": items, "chunk_size": 1})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[1]["error"] == "RuntimeError: worker died"
+    assert lines[0]["score"] == lines[2]["score"] == 50.0
+
+
+def test_item_count_is_limited(client, monkeypatch):
+    items = [{"modality": "mouse", "features": {}}] * (main.BATCH_MAX_ITEMS + 1)
+    assert client.post("/predict/batch", json={"items": items}).status_code == 422
@@ -0,0 +1,104 @@
+import asyncio
+import copy
+from types import SimpleNamespace
+
+from pdf_store import PdfStore
+from report_generator import ReportGenerator
+
+
+class FakeJobs:
+    """The insert/update/find subset of a Motor collection that ReportGenerator uses."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+
+    async def update_one(self, query, update):
+        doc = self.docs[query["_id"]]
+        for path, value in update["$set"].items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for part in parents:
+                target = target[int(part)] if isinstance(target, list) else target[part]
+            if isinstance(target, list):
+                target[int(leaf)] = copy.deepcopy(value)
+            else:
+                target[leaf] = copy.deepcopy(value)
+
+    async def find_one(self, query):
+        return copy.deepcopy(self.docs.get(query["_id"]))
+
+
+SESSION = {
+    "username": "alice", "timestamp": "2026-03-01T10:00:00", "final_score": 72.5, "final_category": "good",
+    "keystroke_score": 70.0, "mouse_score": 75.0, "webcam_score": 72.5,
+}
+
+
+def test_job_status_is_visible_to_other_workers(tmp_path):
+    db = SimpleNamespace(report_jobs=FakeJobs())
+    store = PdfStore(str(tmp_path))
+    # Two API workers sharing the database and the PDF folder
+    accepting = ReportGenerator(store, db, workers=1)
+    polling = ReportGenerator(store, db, workers=1)
+
+    async def main():
+        job = await accepting.submit({"abc": SESSION}, missing=["bob"])
+        queued = await polling.job(job.id)
+        await job.task
+        return queued, await polling.job(job.id), await polling.job("unknown")
+
+    try:
+        queued, finished, unknown = asyncio.run(main())
+    finally:
+        accepting.shutdown()
+
+    assert queued is not None and queued.finished is None
+    assert unknown is None
+    status = finished.as_dict()
+    assert status["status"] == "done"
+    assert (status["done"], status["failed"]) == (1, 1)
+    done = next(r for r in status["results"] if r["status"] == "done")
+    assert store.path_for(done["filename"]) and (tmp_path / done["filename"]).exists()
+
+
+def test_report_endpoints_need_the_owner_or_an_admin(mongo, login, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from report_generator import ReportJob
+
+    submitted = []
+
+    async def submit(sessions, missing=(), owner=None):
+        job = ReportJob(list(sessions) + list(missing), owner=owner)
+        submitted.append(job)
+        return job
+
+    async def job(job_id):
+        return next((j for j in submitted if j.id == job_id), None)
+
+    monkeypatch.setattr(main.report_generator, "submit", submit)
+    monkeypatch.setattr(main.report_generator, "job", job)
+    sid = str(asyncio.run(mongo.sessions.insert_one(dict(SESSION))).inserted_id)
+    alice, bob, admin = login("alice"), login("bob"), login("root", role="admin")
+    client = TestClient(main.app)
+
+    assert client.post(f"/reports/{sid}").status_code == 401
+    assert client.post(f"/reports/{sid}", headers=bob).status_code == 403
+    r = client.post(f"/reports/{sid}", headers=alice)
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+
+    assert client.get(f"/reports/jobs/{job_id}").status_code == 401
+    assert client.get(f"/reports/jobs/{job_id}", headers=bob).status_code == 403
+    assert client.get(f"/reports/jobs/{job_id}", headers=alice).status_code == 200
+    assert client.get(f"/reports/jobs/{job_id}", headers=admin).status_code == 200
+
+    batch = {"usernames": ["alice"]}
+    assert client.post("/reports/batch", json=batch).status_code == 401
+    assert client.post("/reports/batch", json=batch, headers=alice).status_code == 403
+    assert client.post("/reports/batch", json=batch, headers=admin).status_code == 202
+    assert client.get(f"/reports/jobs/{job_id}/archive", headers=alice).status_code == 403
@@ -0,0 +1,21 @@
+import rescore
+
+
+def test_a_failing_row_does_not_fail_the_chunk(monkeypatch):
+    def batch_fn(features_list):
+        if any(f.get("bad") for f in features_list):
+            raise ValueError("bad row")
+        return [float(f["x"]) for f in features_list]
+
+    monkeypatch.setattr(rescore, "_batch_function", lambda modality: batch_fn)
+    rows = [
+        {"id": "a", "modality": "mouse", "features": {"x": 1}},
+        {"id": "b", "modality": "mouse", "features": {"bad": True}},
+        {"id": "c", "modality": "mouse", "features": {"x": 3}},
+        {"id": "d", "modality": "gait", "features": {}},
+    ]
+    results = rescore.score_chunk(rows)
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r.get("score") for r in results] == [1.0, None, 3.0, None]
+    assert results[1]["error"] == "ValueError: bad row"
+    assert results[3]["error"] == "unknown modality"
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from session_writer import SessionWriter, AnalyticsUpdateFailed
+
+
+class FakeCollection:
+    def __init__(self, fail_with=None):
+        self.docs = []
+        self.fail_with = fail_with
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.docs.extend(operations)
+
+
+def session(timestamp="2026-03-01T10:00:00"):
+    return {"username": "u", "timestamp": timestamp, "final_score": 70.0, "final_category": "good"}
+
+
+def run(mode, stats):
+    db = SimpleNamespace(sessions=FakeCollection(), session_stats=stats)
+    writer = SessionWriter(db, mode=mode, batch_size=2, max_delay_ms=1)
+
+    async def main():
+        results = await asyncio.gather(writer.submit(session()), writer.submit(session()), return_exceptions=True)
+        await writer.close()
+        return results
+
+    return db, writer, asyncio.run(main())
+
+
+def test_acknowledged_writes_sessions_and_aggregate():
+    db, writer, results = run("acknowledged", FakeCollection())
+    assert results == [None, None]
+    assert len(db.sessions.docs) == 2
+    assert len(db.session_stats.docs) == 4
+    assert writer.metrics()["analytics_failures"] == 0
+
+
+def test_acknowledged_surfaces_analytics_failure(caplog):
+    db, writer, results = run("acknowledged", FakeCollection(fail_with=TypeError("boom")))
+    # Stored, but the callers are told the aggregate is behind
+    assert len(db.sessions.docs) == 2
+    assert all(isinstance(r, AnalyticsUpdateFailed) for r in results)
+    metrics = writer.metrics()
+    # The first session goes out alone (the writer was idle), the second right after it
+    assert metrics["analytics_failures"] == metrics["batches"] == 2
+    assert metrics["last_analytics_error"] == "TypeError: boom"
+    assert any(r.exc_info for r in caplog.records if "Analytics update failed" in r.getMessage())
+
+
+def test_fire_and_forget_logs_analytics_failure():
+    db, writer, results = run("fire_and_forget", FakeCollection(fail_with=TypeError("boom")))
+    assert results == [None, None]
+    assert writer.metrics()["analytics_failures"] == 1
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        SessionWriter(None, mode="eventually")
+
+
+def test_acknowledged_lone_session_skips_the_delay():
+    db = SimpleNamespace(sessions=FakeCollection(), session_stats=FakeCollection())
+    writer = SessionWriter(db, mode="acknowledged", batch_size=100, max_delay_ms=60_000)
+
+    async def main():
+        await asyncio.wait_for(writer.submit(session()), timeout=1)
+        await writer.close()
+
+    asyncio.run(main())
+    assert len(db.sessions.docs) == 1
+
+
+def test_flush_user_leaves_other_users_queued():
+    db = SimpleNamespace(sessions=FakeCollection(), session_stats=FakeCollection())
+    writer = SessionWriter(db, mode="fire_and_forget", batch_size=100, max_delay_ms=60_000)
+
+    async def main():
+        await writer.submit({**session(), "username": "a"})
+        await writer.submit({**session(), "username": "b"})
+        await writer.flush_user("a")
+        stored = [doc["username"] for doc in db.sessions.docs]
+        pending = writer.pending
+        await writer.close()
+        return stored, pending
+
+    stored, pending = asyncio.run(main())
+    assert stored == ["a"]
+    assert pending == 1
+    assert [doc["username"] for doc in db.sessions.docs] == ["a", "b"]
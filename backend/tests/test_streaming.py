@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import webcam_models
+from model_registry import registry
+from streaming import StreamingWebcamSession, FrameError, parse_frame
+from webcam_models import RunningColumnStats, column_stats, features_from_landmark_data
+
+from clips import synthetic_clip
+
+
+def streamed_features(clip):
+    session = StreamingWebcamSession()
+    for frame in clip:
+        session.add_frame(frame)
+    return session.features()
+
+
+def assert_same_features(streamed, whole):
+    # Frame-by-frame kinematics and running statistics: equal up to float rounding
+    assert streamed.keys() == whole.keys()
+    for name in whole:
+        assert streamed[name] == pytest.approx(whole[name], rel=1e-9, abs=1e-9, nan_ok=True), name
+
+
+@pytest.mark.parametrize("clip_args", [
+    dict(seed=10),
+    dict(seed=11, fps=60.0, frames=240),
+    dict(seed=12, stalls=10, visibility=True),
+])
+def test_streamed_clip_matches_whole_clip(clip_args):
+    clip = synthetic_clip(**clip_args)
+    assert_same_features(streamed_features(clip), features_from_landmark_data(clip))
+
+
+def test_low_visibility_frames_are_filtered_like_the_whole_clip():
+    clip = synthetic_clip(seed=13, visibility=True)
+    for frame in clip[10:30]:
+        for point in frame["landmarks"]:
+            point["visibility"] = 0.1
+    clip[40]["landmarks"][11]["visibility"] = None
+    assert_same_features(streamed_features(clip), features_from_landmark_data(clip))
+
+
+def test_streamed_high_frame_rate_clip_keeps_only_selected_frames(monkeypatch):
+    clip = synthetic_clip(seed=15, fps=120.0, frames=480, visibility=True)
+    for i in range(1, len(clip), 9):
+        clip[i] = {**clip[i - 1], "timestamp": clip[i]["timestamp"]}  # resent frame
+    session = StreamingWebcamSession()
+    for frame in clip:
+        session.add_frame(frame)
+    assert session.frames_received == len(clip)
+    assert session.frames_kept < len(clip) / 3
+    whole = features_from_landmark_data(clip)
+    assert_same_features(session.features(), whole)
+
+    # The whole-clip frame cap needs the whole clip; a stream keeps all its selected frames
+    monkeypatch.setattr(webcam_models, "WEBCAM_MAX_FRAMES", 40)
+    assert_same_features(streamed_features(clip), whole)
+    assert features_from_landmark_data(clip) != whole
+
+
+def test_running_stats_match_column_stats():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(50.0, 10.0, size=(4, 200))
+    matrix[1, ::7] = np.nan
+    matrix[2] = np.nan
+    matrix[3, 1:] = np.nan
+    running = RunningColumnStats(len(matrix))
+    for frame in matrix.T:
+        running.add(frame)
+    np.testing.assert_allclose(running.stats(), column_stats(matrix.copy()), rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("frame, message", [
+    ("frame", "must be an object"),
+    ({"landmarks": [{"x": 0.1, "y": 0.2}] * 5, "timestamp": 1.0}, "at least 17"),
+    ({"landmarks": [{"x": 0.1}] * 33, "timestamp": 1.0}, "y must be a finite number"),
+    ({"landmarks": [{"x": 0.1, "y": "0.2"}] * 33, "timestamp": 1.0}, "y must be a finite number"),
+    ({"landmarks": [{"x": 0.1, "y": 0.2, "visibility": "high"}] * 33, "timestamp": 1.0}, "visibility"),
+    ({"landmarks": [{"x": 0.1, "y": 0.2}] * 33, "timestamp": "now"}, "timestamp"),
+])
+def test_malformed_frames_raise_frame_error(frame, message):
+    with pytest.raises(FrameError, match=message):
+        parse_frame(frame)
+
+
+def test_frames_without_landmarks_are_skipped():
+    assert parse_frame({"landmarks": [], "timestamp": 5.0}) is None
+    assert parse_frame({"landmarks": [{"x": 0, "y": 0}] * 33}) is None
+
+
+def test_websocket_reports_bad_messages_and_still_scores(webcam_model, monkeypatch):
+    monkeypatch.setitem(registry._models, "webcam", webcam_model)
+    clip = synthetic_clip(seed=14)
+    with TestClient(main.app).websocket_connect("/ws/predict/webcam") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json() == {"error": "Message is not valid JSON"}
+        ws.send_text(json.dumps([1, 2]))
+        assert ws.receive_json() == {"error": "Message must be a JSON object"}
+        ws.send_json({"frames": [clip[0], {"landmarks": [{"x": 1}], "timestamp": 2}]})
+        assert ws.receive_json()["frame_index"] == 1
+        for frame in clip[1:]:
+            ws.send_json(frame)
+        ws.send_json({"type": "stop"})
+        result = ws.receive_json()
+    assert result["frames"] == len(clip)
+    expected = webcam_model.predict({"landmark_data": clip})
+    assert result["webcam_score"] == pytest.approx(expected["recovery_score"])
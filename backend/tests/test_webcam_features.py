@@ -0,0 +1,71 @@
+"""
+The vectorised clip path (PoseAnalyzer.process_landmark_batch + the feature plan) against the
+original frame-by-frame loop, which lives here as the reference implementation.
+"""
+import numpy as np
+import pytest
+
+from pose_analysis import PoseAnalyzer, FRAME_FEATURES
+from webcam_models import analyse_clip, column_stats, feature_plan, frame_matrix, WebcamModel
+
+from clips import landmarks_to_array, synthetic_clip
+
+
+def per_frame_features(landmark_data):
+    """The pre-vectorisation loop: one process_landmarks call per frame on a fresh analyzer."""
+    pose_analyzer = PoseAnalyzer()
+    per_frame = []
+    for frame_data in landmark_data:
+        landmarks = frame_data.get("landmarks")
+        timestamp = frame_data.get("timestamp")
+        if landmarks and timestamp:
+            per_frame.append(pose_analyzer.process_landmarks(landmarks, timestamp))
+    return per_frame
+
+
+def aggregate_frame_features(frame_features) -> dict:
+    return feature_plan.features(column_stats(frame_matrix(frame_features)))
+
+
+CLIPS = {
+    "steady_30fps": dict(seed=1),
+    "short": dict(seed=2, frames=6),
+    "slow_15fps": dict(seed=3, fps=15.0, frames=60),
+    "stalled_timestamps": dict(seed=4, stalls=8),
+    "with_visibility": dict(seed=5, visibility=True),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_batch_kinematics_match_frame_loop(name):
+    clip = synthetic_clip(**CLIPS[name])
+    coords, timestamps = landmarks_to_array(clip)
+    batch = PoseAnalyzer().process_landmark_batch(coords, timestamps)
+    loop = per_frame_features(clip)
+    for col in FRAME_FEATURES:
+        np.testing.assert_allclose(batch[col], [f[col] for f in loop], rtol=1e-7, atol=1e-9, err_msg=col)
+
+
+@pytest.mark.parametrize("name", ["steady_30fps", "short", "slow_15fps", "with_visibility"])
+def test_clip_features_match_frame_loop(name):
+    # Clips at or below the target frame rate with distinct frames: frame selection keeps every frame
+    clip = synthetic_clip(**CLIPS[name])
+    coords, timestamps, visibility = landmarks_to_array(clip, with_visibility=True)
+    features, _ = analyse_clip(coords, timestamps, visibility=visibility)
+    expected = aggregate_frame_features(per_frame_features(clip))
+    assert list(features) == WebcamModel.FEATURE_NAMES
+    np.testing.assert_allclose(
+        [features[f] for f in WebcamModel.FEATURE_NAMES],
+        [expected[f] for f in WebcamModel.FEATURE_NAMES],
+        rtol=1e-7, atol=1e-9,
+    )
+
+
+def test_frames_without_landmarks_or_timestamp_are_skipped():
+    clip = synthetic_clip(seed=6, frames=20)
+    gappy = clip[:5] + [{"landmarks": [], "timestamp": 5000.0}, {"landmarks": clip[5]["landmarks"]}] + clip[5:]
+    coords, timestamps = landmarks_to_array(gappy)
+    assert len(timestamps) == len(clip)
+    batch = PoseAnalyzer().process_landmark_batch(coords, timestamps)
+    loop = per_frame_features(gappy)
+    np.testing.assert_allclose(batch["Lsmoothness"], [f["Lsmoothness"] for f in loop], rtol=1e-7, atol=1e-9)
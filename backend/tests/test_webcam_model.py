@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from clips import synthetic_clip
+
+
+def payloads(count=12):
+    # Different lengths, rates and timestamp stalls, so interleaved clips would corrupt each other's state
+    return [
+        {"landmark_data": synthetic_clip(seed=100 + i, frames=30 + 7 * i, fps=(15.0, 30.0, 60.0)[i % 3], stalls=i % 4)}
+        for i in range(count)
+    ]
+
+
+def test_concurrent_predictions_match_sequential(webcam_model):
+    clips = payloads()
+    sequential = [webcam_model.predict(p) for p in clips]
+    assert all(r is not None for r in sequential)
+    # Several rounds, so the clips land on the worker threads in different interleavings
+    for _ in range(5):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            concurrent = list(pool.map(webcam_model.predict, clips))
+        assert concurrent == sequential
+
+
+def test_concurrent_batches_match_sequential(webcam_model):
+    clips = payloads()
+    sequential = webcam_model.predict_batch(clips)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        halves = list(pool.map(webcam_model.predict_batch, [clips[:6], clips[6:]] * 4))
+    for i in range(0, len(halves), 2):
+        assert halves[i] + halves[i + 1] == sequential
+
+
+def test_batched_model_call_on_extracted_features_matches_predict(webcam_model):
+    # The API extracts clip features per request on the executor and batches only the model call
+    from webcam_models import features_from_landmark_data
+
+    clips = payloads(6)
+    features = [features_from_landmark_data(p["landmark_data"]) for p in clips]
+    assert webcam_model.predict_batch(features) == [webcam_model.predict(p) for p in clips]
@@ -1,12 +1,28 @@
+import logging
+import math
+import os
 import numpy as np
-import joblib
-import pandas as pd
 from pathlib import Path
 
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_FILES = {
+    "encoder": BASE_DIR / "models" / "label_encoder_both.pkl",
+    "classifier": BASE_DIR / "models" / "recovery_model_xgb_both.pkl",
+    "regressor": BASE_DIR / "models" / "recovery_regressor_both.pkl",
+}
+
 try:
-    from .pose_analysis import PoseAnalyzer
+    from .pose_analysis import PoseAnalyzer, arm_joints_to_array, arm_joint_columns, ARM_JOINTS, FRAME_FEATURES
+    from .model_registry import registry, load_joblib
+    from .logging_config import log_sampled
+    from .compiled_trees import compile_model
 except ImportError:
-    from pose_analysis import PoseAnalyzer
+    from pose_analysis import PoseAnalyzer, arm_joints_to_array, arm_joint_columns, ARM_JOINTS, FRAME_FEATURES
+    from model_registry import registry, load_joblib
+    from logging_config import log_sampled
+    from compiled_trees import compile_model
+
+logger = logging.getLogger(__name__)
 
 
 class WebcamModel:
@@ -31,135 +47,606 @@ class WebcamModel:
         'shoulder_speed_std_LR_diff', 'shoulder_speed_std_LR_ratio', 'sparc_smoothness_LR_diff', 'sparc_smoothness_LR_ratio'
     ]
 
-    def __init__(self):
-        BASE_DIR = Path(__file__).resolve().parent
-        self.pose_analyzer = PoseAnalyzer()
-        self.encoder = joblib.load(BASE_DIR / "models" / "label_encoder_both.pkl")
-        self.model_class = joblib.load(BASE_DIR / "models" / "recovery_model_xgb_both.pkl")
-        self.model_reg = joblib.load(BASE_DIR / "models" / "recovery_regressor_both.pkl")
+    def __init__(self, files: dict = None):
+        files = files or DEFAULT_FILES
+        self.encoder = load_joblib(files["encoder"])
+        self.model_class = load_joblib(files["classifier"])
+        self.model_reg = load_joblib(files["regressor"])
 
         # Access raw models if pipelines are loaded
         self.reg_model = self.model_reg.steps[-1][1] if hasattr(self.model_reg, 'steps') else self.model_reg
         self.class_model = self.model_class.steps[-1][1] if hasattr(self.model_class, 'steps') else self.model_class
-
-        try:
-            print("--- Regressor Model ---")
-            print("Features expected:", self.FEATURE_NAMES)
-            print("Booster attributes:", self.reg_model.get_booster().attributes())
-            print("--- Classifier Model ---")
-            print("Features expected:", self.FEATURE_NAMES)
-            print("Booster attributes:", self.class_model.get_booster().attributes())
-            print("--------------------")
-        except Exception as e:
-            print(f"Could not inspect model attributes: {e}")
+        # MODEL_BACKEND=compiled swaps in array-backed copies (the originals stay on model_reg/model_class)
+        self.reg_model = compile_model(self.reg_model, "webcam regressor")
+        self.class_model = compile_model(self.class_model, "webcam classifier")
+        # Class index -> label, looked up per prediction instead of calling encoder.inverse_transform
+        classes = getattr(self.encoder, "classes_", None)
+        self._labels = np.asarray(classes) if classes is not None else None
+
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                logger.debug("Webcam features expected: %s", self.FEATURE_NAMES)
+                logger.debug("Regressor booster attributes: %s", self.reg_model.get_booster().attributes())
+                logger.debug("Classifier booster attributes: %s", self.class_model.get_booster().attributes())
+            except Exception as e:
+                logger.debug("Could not inspect model attributes: %s", e)
+
+    def _class_labels(self, y_class):
+        if self._labels is None:
+            return self.encoder.inverse_transform(y_class)
+        if y_class.size and (y_class.min() < 0 or y_class.max() >= len(self._labels)):
+            raise ValueError(f"Unknown class index in {y_class}")
+        return self._labels[y_class]
 
     def _create_features_from_landmarks(self, landmark_data: list) -> dict:
-        try:
-            if not landmark_data or len(landmark_data) < 5:
-                print("❌ Not enough landmark data to process.")
-                return None
-
-            per_frame_features = []
-            for frame_data in landmark_data:
-                landmarks = frame_data.get("landmarks")
-                timestamp = frame_data.get("timestamp")
-                if landmarks and timestamp:
-                    frame_features = self.pose_analyzer.process_landmarks(landmarks, timestamp)
-                    per_frame_features.append(frame_features)
-
-            if not per_frame_features:
-                print("⚠️ Feature extraction from landmarks failed.")
-                return None
-
-            df = pd.DataFrame(per_frame_features)
-            aggregated_features = {}
-
-            col_map = {
-                "Lelbowangle": "L_elbow_angle",
-                "Relbowangle": "R_elbow_angle",
-                "Lshoulderangle": "L_shoulder_angle",
-                "Rshoulderangle": "R_shoulder_angle",
-                "Lshoulderspeed": "L_shoulder_speed",
-                "Rshoulderspeed": "R_shoulder_speed",
-                "Lsmoothness": "L_smoothness",
-                "Rsmoothness": "R_smoothness",
-                "Lshoulderspeednorm": "L_shoulder_speed_norm",
-                "Rshoulderspeednorm": "R_shoulder_speed_norm"
-            }
-
-            for src_col, model_col_prefix in col_map.items():
-                aggregated_features[f"{model_col_prefix}_mean"] = df[src_col].mean()
-                aggregated_features[f"{model_col_prefix}_std"] = df[src_col].std()
-                aggregated_features[f"{model_col_prefix}_max"] = df[src_col].max()
-                aggregated_features[f"{model_col_prefix}_min"] = df[src_col].min()
-
-            aggregated_features["L_elbow_angle_range"] = aggregated_features["L_elbow_angle_max"] - aggregated_features["L_elbow_angle_min"]
-            aggregated_features["R_elbow_angle_range"] = aggregated_features["R_elbow_angle_max"] - aggregated_features["R_elbow_angle_min"]
-
-            aggregated_features["L_smoothness_sparc"] = -np.log(np.mean(df["Lsmoothness"]) + 1e-8)
-            aggregated_features["R_smoothness_sparc"] = -np.log(np.mean(df["Rsmoothness"]) + 1e-8)
-
-            aggregated_features["L_elbow_rom"] = aggregated_features["L_elbow_angle_range"]
-            aggregated_features["R_elbow_rom"] = aggregated_features["R_elbow_angle_range"]
-
-            aggregated_features["elbow_angle_mean_LR_diff"] = aggregated_features["L_elbow_angle_mean"] - aggregated_features["R_elbow_angle_mean"]
-            aggregated_features["elbow_angle_mean_LR_ratio"] = aggregated_features["L_elbow_angle_mean"] / (aggregated_features["R_elbow_angle_mean"] + 1e-8)
-
-            aggregated_features["shoulder_angle_mean_LR_diff"] = aggregated_features["L_shoulder_angle_mean"] - aggregated_features["R_shoulder_angle_mean"]
-            aggregated_features["shoulder_angle_mean_LR_ratio"] = aggregated_features["L_shoulder_angle_mean"] / (aggregated_features["R_shoulder_angle_mean"] + 1e-8)
+        return features_from_landmark_data(landmark_data)
 
-            aggregated_features["shoulder_speed_mean_LR_diff"] = aggregated_features["L_shoulder_speed_mean"] - aggregated_features["R_shoulder_speed_mean"]
-            aggregated_features["shoulder_speed_mean_LR_ratio"] = aggregated_features["L_shoulder_speed_mean"] / (aggregated_features["R_shoulder_speed_mean"] + 1e-8)
-
-            aggregated_features["smoothness_mean_LR_diff"] = aggregated_features["L_smoothness_sparc"] - aggregated_features["R_smoothness_sparc"]
-            aggregated_features["smoothness_mean_LR_ratio"] = aggregated_features["L_smoothness_sparc"] / (aggregated_features["R_smoothness_sparc"] + 1e-8)
-
-            # Add additional features expected by the model here if needed
-
-            return aggregated_features
-
-        except Exception as e:
-            print(f"⚠️ Error during feature creation from landmarks: {e}")
-            return None
+    def _analyse_landmarks(self, landmark_data: list, window=None):
+        return analyse_landmark_data(landmark_data, window)
 
     def predict(self, features: dict):
         try:
+            windows = None
             if "landmark_data" in features:
-                aggregated_features = self._create_features_from_landmarks(features["landmark_data"])
+                aggregated_features, windows = self._analyse_landmarks(
+                    features["landmark_data"], window_params(features)
+                )
                 if not aggregated_features:
                     return None
             else:
                 aggregated_features = features
 
             # Debug outputs to verify correct feature matching
-            print("Expected features:", self.FEATURE_NAMES)
-            print("Input features keys:", list(aggregated_features.keys()))
-            print("Input feature values:", [aggregated_features.get(f, None) for f in self.FEATURE_NAMES])
+            log_sampled(logger, "Webcam input features: %s", aggregated_features)
 
             feature_vector = [aggregated_features.get(f, 0) for f in self.FEATURE_NAMES]
             X = np.array([feature_vector], dtype=float)
 
             y_class = self.class_model.predict(X)[0]
             y_score = self.reg_model.predict(X)[0]
+            registry.shadow_score("webcam", lambda candidate: candidate.reg_model.predict(X), [y_score])
 
-            class_label = self.encoder.inverse_transform([int(y_class)])[0]
+            class_label = self._class_labels(np.asarray([y_class], dtype=int))[0]
 
-            print(f"📈 Predicted Score: {y_score:.3f}, Class: {class_label}")
+            logger.debug("📈 Predicted Score: %.3f, Class: %s", y_score, class_label)
 
-            return {
+            result = {
                 "recovery_score": float(y_score),
                 "class_prediction": str(class_label)
             }
+            if windows is not None:
+                result["segments"] = self._score_windows(windows)
+            return result
 
         except Exception as e:
-            print(f"⚠️ Webcam prediction error: {e}")
+            logger.warning("⚠️ Webcam prediction error: %s", e)
             return None
 
+    def _score_windows(self, windows) -> list:
+        """Per-window scores: one classifier and one regressor call for all windows."""
+        start_ms, end_ms, frames, X = windows
+        if len(X) == 0:
+            return []
+        y_class = self.class_model.predict(X)
+        y_score = self.reg_model.predict(X)
+        labels = self._class_labels(np.asarray(y_class, dtype=int))
+        return [
+            {"start_ms": float(s), "end_ms": float(e), "frames": int(n),
+             "recovery_score": float(score), "class_prediction": str(label)}
+            for s, e, n, score, label in zip(start_ms, end_ms, frames, y_score, labels)
+        ]
+
+    def predict_batch(self, features_list: list):
+        """Scores many payloads with one classifier and one regressor call. Failed rows come back as None."""
+        results = [None] * len(features_list)
+        aggregated = []
+        rows = []
+        for i, features in enumerate(features_list):
+            if "landmark_data" in features and features.get("window_s"):
+                # Windowed requests carry their own per-window model calls
+                results[i] = self.predict(features)
+                continue
+            if "landmark_data" in features:
+                features = self._create_features_from_landmarks(features["landmark_data"])
+            if features:
+                aggregated.append(features)
+                rows.append(i)
+        if not rows:
+            return results
 
-# Instantiate once to reuse across API calls
-_webcam_model_instance = WebcamModel()
+        try:
+            X = np.array([[a.get(f, 0) for f in self.FEATURE_NAMES] for a in aggregated], dtype=float)
+            y_class = self.class_model.predict(X)
+            y_score = self.reg_model.predict(X)
+            registry.shadow_score("webcam", lambda candidate: candidate.reg_model.predict(X), y_score)
+            class_labels = self._class_labels(np.asarray(y_class, dtype=int))
+        except Exception as e:
+            logger.warning("⚠️ Webcam batch prediction error, retrying per row: %s", e)
+            for i, features in zip(rows, aggregated):
+                results[i] = self.predict(features)
+            return results
+
+        for i, score, label in zip(rows, y_score, class_labels):
+            results[i] = {
+                "recovery_score": float(score),
+                "class_prediction": str(label)
+            }
+        return results
+
+
+# --- Clip Preprocessing ---
+# Long or high-frame-rate recordings are thinned before the kinematics run, so the work per
+# request is bounded by WEBCAM_MAX_FRAMES rather than by what the client sent. The rules are
+# causal, so a streamed clip (streaming.py) keeps exactly the frames the whole clip would.
+WEBCAM_TARGET_FPS = float(os.getenv("WEBCAM_TARGET_FPS", 30))  # 0 keeps every frame
+WEBCAM_MAX_FRAMES = int(os.getenv("WEBCAM_MAX_FRAMES", 1800))
+# Frames whose arm joints average below this MediaPipe visibility are dropped (when sent)
+WEBCAM_MIN_VISIBILITY = float(os.getenv("WEBCAM_MIN_VISIBILITY", 0.5))
+# At least one window: a request for windows always gets one
+WEBCAM_MAX_WINDOWS = max(1, int(os.getenv("WEBCAM_MAX_WINDOWS", 120)))
+MIN_CLIP_FRAMES = 5
+
+
+class FrameDecimator:
+    """
+    Thins frames to target_fps as they arrive: after each kept frame, the one nearest to a
+    period later is kept (the earlier one on a tie), which takes one frame of lookahead.
+    A frame still pending at the end is weighed against a next frame one frame interval
+    later, as if the clip had gone on. push() and finish() return the keys of the frames that
+    became kept. A clip no faster than target_fps keeps every frame.
+    """
+
+    def __init__(self, target_fps=None):
+        target_fps = WEBCAM_TARGET_FPS if target_fps is None else target_fps
+        self.period = 1000.0 / target_fps if target_fps > 0 else 0.0
+        self._kept_t = None
+        self._last_t = None
+        # (key, t, interval since the frame before it) of the latest frame short of the next period
+        self._before = None
+
+    def push(self, key, t: float) -> list:
+        last_t, self._last_t = self._last_t, t
+        if self._kept_t is None or not self.period:
+            self._kept_t = t
+            return [key]
+        target = self._kept_t + self.period
+        if t < target:
+            self._before = (key, t, t - last_t)
+            return []
+        if self._before is not None:
+            before_key, before_t, _ = self._before
+            self._before = None
+            if target - before_t <= t - target:
+                self._kept_t = before_t
+                # This frame is then weighed against the period after the earlier one, which it follows
+                self._last_t = before_t
+                return [before_key] + self.push(key, t)
+        self._kept_t = t
+        return [key]
+
+    def finish(self) -> list:
+        if self._before is None:
+            return []
+        key, t, interval = self._before
+        self._before = None
+        target = self._kept_t + self.period
+        if target - t <= t + interval - target:
+            self._kept_t = t
+            return [key]
+        return []
+
+
+class FrameSelector:
+    """
+    select_frames for a clip that arrives one frame at a time. add() and finish() return the
+    keys (any object, e.g. the frame itself) of the frames that became kept, in order.
+    The WEBCAM_MAX_FRAMES cap is left to the caller (cap_frames), as it needs the whole clip.
+    """
+
+    def __init__(self, target_fps=None):
+        self._decimator = FrameDecimator(target_fps)
+        self._last_t = -math.inf
+        self._last_joints = None
+
+    def add(self, key, t: float, joints, visibility=None) -> list:
+        if not t > self._last_t:
+            return []
+        self._last_t = t
+        duplicate = self._last_joints is not None and np.array_equal(joints, self._last_joints)
+        self._last_joints = joints
+        if duplicate or (visibility is not None and visibility.mean() < WEBCAM_MIN_VISIBILITY):
+            return []
+        return self._decimator.push(key, t)
+
+    def finish(self) -> list:
+        return self._decimator.finish()
+
+
+def cap_frames(count: int, max_frames=None) -> np.ndarray:
+    """Indices of at most max_frames of count frames, evenly spaced over the clip."""
+    max_frames = WEBCAM_MAX_FRAMES if max_frames is None else max_frames
+    if count <= max_frames:
+        return np.arange(count)
+    return np.linspace(0, count - 1, max_frames).round().astype(int)
+
+
+def select_frames(timestamps, joints=None, visibility=None, target_fps=None, max_frames=None) -> np.ndarray:
+    """
+    Indices of the frames to analyse, given the (frames,) timestamps and, when available, the
+    (frames x 6 x 2) arm joint positions and their (frames x 6) visibility:
+    - Frames whose timestamp does not move past every earlier one are dropped.
+    - Of the rest, a frame whose joints equal the previous one's is a resent frame and is dropped.
+    - So are frames with mean arm visibility below WEBCAM_MIN_VISIBILITY.
+    - What remains is thinned to target_fps by FrameDecimator.
+    - At most max_frames are kept, evenly spaced over the clip.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    keep = np.ones(len(timestamps), dtype=bool)
+    keep[1:] = timestamps[1:] > np.maximum.accumulate(timestamps)[:-1]
+    if joints is not None:
+        moving = np.flatnonzero(keep)
+        flat = joints[moving].reshape(len(moving), -1)
+        keep[moving[1:]] = (flat[1:] != flat[:-1]).any(axis=1)
+    if visibility is not None:
+        keep &= visibility.mean(axis=1) >= WEBCAM_MIN_VISIBILITY
+
+    idx = np.flatnonzero(keep)
+    decimator = FrameDecimator(target_fps)
+    if decimator.period and len(idx) > 1:
+        kept = []
+        for i, t in zip(idx.tolist(), timestamps[idx].tolist()):
+            kept += decimator.push(i, t)
+        idx = np.array(kept + decimator.finish(), dtype=int)
+    return idx[cap_frames(len(idx), max_frames)]
+
+
+def window_params(features: dict):
+    """
+    (window_s, step_s) from a landmark payload, or None when it asks for no windows.
+    Raises ValueError unless both are positive, finite numbers.
+    """
+    window_s = features.get("window_s")
+    if not window_s:
+        return None
+    try:
+        window_s = float(window_s)
+        step_s = float(features.get("step_s") or window_s)
+    except (TypeError, ValueError):
+        raise ValueError("window_s and step_s must be numbers")
+    if not (math.isfinite(window_s) and math.isfinite(step_s)) or window_s <= 0 or step_s <= 0:
+        raise ValueError("window_s and step_s must be positive and finite")
+    return window_s, step_s
+
+
+def window_bounds(timestamps, window_s: float, step_s: float):
+    """
+    Frame ranges [lo, hi) of the sliding windows over a clip, keeping windows with at least
+    MIN_CLIP_FRAMES frames. Beyond WEBCAM_MAX_WINDOWS windows the step is widened to fit.
+    """
+    window_ms, step_ms = window_s * 1000.0, step_s * 1000.0
+    span = timestamps[-1] - timestamps[0]
+    count = int(max(span - window_ms, 0) // step_ms) + 1
+    if count > WEBCAM_MAX_WINDOWS:
+        # One window allowed: the step no longer matters, the window starts at the first frame
+        step_ms = (span - window_ms) / (WEBCAM_MAX_WINDOWS - 1) if WEBCAM_MAX_WINDOWS > 1 else 0.0
+        count = WEBCAM_MAX_WINDOWS
+    starts = timestamps[0] + step_ms * np.arange(count)
+    lo = np.searchsorted(timestamps, starts, side="left")
+    hi = np.searchsorted(timestamps, starts + window_ms, side="left")
+    full = (hi - lo) >= MIN_CLIP_FRAMES
+    return lo[full], hi[full]
+
+
+def analyse_clip(coords, timestamps, landmark_ids=None, visibility=None, window=None):
+    """
+    Model features for a clip that is already packed as arrays, either by arm_joints_to_array
+    or decoded from the binary wire format. Needs no fitted model, so it can run before scoring.
+    Returns (features, windows): windows is None unless window=(window_s, step_s) is given,
+    then (start_ms, end_ms, frames, windows x FEATURE_NAMES matrix), all from one kinematics pass.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    # Only the arm joints are copied out of the landmarks, and only the selected frames of those
+    joint_cols = arm_joint_columns(landmark_ids)
+    joints = np.take(np.asarray(coords), joint_cols, axis=1)[:, :, :2]
+    vis = None if visibility is None else np.take(np.asarray(visibility), joint_cols, axis=1)
+    keep = select_frames(timestamps, joints, vis)
+    if len(keep) < len(timestamps):
+        logger.debug("Webcam clip: analysing %d of %d frames", len(keep), len(timestamps))
+    return analyse_joints(joints[keep], timestamps[keep], window)
+
+
+def analyse_joints(joints, timestamps, window=None):
+    """
+    analyse_clip for frames that are already selected: (frames x 6 x 2) ARM_JOINTS positions
+    and their timestamps. The streaming session selects its frames as they arrive and calls this.
+    """
+    if len(timestamps) < MIN_CLIP_FRAMES:
+        logger.warning("⚠️ Feature extraction from landmarks failed: %d usable frames.", len(timestamps))
+        return None, None
+
+    # Kinematic state belongs to the clip, not to the shared model instance
+    frame_features = PoseAnalyzer().process_landmark_batch(joints, timestamps, ARM_JOINTS)
+    matrix = frame_matrix(frame_features)
+
+    windows = None
+    if window is not None:
+        lo, hi = window_bounds(timestamps, *window)
+        X = feature_plan.vector(window_stats(matrix, lo, hi)) if len(lo) else np.empty((0, len(feature_plan.feature_names)))
+        windows = (timestamps[lo], timestamps[hi - 1], hi - lo, X)
+    return feature_plan.features(column_stats(matrix)), windows
+
+
+def analyse_landmark_data(landmark_data: list, window=None):
+    """(whole-clip features, windows) as returned by analyse_clip for a JSON landmark_data list, or (None, None)."""
+    try:
+        if not landmark_data or len(landmark_data) < MIN_CLIP_FRAMES:
+            logger.warning("❌ Not enough landmark data to process.")
+            return None, None
+
+        # Only the six arm joints of each frame are unpacked; the kinematics run in one pass
+        joints, timestamps, visibility = arm_joints_to_array(landmark_data)
+        return analyse_clip(joints, timestamps, ARM_JOINTS, visibility, window)
+
+    except Exception as e:
+        logger.warning("⚠️ Error during feature creation from landmarks: %s", e)
+        return None, None
+
+
+def features_from_landmark_data(landmark_data: list):
+    """
+    Model features for a JSON clip, or None. Needs no fitted model: the API runs it per clip on
+    the inference executor and only batches the model calls.
+    """
+    return analyse_landmark_data(landmark_data)[0]
+
+
+def features_from_landmark_arrays(coords, timestamps, landmark_ids=None, visibility=None):
+    return analyse_clip(coords, timestamps, landmark_ids, visibility)[0]
+
+
+def features_from_packed_landmarks(values, timestamps, landmark_ids=None):
+    """Same checks as the JSON path for a clip decoded from the binary wire format."""
+    if len(timestamps) < MIN_CLIP_FRAMES:
+        logger.warning("❌ Not enough landmark data to process.")
+        return None
+    # Frames without a timestamp are skipped, like frames with a missing "timestamp" in JSON
+    keep = timestamps != 0
+    if not keep.all():
+        values, timestamps = values[keep], timestamps[keep]
+    # The 4th value per landmark, when sent, is MediaPipe's visibility
+    visibility = values[:, :, 3] if values.shape[2] >= 4 else None
+    return features_from_landmark_arrays(values, timestamps, landmark_ids, visibility)
+
+
+# --- Feature Spec ---
+# Every WebcamModel.FEATURE_NAMES entry is declared here once. The spec is compiled at import
+# into index arrays over a (statistic x per-frame column) matrix, so a clip's features come
+# from one set of column reductions plus a few gathers, with no per-feature Python code.
+
+STAT_ROWS = ("mean", "std", "max", "min", "range")
+
+# "{side}_{name}_{stat}" for side L/R, from the per-frame column "{side}{column}"
+SIDE_STATS = [
+    ("elbow_angle", "elbowangle", ("mean", "std", "max", "min", "range")),
+    ("shoulder_angle", "shoulderangle", ("mean", "std", "max", "min", "range")),
+    ("shoulder_speed", "shoulderspeed", ("mean", "std", "max", "min", "range")),
+    ("angle_vel", "anglevel", ("mean", "std", "max", "min", "range")),
+    ("smoothness", "smoothness", ("mean", "std", "max", "min", "range")),
+    ("shoulder_speed_norm", "shoulderspeednorm", ("mean", "std")),
+]
+
+# "{side}_{name}" computed from the per-side feature "{side}_{source}"
+SIDE_DERIVED = [
+    ("sparc_smoothness", "neg_log", "smoothness_mean"),  # jerk-based SPARC proxy: -log(mean jerk)
+    ("elbow_rom", "copy", "elbow_angle_range"),
+]
+
+# "{name}_LR_diff" = L - R and "{name}_LR_ratio" = L / (R + eps) of the per-side feature `source`
+LR_PAIRS = [
+    ("elbow_angle_mean", "elbow_angle_mean"),
+    ("shoulder_angle_mean", "shoulder_angle_mean"),
+    ("shoulder_speed_mean", "shoulder_speed_mean"),
+    # Has always been fed the SPARC proxy rather than the mean jerk; the trained models expect that
+    ("smoothness_mean", "sparc_smoothness"),
+    ("angle_vel_mean", "angle_vel_mean"),
+    ("shoulder_speed_norm_mean", "shoulder_speed_norm_mean"),
+    ("elbow_angle_std", "elbow_angle_std"),
+    ("shoulder_angle_std", "shoulder_angle_std"),
+    ("shoulder_speed_std", "shoulder_speed_std"),
+    ("sparc_smoothness", "sparc_smoothness"),
+]
+
+LR_EPS = 1e-8
+
+
+class FeaturePlan:
+    """The feature spec compiled against a per-frame column order and a model feature order."""
+
+    def __init__(self, columns, feature_names):
+        self.columns = list(columns)
+        self.feature_names = list(feature_names)
+        col_index = {c: i for i, c in enumerate(self.columns)}
+        n_cols = len(self.columns)
+
+        # Stage 1: per-side statistics, gathered from the flattened (STAT_ROWS x columns) matrix
+        names, stat_index = [], []
+        for side in ("L", "R"):
+            for name, column, stats in SIDE_STATS:
+                col = f"{side}{column}"
+                if col not in col_index:
+                    raise ValueError(f"Feature spec needs per-frame column '{col}'")
+                for stat in stats:
+                    names.append(f"{side}_{name}_{stat}")
+                    stat_index.append(STAT_ROWS.index(stat) * n_cols + col_index[col])
+        self.stat_index = np.array(stat_index)
+
+        # Stage 2: per-side derived features, gathered from stage 1
+        position = {n: i for i, n in enumerate(names)}
+        self.neg_log_index, self.copy_index = [], []
+        for op, target in (("neg_log", self.neg_log_index), ("copy", self.copy_index)):
+            for side in ("L", "R"):
+                for name, kind, source in SIDE_DERIVED:
+                    if kind == op:
+                        target.append(position[f"{side}_{source}"])
+                        names.append(f"{side}_{name}")
+        unknown = {kind for _, kind, _ in SIDE_DERIVED} - {"neg_log", "copy"}
+        if unknown:
+            raise ValueError(f"Unknown derived feature op(s): {sorted(unknown)}")
+        self.neg_log_index = np.array(self.neg_log_index, dtype=int)
+        self.copy_index = np.array(self.copy_index, dtype=int)
+
+        # Stage 3: left/right asymmetry from stages 1 and 2
+        position = {n: i for i, n in enumerate(names)}
+        self.left_index = np.array([position[f"L_{source}"] for _, source in LR_PAIRS], dtype=int)
+        self.right_index = np.array([position[f"R_{source}"] for _, source in LR_PAIRS], dtype=int)
+        names += [f"{name}_LR_diff" for name, _ in LR_PAIRS]
+        names += [f"{name}_LR_ratio" for name, _ in LR_PAIRS]
+
+        position = {n: i for i, n in enumerate(names)}
+        missing = [f for f in self.feature_names if f not in position]
+        if missing:
+            raise ValueError(f"Feature spec does not produce model feature(s): {missing}")
+        self.output_index = np.array([position[f] for f in self.feature_names])
+
+    def vector(self, stats) -> np.ndarray:
+        """
+        Model feature vector (feature_names order) from a (STAT_ROWS x columns) matrix, or a
+        (rows x features) matrix from a stack of them.
+        """
+        side = stats.reshape(stats.shape[:-2] + (-1,))[..., self.stat_index]
+        derived = np.concatenate(
+            [side, -np.log(side[..., self.neg_log_index] + 1e-8), side[..., self.copy_index]], axis=-1
+        )
+        left, right = derived[..., self.left_index], derived[..., self.right_index]
+        return np.concatenate([derived, left - right, left / (right + LR_EPS)], axis=-1)[..., self.output_index]
+
+    def features(self, stats) -> dict:
+        return dict(zip(self.feature_names, self.vector(stats).tolist()))
+
+
+feature_plan = FeaturePlan(FRAME_FEATURES, WebcamModel.FEATURE_NAMES)
+
+
+def frame_matrix(frame_features) -> np.ndarray:
+    """
+    (FRAME_FEATURES x frames) matrix from process_landmark_batch's dict of arrays or from a
+    list of process_landmarks dicts. A missing per-frame column raises KeyError.
+    """
+    if isinstance(frame_features, dict):
+        return np.stack([np.asarray(frame_features[c], dtype=float) for c in FRAME_FEATURES])
+    return np.array([[f[c] for f in frame_features] for c in FRAME_FEATURES], dtype=float)
+
+
+def column_stats(matrix: np.ndarray) -> np.ndarray:
+    """
+    (STAT_ROWS x columns) statistics of a (columns x frames) matrix, which is overwritten.
+    NaNs are skipped and std is the sample std, as in pandas.
+    """
+    n = matrix.shape[1]
+    stats = np.empty((len(STAT_ROWS), matrix.shape[0]))
+    total = matrix.sum(axis=1)
+    if np.isnan(total).any():
+        return _nan_column_stats(matrix, stats)
+    np.divide(total, n, out=stats[0])
+    matrix.max(axis=1, out=stats[2])
+    matrix.min(axis=1, out=stats[3])
+    np.subtract(stats[2], stats[3], out=stats[4])
+    if n > 1:
+        matrix -= stats[0][:, None]
+        np.square(matrix, out=matrix)
+        np.sqrt(matrix.sum(axis=1) / (n - 1), out=stats[1])
+    else:
+        stats[1] = np.nan
+    return stats
+
+
+def _nan_column_stats(matrix, stats):
+    valid = (~np.isnan(matrix)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats[0] = np.nansum(matrix, axis=1) / valid
+        stats[2] = np.where(valid > 0, np.fmax.reduce(matrix, axis=1), np.nan)
+        stats[3] = np.where(valid > 0, np.fmin.reduce(matrix, axis=1), np.nan)
+        stats[4] = stats[2] - stats[3]
+        stats[1] = np.sqrt(np.nansum((matrix - stats[0][:, None]) ** 2, axis=1) / (valid - 1))
+    stats[1][valid < 2] = np.nan
+    return stats
+
+
+class RunningColumnStats:
+    """
+    column_stats for frames that arrive one at a time: Welford's running mean and squared
+    deviations, plus running max and min, in constant memory. NaNs are skipped per column.
+    """
+
+    def __init__(self, columns: int):
+        self.count = np.zeros(columns)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+        self.max = np.full(columns, np.nan)
+        self.min = np.full(columns, np.nan)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        self.count += valid
+        delta = np.where(valid, values - self.mean, 0.0)
+        self.mean += np.divide(delta, self.count, out=np.zeros_like(delta), where=valid)
+        self.m2 += np.where(valid, delta * (values - self.mean), 0.0)
+        np.fmax(self.max, values, out=self.max)
+        np.fmin(self.min, values, out=self.min)
+
+    def stats(self) -> np.ndarray:
+        stats = np.empty((len(STAT_ROWS), len(self.count)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats[0] = np.where(self.count > 0, self.mean, np.nan)
+            stats[1] = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        stats[2] = self.max
+        stats[3] = self.min
+        stats[4] = self.max - self.min
+        return stats
+
+
+def window_stats(matrix: np.ndarray, lo, hi) -> np.ndarray:
+    """
+    (windows x STAT_ROWS x columns) statistics of the frame ranges [lo, hi) of a
+    (columns x frames) matrix: prefix sums for mean and std, reduceat for max and min.
+    """
+    if np.isnan(matrix).any():
+        return np.stack([column_stats(matrix[:, a:b].copy()) for a, b in zip(lo, hi)])
+    counts = hi - lo
+    # Centring first keeps the sum-of-squares variance accurate
+    centred = matrix - matrix.mean(axis=1, keepdims=True)
+    prefix = np.zeros((matrix.shape[0], matrix.shape[1] + 1))
+    np.cumsum(centred, axis=1, out=prefix[:, 1:])
+    sums = prefix[:, hi] - prefix[:, lo]
+    np.square(centred, out=centred)
+    np.cumsum(centred, axis=1, out=prefix[:, 1:])
+    squares = prefix[:, hi] - prefix[:, lo]
+
+    stats = np.empty((len(lo), len(STAT_ROWS), matrix.shape[0]))
+    stats[:, 0] = (sums / counts + matrix.mean(axis=1, keepdims=True)).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats[:, 1] = np.sqrt(np.maximum(squares - sums ** 2 / counts, 0.0) / (counts - 1)).T
+    # reduceat over [lo0, hi0, lo1, hi1, ...]: the even slots are the windows. A padding column
+    # lets hi reach the end of the clip.
+    padded = np.concatenate([matrix, matrix[:, -1:]], axis=1)
+    bounds = np.column_stack([lo, hi]).ravel()
+    stats[:, 2] = np.maximum.reduceat(padded, bounds, axis=1)[:, ::2].T
+    stats[:, 3] = np.minimum.reduceat(padded, bounds, axis=1)[:, ::2].T
+    stats[:, 4] = stats[:, 2] - stats[:, 3]
+    return stats
+
+
+# One shared instance, created on first use. The instance only holds the fitted models;
+# every clip gets its own PoseAnalyzer, so predict() is safe to call from a thread pool.
+# The version served comes from models/manifest.json; DEFAULT_FILES is the fallback.
+registry.register("webcam", WebcamModel, DEFAULT_FILES, WebcamModel.FEATURE_NAMES)
 
 
 def predict_webcam(features: dict):
     """Function to be called by your API endpoint."""
-    return _webcam_model_instance.predict(features)
+    return registry.get("webcam").predict(features)
+
+
+def predict_webcam_batch(features_list: list):
+    return registry.get("webcam").predict_batch(features_list)
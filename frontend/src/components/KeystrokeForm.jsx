@@ -48,7 +48,7 @@ function KeystrokeForm({ onDataChange }) {
     // Save event to keystrokeEvents
     setKeystrokeEvents((prev) => [
       ...prev,
-      { key: e.key, event_type: "down", timestamp_ms: Date.now() },
+      { key: e.key, code: e.code, event_type: "down", timestamp_ms: Date.now() },
     ]);
 
     if (e.key === "Backspace") {
@@ -72,7 +72,7 @@ function KeystrokeForm({ onDataChange }) {
     // Save event to keystrokeEvents
     setKeystrokeEvents((prev) => [
       ...prev,
-      { key: e.key, event_type: "up", timestamp_ms: Date.now() },
+      { key: e.key, code: e.code, event_type: "up", timestamp_ms: Date.now() },
     ]);
 
     setKeystrokeTimes((k) => [...k, Date.now()]);